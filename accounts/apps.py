@@ -5,6 +5,12 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
 
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .backfills import backfill_address_lower
+        # existing wallets get Wallet.address_lower once its column exists
+        post_migrate.connect(backfill_address_lower, sender=self)
+
     # def ready(self):
     #     # This imports the signals when Django starts
     #     import accounts.signals
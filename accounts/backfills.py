@@ -0,0 +1,55 @@
+"""
+Data steps that have to run when the schema changes.
+
+The repo ships no migrations (they are generated at deploy time), so there
+is no migration to carry a RunPython step. These run from the app's
+post_migrate signal instead, on every migrate, and are cheap once done.
+
+Wallet.address_lower is nullable so that adding it to a table of existing
+wallets succeeds; backfill_address_lower then fills it in, in batches.
+Wallets whose address differs from an earlier one only by case would break
+the unique constraint: they are left NULL and reported, to be merged by hand.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from .models import Wallet, normalize_address
+
+
+def backfill_address_lower(sender=None, using=DEFAULT_DB_ALIAS, verbosity=1, batch_size=1000, **kwargs):
+    """Fill Wallet.address_lower where it is NULL. Returns (filled, [duplicate addresses])."""
+    connection = connections[using]
+    table = Wallet._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return 0, []
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+    if Wallet._meta.get_field('address_lower').column not in columns:
+        return 0, []
+
+    wallets = Wallet.objects.using(using)
+    filled, duplicates, last = 0, [], None
+    while True:
+        batch = wallets.filter(address_lower=None).order_by('pk').only('pk', 'address')
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        batch = list(batch[:batch_size])
+        if not batch:
+            break
+        last = batch[-1].pk
+        for wallet in batch:
+            wallet.address_lower = normalize_address(wallet.address)
+        taken = set(wallets.filter(address_lower__in=[w.address_lower for w in batch]).values_list('address_lower', flat=True))
+        updates = []
+        for wallet in batch:
+            if wallet.address_lower in taken:
+                duplicates.append(wallet.address)
+                continue
+            taken.add(wallet.address_lower)
+            updates.append(wallet)
+        wallets.bulk_update(updates, ['address_lower'])
+        filled += len(updates)
+
+    if verbosity >= 1 and filled:
+        print(f"  Wallet.address_lower: backfilled {filled} wallet(s)")
+    for address in duplicates:
+        print(f"  Wallet {address}: same address as another wallet but for case, address_lower left empty")
+    return filled, duplicates
@@ -0,0 +1,90 @@
+"""
+Pledge intents: the PENDING transaction a donor records before signing a
+pledge, with an explicit expiry.
+
+Transaction.save used to fail every PENDING row of the wallet before each
+write, the webhook's SUCCESSFUL rows included: an unindexed UPDATE on the
+hot donate and webhook paths, mostly matching nothing. Now the donate path
+writes the intent next to its transaction, the webhook fulfils it when the
+pledge is applied (one indexed read per batch, on transaction (wallet,
+status)), and expire_intents fails the stale ones in batches, off the
+request path, through the partial index on open intents.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import PledgeIntent, Transaction
+
+
+def open_intent(pending):
+    """Record the intent behind a PENDING pledge transaction, expiring PLEDGE_INTENT_TTL seconds from now."""
+    return PledgeIntent.objects.create(
+        transaction=pending,
+        expires_at=timezone.now() + timedelta(seconds=settings.PLEDGE_INTENT_TTL),
+    )
+
+
+def fulfil_intents(pledges):
+    """
+    Match Transaction rows built for applied Pledged events (unsaved,
+    SUCCESSFUL) to the oldest open intent of the same wallet and project, or
+    of the wallet alone when its transaction has no project.
+    The matched PENDING transaction takes the pledge's values in place (one
+    bulk UPDATE) and its intent is FULFILLED. Must run inside a transaction.
+    Returns the pledges without an intent, for the caller to insert.
+    """
+    wallets = {pledge.wallet_id for pledge in pledges if pledge.wallet_id}
+    if not wallets:
+        return list(pledges)
+    waiting = defaultdict(list)
+    for intent_id, transaction_id, wallet_id, project_id in (
+        PledgeIntent.objects.select_for_update(of=('self',))
+        .filter(status=PledgeIntent.OPEN, transaction__wallet__in=wallets, transaction__status=Transaction.PENDING)
+        .order_by('id')
+        .values_list('id', 'transaction_id', 'transaction__wallet_id', 'transaction__project_id')
+    ):
+        waiting[(wallet_id, project_id)].append((intent_id, transaction_id))
+
+    fulfilled, intents, unmatched = [], [], []
+    for pledge in pledges:
+        # transactions recorded without a project (accounts' TransactionSerializer) match any pledge of the wallet
+        open_intents = waiting.get((pledge.wallet_id, pledge.project_id)) or waiting.get((pledge.wallet_id, None))
+        if not open_intents:
+            unmatched.append(pledge)
+            continue
+        intent_id, pledge.pk = open_intents.pop(0)
+        intents.append(intent_id)
+        fulfilled.append(pledge)
+    if fulfilled:
+        Transaction.objects.bulk_update(fulfilled, ['project', 'amount', 'tip', 'status', 'tx_hash', 'event'])
+        PledgeIntent.objects.filter(id__in=intents).update(status=PledgeIntent.FULFILLED)
+    return unmatched
+
+
+def expire_intents(batch_size=None, now=None):
+    """
+    Expire the open intents past their expires_at, batch_size at a time, and
+    fail their transactions that are still PENDING. Each batch commits on its
+    own; intents locked by another sweeper are skipped. Returns the number of
+    intents expired.
+    """
+    batch_size = batch_size or settings.PLEDGE_SWEEP_BATCH
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                PledgeIntent.objects.select_for_update(skip_locked=True)
+                .filter(status=PledgeIntent.OPEN, expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('id', 'transaction_id')[:batch_size]
+            )
+            if not batch:
+                return expired
+            PledgeIntent.objects.filter(id__in=[row[0] for row in batch]).update(status=PledgeIntent.EXPIRED)
+            Transaction.objects.filter(
+                id__in=[row[1] for row in batch], status=Transaction.PENDING
+            ).update(status=Transaction.FAILED)
+        expired += len(batch)
@@ -42,14 +42,31 @@ def getkyc_status(organization):
 
 
 
+def normalize_address(address):
+    """Canonical (trimmed, lower-case) form of a wallet address, as stored in Wallet.address_lower."""
+    if address is None:
+        return None
+    return address.strip().lower()
+
+
 class Wallet(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     address = models.CharField(max_length=255, unique=True)
+    # normalize_address(address): look wallets up by this, never address__iexact (no index)
+    # nullable so the column can be added to existing wallets; accounts.backfills fills it after migrate
+    address_lower = models.CharField(max_length=255, unique=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self):
         return self.address
 
+    def save(self, *args, **kwargs):
+        self.address_lower = normalize_address(self.address)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'address' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'address_lower'}
+        super().save(*args, **kwargs)
+
     @property
     @extend_schema_field(str)
     def username(self):
@@ -290,11 +307,43 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
-    
-    def save(self, *args, **kwargs):
-        Transaction.objects.filter(wallet=self.wallet,status=Transaction.PENDING).update(status=Transaction.FAILED)
-        super().save(*args, **kwargs)
-    
+        indexes = [
+            models.Index(fields=['wallet', 'status'], name='transaction_wallet_status'),
+        ]
+
+
+class PledgeIntent(models.Model):
+    """
+    A PENDING pledge transaction the donor has not signed yet, and when to stop
+    waiting for it. The webhook fulfils it when the pledge lands on-chain
+    (accounts.intents.fulfil_intents); open intents past expires_at are failed
+    in batches by sweep_pledge_intents (accounts.intents.expire_intents), so
+    saving a transaction never has to touch the wallet's other rows.
+    """
+    OPEN = 'OPEN'
+    FULFILLED = 'FULFILLED'
+    EXPIRED = 'EXPIRED'
+
+    status = [
+    (OPEN,'OPEN'),
+    (FULFILLED,'FULFILLED'),
+    (EXPIRED,'EXPIRED'),
+    ]
+
+    transaction = models.OneToOneField(Transaction, related_name='intent', on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=status, default=OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # the sweeper only reads open intents: expired ones stay out of the index
+            models.Index(fields=['expires_at'], condition=models.Q(status='OPEN'), name='pledge_intent_open_expiry'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_id} {self.status} until {self.expires_at}"
+
 
 
 
@@ -11,7 +11,8 @@ from .utils import (
     send_account_activation_otp,
     validate_password,
 )
-from .models import Organization, Donor, Social, User, Transaction, Wallet,KycRequirement
+from .models import Organization, Donor, Social, User, Transaction, Wallet,KycRequirement, normalize_address
+from .intents import open_intent
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -469,8 +470,8 @@ class WalletSerializer(serializers.ModelSerializer):
             
             with transaction.atomic():
                 wallet,created = Wallet.objects.get_or_create(
-                    address__iexact=new_wallet,
-                    defaults={'address': new_wallet}
+                    address_lower=normalize_address(new_wallet),
+                    defaults={'address': new_wallet.strip()}
                     )
                 if not created:
                     #wallet.users.clear()
@@ -572,13 +573,18 @@ class TransactionSerializer(serializers.ModelSerializer):
         
     def create(self, validated_data):
         transaction_wallet= validated_data.pop('wallet_address',None)
-        wallet = Wallet.objects.filter(address__iexact=transaction_wallet).first()
+        wallet = Wallet.objects.filter(address_lower=normalize_address(transaction_wallet)).first()
         if not wallet:
             raise serializers.ValidationError(
                 {"wallet_address": "No user with the given wallet."}
             )
         validated_data['wallet']=wallet
-        return super().create(validated_data)
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            if instance.status == Transaction.PENDING:
+                # expires like the donate path's, now that saves no longer sweep
+                open_intent(instance)
+        return instance
     
 
 
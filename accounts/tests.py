@@ -1,3 +1,113 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.intents import expire_intents, fulfil_intents, open_intent
+from accounts.models import PledgeIntent, Transaction, Wallet
+from accounts.serializers import TransactionSerializer
+from contract.benchmarks import make_campaign, make_donor
+
+
+class PledgeIntentTests(TestCase):
+
+    def setUp(self):
+        self.projects = [make_campaign(contract_id) for contract_id in (1, 2)]
+        self.wallets = [Wallet.objects.get(address=make_donor(i)) for i in range(2)]
+
+    def pending(self, wallet, project, amount='5'):
+        transaction = Transaction.objects.create(
+            project=project, wallet=wallet, amount=Decimal(amount), tip=0,
+            status=Transaction.PENDING, event=Transaction.PLEDGE,
+        )
+        return transaction, open_intent(transaction)
+
+    def pledge(self, wallet, project, amount='10', tx_hash='0x01'):
+        return Transaction(
+            project=project, wallet=wallet, amount=Decimal(amount), tip=Decimal('1'),
+            status=Transaction.SUCCESSFUL, tx_hash=tx_hash, event=Transaction.PLEDGE,
+        )
+
+    @override_settings(PLEDGE_INTENT_TTL=60)
+    def test_open_intent_expires_after_the_ttl(self):
+        before = timezone.now()
+        _, intent = self.pending(self.wallets[0], self.projects[0])
+
+        self.assertEqual(intent.status, PledgeIntent.OPEN)
+        self.assertGreaterEqual(intent.expires_at, before + timedelta(seconds=60))
+        self.assertLessEqual(intent.expires_at, timezone.now() + timedelta(seconds=60))
+
+    def test_fulfil_promotes_the_oldest_matching_pending_transaction(self):
+        oldest, oldest_intent = self.pending(self.wallets[0], self.projects[0])
+        newer, newer_intent = self.pending(self.wallets[0], self.projects[0])
+        other_project, other_intent = self.pending(self.wallets[0], self.projects[1])
+
+        unmatched = fulfil_intents([self.pledge(self.wallets[0], self.projects[0], tx_hash='0xaa')])
+
+        self.assertEqual(unmatched, [])
+        oldest.refresh_from_db()
+        self.assertEqual(
+            (oldest.status, oldest.amount, oldest.tip, oldest.tx_hash),
+            (Transaction.SUCCESSFUL, Decimal('10'), Decimal('1'), '0xaa'),
+        )
+        self.assertEqual(
+            dict(PledgeIntent.objects.values_list('pk', 'status')),
+            {oldest_intent.pk: PledgeIntent.FULFILLED, newer_intent.pk: PledgeIntent.OPEN,
+             other_intent.pk: PledgeIntent.OPEN},
+        )
+        self.assertEqual(Transaction.objects.get(pk=newer.pk).status, Transaction.PENDING)
+        self.assertEqual(Transaction.objects.get(pk=other_project.pk).status, Transaction.PENDING)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_fulfil_returns_pledges_without_an_intent(self):
+        self.pending(self.wallets[0], self.projects[0])
+        matched = self.pledge(self.wallets[0], self.projects[0])
+        second = self.pledge(self.wallets[0], self.projects[0], tx_hash='0x02')
+        stranger = self.pledge(self.wallets[1], self.projects[0], tx_hash='0x03')
+
+        self.assertEqual(fulfil_intents([matched, second, stranger]), [second, stranger])
+        self.assertIsNotNone(matched.pk)
+
+    def test_fulfil_falls_back_to_intents_without_a_project(self):
+        pending, intent = self.pending(self.wallets[0], None)
+
+        self.assertEqual(fulfil_intents([self.pledge(self.wallets[0], self.projects[1])]), [])
+
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.project_id), (Transaction.SUCCESSFUL, self.projects[1].pk))
+        self.assertEqual(PledgeIntent.objects.get(pk=intent.pk).status, PledgeIntent.FULFILLED)
+
+    def test_expire_fails_stale_pending_transactions_in_batches(self):
+        stale = [self.pending(self.wallets[0], self.projects[0]) for _ in range(3)]
+        fresh, fresh_intent = self.pending(self.wallets[1], self.projects[0])
+        fulfilled, fulfilled_intent = self.pending(self.wallets[1], self.projects[1])
+        fulfil_intents([self.pledge(self.wallets[1], self.projects[1])])
+        PledgeIntent.objects.exclude(pk=fresh_intent.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(expire_intents(batch_size=2), 3)
+        self.assertEqual(expire_intents(batch_size=2), 0)
+
+        for transaction, intent in stale:
+            self.assertEqual(Transaction.objects.get(pk=transaction.pk).status, Transaction.FAILED)
+            self.assertEqual(PledgeIntent.objects.get(pk=intent.pk).status, PledgeIntent.EXPIRED)
+        self.assertEqual(Transaction.objects.get(pk=fresh.pk).status, Transaction.PENDING)
+        self.assertEqual(Transaction.objects.get(pk=fulfilled.pk).status, Transaction.SUCCESSFUL)
+        self.assertEqual(PledgeIntent.objects.get(pk=fulfilled_intent.pk).status, PledgeIntent.FULFILLED)
+
+    def test_expire_leaves_transactions_that_are_no_longer_pending(self):
+        transaction, intent = self.pending(self.wallets[0], self.projects[0])
+        Transaction.objects.filter(pk=transaction.pk).update(status=Transaction.SUCCESSFUL)
+
+        self.assertEqual(expire_intents(now=intent.expires_at), 1)
+
+        self.assertEqual(Transaction.objects.get(pk=transaction.pk).status, Transaction.SUCCESSFUL)
+
+    def test_transaction_serializer_opens_an_intent(self):
+        serializer = TransactionSerializer(data={'tx_hash': '0xabc', 'wallet_address': self.wallets[0].address.upper()})
+        serializer.is_valid(raise_exception=True)
+
+        transaction = serializer.save()
+
+        self.assertEqual(transaction.status, Transaction.PENDING)
+        self.assertEqual(transaction.intent.status, PledgeIntent.OPEN)
@@ -0,0 +1,105 @@
+from django.contrib import admin
+from .models import WebhookEvent, ProcessedEvent, ChainCheckpoint, WorkerLease, OwnerNonce, OwnerTransaction, ChainTransaction, CampaignSnapshot
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status',)
+    readonly_fields = ('payload', 'status', 'attempts', 'error', 'received_at', 'locked_at', 'retry_at', 'processed_at')
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=WebhookEvent.PROCESSING).update(
+            status=WebhookEvent.PENDING, locked_at=None, retry_at=None
+        )
+        self.message_user(request, f"{updated} webhook event(s) queued for processing")
+    requeue.short_description = "Queue selected events for processing again"
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ProcessedEvent)
+class ProcessedEventAdmin(admin.ModelAdmin):
+    list_display = ('event', 'tx_hash', 'log_index', 'block_number', 'chain', 'processed_at')
+    list_filter = ('event', 'chain')
+    search_fields = ('tx_hash',)
+    readonly_fields = ('chain', 'tx_hash', 'log_index', 'event', 'block_number', 'processed_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ChainCheckpoint)
+class ChainCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'block_number', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(WorkerLease)
+class WorkerLeaseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'expires_at')
+
+
+@admin.register(OwnerNonce)
+class OwnerNonceAdmin(admin.ModelAdmin):
+    list_display = ('address', 'chain', 'next_nonce', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(OwnerTransaction)
+class OwnerTransactionAdmin(admin.ModelAdmin):
+    list_display = ('tx_hash', 'function', 'nonce', 'status', 'block_number', 'gas_used', 'sent_at', 'mined_at')
+    list_filter = ('status', 'function', 'chain')
+    search_fields = ('tx_hash',)
+    list_select_related = ('replaced_by',)
+    actions = ['speed_up']
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def speed_up(self, request, queryset):
+        from .tracker import OPEN, speed_up
+
+        sent = 0
+        for owner_tx in queryset.filter(status__in=OPEN, replaced_by__isnull=True):
+            try:
+                replacement = speed_up(owner_tx)
+                sent += 1
+            except Exception as e:
+                self.message_user(request, f"{owner_tx.tx_hash}: {e}", level='error')
+                continue
+            self.message_user(request, f"{owner_tx.tx_hash} re-sent as {replacement.tx_hash}")
+        self.message_user(request, f"{sent} transaction(s) re-sent with higher fees")
+    speed_up.short_description = "Re-send with higher fees (same nonce)"
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ChainTransaction)
+class ChainTransactionAdmin(admin.ModelAdmin):
+    list_display = ('tx_hash', 'chain', 'block_number', 'fetched_at')
+    list_filter = ('chain',)
+    search_fields = ('tx_hash',)
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CampaignSnapshot)
+class CampaignSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('contract_id', 'project', 'state', 'total_raised', 'milestones_released', 'block_number', 'fetched_at', 'error')
+    list_filter = ('state',)
+    search_fields = ('project__title',)
+    list_select_related = ('project',)
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,89 @@
+"""
+AsyncWeb3 client for concurrent contract reads.
+
+The sync client in contract.blockchain stays the default. Jobs with many
+independent reads (the snapshot sweep) can run them on this one instead:
+the chunks of a large batch, or every call when neither Multicall3 nor
+JSON-RPC batches are available, are in flight together, so a read costs
+about as long as its slowest request.
+
+run() drives coroutines on one event loop per thread, kept between calls,
+so the provider's aiohttp session and its keep-alive connections are
+reused from one sweep to the next.
+"""
+import asyncio
+import os
+import threading
+
+from decouple import config
+
+from .blockchain import (
+    ALCHEMY_HTTP, PROVIDER_CACHING, campaign_calls, campaign_results, registry,
+)
+
+_local = threading.local()
+
+
+def _build_async_w3():
+    from web3 import AsyncWeb3
+    return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(ALCHEMY_HTTP, **PROVIDER_CACHING))
+
+
+def _build_async_contract():
+    return registry.get("async_w3").eth.contract(
+        address=registry.get("contract_address"), abi=registry.get("contract_abi"),
+    )
+
+
+def _build_async_reader():
+    from .multicall import AsyncBatchReader, MULTICALL3_ADDRESS
+    return AsyncBatchReader(registry.get("async_w3"), config("MULTICALL3_ADDRESS", default=MULTICALL3_ADDRESS))
+
+
+registry.register("async_w3", _build_async_w3)
+registry.register("async_contract", _build_async_contract)
+registry.register("async_reader", _build_async_reader)
+
+
+def run(coro):
+    """Run `coro` to completion on this thread's event loop."""
+    loop = getattr(_local, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+def _reset_loop():
+    # the parent's loop (and its sockets) must not be shared with a forked child
+    _local.__dict__.pop('loop', None)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_loop)
+
+
+async def acampaigns_onchain(milestone_hints, campaign_contract=None, batch_reader=None, block_identifier='latest'):
+    """campaigns_onchain on the async client."""
+    functions = (campaign_contract or registry.get("async_contract")).functions
+    batch_reader = batch_reader or registry.get("async_reader")
+
+    calls, slots = campaign_calls(functions, milestone_hints)
+    results = await batch_reader.call(calls, allow_failure=True, block_identifier=block_identifier)
+    campaigns, missing = campaign_results(results, slots)
+
+    if missing:
+        extra = await batch_reader.call([functions.getMilestone(*key) for key in missing],
+                                        allow_failure=True, block_identifier=block_identifier)
+        for (contract_id, _), milestone in zip(missing, extra):
+            campaigns[contract_id][1].append(milestone)
+    return campaigns
+
+
+async def acampaigns_at_head(milestone_hints, campaign_contract=None, batch_reader=None):
+    """(block_number, campaigns) with every read pinned to the current block."""
+    client = (campaign_contract or registry.get("async_contract")).w3
+    # chain id goes into the provider's request cache here, before the chunks
+    # fan out and would each miss it at once
+    block_number, _ = await asyncio.gather(client.eth.block_number, client.eth.chain_id)
+    campaigns = await acampaigns_onchain(milestone_hints, campaign_contract, batch_reader, block_number)
+    return block_number, campaigns
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ContractConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contract'
+
+    def ready(self):
+        from django.conf import settings
+        if settings.CHAIN_WARM_UP:
+            # pay for web3 / ABI / contract objects at boot instead of on the first request
+            from .blockchain import warm_up
+            warm_up()
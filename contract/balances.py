@@ -0,0 +1,148 @@
+"""
+Token metadata and cached ERC20 balances for the admin dashboard.
+
+decimals() and symbol() never change, so they are read once per token (one
+batch for every token not cached yet) and kept in the Django cache without
+expiry. Balances are served from the cache: fresh for BALANCE_TTL seconds,
+then still served while a single background thread re-reads them, until
+BALANCE_MAX_STALE, after which the read happens inline again.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .blockchain import ALLOWED_TOKENS, CHAIN, erc20_contract, reader, usdc_token_address
+
+logger = logging.getLogger(__name__)
+
+TokenMeta = namedtuple('TokenMeta', ['address', 'symbol', 'decimals'])
+
+
+def _meta_key(token):
+    return f"token_meta_{CHAIN}_{token.lower()}"
+
+
+def _erc20(token, batch_reader):
+    # contracts bound to a caller-supplied reader's client, else the shared ones
+    return erc20_contract(token, None if batch_reader is None else batch_reader.client)
+
+
+def allowed_tokens():
+    """Configured tokens plus every ERC20 token a deployed campaign uses."""
+    from .models import CampaignSnapshot
+
+    tokens = {token.lower(): token for token in ALLOWED_TOKENS}
+    used = (CampaignSnapshot.objects.filter(currency_type=CampaignSnapshot.ERC20)
+            .values_list('token', flat=True).distinct())
+    for token in used:
+        tokens.setdefault(token.lower(), token)
+    return list(tokens.values())
+
+
+def token_metadata(tokens=None, batch_reader=None):
+    """{lowercase address: TokenMeta}; tokens not cached yet are read in one batch."""
+    tokens = allowed_tokens() if tokens is None else list(tokens)
+    keys = {_meta_key(token): token for token in tokens}
+    found = cache.get_many(keys)
+    missing = [token for key, token in keys.items() if key not in found]
+
+    if missing:
+        functions = []
+        for token in missing:
+            erc20 = _erc20(token, batch_reader)
+            functions += [erc20.functions.decimals(), erc20.functions.symbol()]
+        results = (batch_reader or reader).call(functions, allow_failure=True)
+
+        fetched = {}
+        for i, token in enumerate(missing):
+            decimals, symbol = results[2 * i], results[2 * i + 1]
+            if isinstance(decimals, Exception):
+                raise decimals
+            # a few old tokens return bytes32 or nothing for symbol()
+            symbol = '' if isinstance(symbol, Exception) else symbol
+            fetched[_meta_key(token)] = TokenMeta(token, symbol, decimals)
+        cache.set_many(fetched, timeout=None)
+        found.update(fetched)
+
+    return {meta.address.lower(): meta for meta in found.values()}
+
+
+class BalanceService:
+
+    def __init__(self, chain=CHAIN, ttl=None, max_stale=None, batch_reader=None):
+        self.chain = chain
+        self.ttl = settings.BALANCE_TTL if ttl is None else ttl
+        self.max_stale = settings.BALANCE_MAX_STALE if max_stale is None else max_stale
+        self.batch_reader = batch_reader
+        self.refreshes = 0
+
+    def _key(self, token, holder):
+        return f"balance_{self.chain}_{token.lower()}_{holder.lower()}"
+
+    def balances(self, holders, token=usdc_token_address):
+        """{holder: balance in whole tokens, rounded to 2 places} for `holders`."""
+        keys = {holder: self._key(token, holder) for holder in holders}
+        cached = cache.get_many(keys.values())
+        now = time.time()
+
+        result, stale, missing = {}, [], []
+        for holder, key in keys.items():
+            entry = cached.get(key)
+            age = None if entry is None else now - entry[1]
+            if age is None or age > self.max_stale:
+                missing.append(holder)
+                continue
+            result[holder] = entry[0]
+            if age > self.ttl:
+                stale.append(holder)
+
+        if missing:
+            result.update(self.refresh(token, missing))
+        if stale:
+            self.refresh_in_background(token, stale)
+        return result
+
+    def balance(self, holder, token=usdc_token_address):
+        return self.balances([holder], token)[holder]
+
+    def refresh(self, token, holders):
+        """Read balances of `holders` in one batch and cache them."""
+        decimals = token_metadata([token], self.batch_reader)[token.lower()].decimals
+        erc20 = _erc20(token, self.batch_reader)
+        raw = (self.batch_reader or reader).call([erc20.functions.balanceOf(holder) for holder in holders])
+
+        now = time.time()
+        balances = {holder: round(value / (10 ** decimals), 2) for holder, value in zip(holders, raw)}
+        cache.set_many({self._key(token, holder): (value, now) for holder, value in balances.items()},
+                       timeout=self.max_stale)
+        self.refreshes += 1
+        return balances
+
+    def refresh_in_background(self, token, holders):
+        """Start one refresh thread per token; does nothing while one is running."""
+        lock = f"balance_refresh_{self.chain}_{token.lower()}"
+        if not cache.add(lock, True, timeout=60):
+            return None
+
+        def run():
+            try:
+                self.refresh(token, holders)
+            except Exception:
+                # the cached values stay in place; past max_stale the next read retries inline
+                logger.exception("balance refresh failed for %s", token)
+            finally:
+                cache.delete(lock)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+@lru_cache
+def balance_service():
+    return BalanceService()
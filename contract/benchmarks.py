@@ -0,0 +1,159 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks run against a throw-away test database (never the configured one)
+with outgoing email disabled, and build Alchemy-shaped webhook payloads
+encoded against the real contract ABI.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import override_settings
+from eth_abi import encode
+from web3 import Web3
+
+
+@contextmanager
+def bench_database(verbosity=0):
+    """Create a scratch database for the duration of a benchmark."""
+    migration_modules = {app.label: None for app in apps.get_app_configs()}
+    old_name = connection.settings_dict['NAME']
+    tmp_dir = None
+    if connection.vendor == 'sqlite':
+        # a file (not :memory:) so worker threads share one database
+        tmp_dir = tempfile.mkdtemp(prefix='u4c-bench-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+
+    with override_settings(MIGRATION_MODULES=migration_modules), \
+            mock.patch('accounts.utils.send_email_in_thread'):
+        connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity)
+            if tmp_dir:
+                connection.settings_dict['TEST'].pop('NAME', None)
+
+
+def make_campaign(contract_id, goal=Decimal('1000000'), milestones=3, deployed=True, creator=None):
+    """
+    Project (with milestones) owned by a fresh organization. With deployed=False
+    it waits for its CampaignCreated event; `creator` adds the organization's wallet.
+    """
+    from accounts.models import User, Organization, Wallet
+    from projects.models import Project, Milestone
+
+    user = User.objects.create(email=f'org{contract_id}@bench.local', is_organization=True, is_active=True)
+    org = Organization.objects.create(
+        name=f'bench org {contract_id}', user=user, country='nigeria', address='bench', description='bench',
+    )
+    if creator:
+        user.wallets.add(Wallet.objects.create(address=creator))
+    project = Project.objects.create(
+        organization=org, title=f'bench campaign {contract_id}', goal=goal, country='nigeria',
+        address='bench', description='bench', summary='bench', approval_status=Project.APPROVED,
+        deployed=deployed, contract_id=contract_id if deployed else None, wallet_address=creator,
+    )
+    step = goal / milestones
+    Milestone.objects.bulk_create([
+        Milestone(
+            project=project, milestone_no=no, title=f'milestone {no}', details='bench',
+            percentage=int(100 * no / milestones), goal=step * no,
+            status=Milestone.ACTIVE if no == 1 else Milestone.NOT_STARTED,
+        )
+        for no in range(1, milestones + 1)
+    ])
+    return project
+
+
+def make_donor(index):
+    """Donor user with one wallet; returns the wallet address."""
+    from accounts.models import User, Donor, Wallet
+
+    address = Web3.to_checksum_address(f'0x{index + 1:040x}')
+    user = User.objects.create(email=f'donor{index}@bench.local', is_active=True)
+    Donor.objects.create(user=user, username=f'donor{index}', first_name='bench', last_name='donor')
+    wallet = Wallet.objects.create(address=address)
+    user.wallets.add(wallet)
+    return address
+
+
+def event_topic(name):
+    from .blockchain import CONTRACT_ABI
+    abi = next(item for item in CONTRACT_ABI if item.get('type') == 'event' and item['name'] == name)
+    signature = f"{name}({','.join(i['type'] for i in abi['inputs'])})"
+    return Web3.keccak(text=signature).to_0x_hex()
+
+
+def alchemy_log(name, args, tx_hash, log_index=0, sender=None):
+    """Raw Alchemy log for any contract event; `args` maps every ABI input name to its value."""
+    from .blockchain import CONTRACT_ABI, CONTRACT_ADDRESS
+    abi = next(item for item in CONTRACT_ABI if item.get('type') == 'event' and item['name'] == name)
+    topics, data_types, data_values = [event_topic(name)], [], []
+    for item in abi['inputs']:
+        if item['indexed']:
+            topics.append('0x' + encode([item['type']], [args[item['name']]]).hex())
+        else:
+            data_types.append(item['type'])
+            data_values.append(args[item['name']])
+    return {
+        'account': {'address': CONTRACT_ADDRESS},
+        'topics': topics,
+        'data': '0x' + encode(data_types, data_values).hex(),
+        'index': log_index,
+        'transaction': {
+            'hash': tx_hash,
+            'index': 0,
+            'from': {'address': sender},
+        },
+    }
+
+
+def pledged_log(campaign_id, donor, net_amount, tip=0, fee=0, tx_hash=None, log_index=0, sender=None):
+    """Raw Alchemy log for `Pledged(id, donor, netAmount, feeAmount, tipAmount)` (amounts in USDC units)."""
+    units = 10 ** 6
+    tx_hash = tx_hash or Web3.keccak(text=f'{campaign_id}:{donor}:{log_index}:{time.perf_counter_ns()}').to_0x_hex()
+    args = {'id': campaign_id, 'donor': donor, 'netAmount': int(net_amount * units),
+            'feeAmount': int(fee * units), 'tipAmount': int(tip * units)}
+    return alchemy_log('Pledged', args, tx_hash, log_index, sender or donor)
+
+
+def alchemy_payload(logs, block_number=1, network='MATIC_MAINNET'):
+    """Wrap raw logs into an Alchemy GraphQL webhook body."""
+    block_hash = Web3.keccak(text=f'block:{block_number}').to_0x_hex()
+    return {
+        'webhookId': 'wh_bench',
+        'id': f'whevt_{block_number}',
+        'type': 'GRAPHQL',
+        'event': {
+            'data': {'block': {'hash': block_hash, 'number': block_number, 'timestamp': 0, 'logs': logs}},
+            'sequenceNumber': str(block_number),
+            'network': network,
+        },
+    }
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(samples):
+    """p50 / p99 / mean (milliseconds) for a list of durations in seconds."""
+    if not samples:
+        return 'n/a'
+    return (
+        f"p50={percentile(samples, 50) * 1000:.2f}ms "
+        f"p99={percentile(samples, 99) * 1000:.2f}ms "
+        f"mean={statistics.fmean(samples) * 1000:.2f}ms"
+    )
@@ -1,68 +1,151 @@
-from web3 import Web3
 import json
-from decouple import config
+import logging
+from functools import lru_cache
+from pathlib import Path
+from decouple import config, Csv
+from django.db import DatabaseError, transaction
+from django.utils.functional import SimpleLazyObject
+from .clients import registry
+from .gas import DEFAULT_GAS, GasOracle
+from .nonces import NonceManager, is_nonce_error
+from .tracker import record_owner_tx
+
+logger = logging.getLogger(__name__)
 
 ALCHEMY_HTTP = config("ALCHEMY_HTTP")
 ALCHEMY_WS = config("ALCHEMY_WS")
 OWNER_PRIVATE_KEY = config("OWNER_PRIVATE_KEY")
-w3 = Web3(Web3.HTTPProvider(ALCHEMY_HTTP))
-# use wss if you need web socket event subscriptions: Web3(Web3.WebsocketProvider(ALCHEMY_WS))
+# network name used to key processed events (Alchemy naming)
+CHAIN = config("CHAIN", default="MATIC_AMOY" if config("TEST", cast=bool) else "MATIC_MAINNET")
+# chain id / network never change for an endpoint; caching them drops the
+# eth_chainId round trip web3's validation makes on every estimate and send
+PROVIDER_CACHING = {"cache_allowed_requests": True, "cacheable_requests": {"eth_chainId", "net_version"}}
+# ABI json file stored in the repo, next to this module
+CONTRACT_ABI_PATH = Path(__file__).resolve().parent / "contract.json"
 
-# Load ABI (store ABI json file in your repo)
-with open("contract/contract.json") as f:
-    CONTRACT_ABI = json.load(f)
+if config("TEST", cast=bool):
+    usdc_token_address = '0x41E94Eb019C0762f9Bfcf9Fb1E58725BfB0e7582'
+else:
+    usdc_token_address = '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359'
+# tokens the dashboards know about up front (campaign tokens are added from snapshots)
+ALLOWED_TOKENS = [usdc_token_address] + config("EXTRA_ALLOWED_TOKENS", default="", cast=Csv())
 
-CONTRACT_ADDRESS = Web3.to_checksum_address(config("CONTRACT_ADDRESS"))
-contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
 
-def owner_address():
-    return w3.eth.account.from_key(OWNER_PRIVATE_KEY).address
+# -------------------------
+# clients, built on first use (see contract.clients)
+# -------------------------
+def _build_gateway():
+    # coalescing, timeouts, retries, circuit breaker and metrics for every request
+    from .gateway import RpcGateway
+    return RpcGateway()
 
 
+def _build_w3():
+    from web3 import Web3
+    from .gateway import http_provider
+    # use wss if you need web socket event subscriptions: see contract.subscriber
+    return Web3(http_provider(ALCHEMY_HTTP, registry.get("gateway"), **PROVIDER_CACHING))
 
 
+def _build_contract_abi():
+    with open(CONTRACT_ABI_PATH) as f:
+        return json.load(f)
 
 
+def _build_event_decoders():
+    # topic0 -> decoder, compiled once from the ABI (see contract.events)
+    from .events import EventDecoders
+    return EventDecoders(registry.get("contract_abi"))
 
 
+def _build_contract_address():
+    from web3 import Web3
+    return Web3.to_checksum_address(config("CONTRACT_ADDRESS"))
 
 
-def send_owner_tx(txn_func, tx_args: dict | None = None):
-    """Signs & sends a tx from the owner account (Polygon)."""
-    from_addr = owner_address()
-    nonce = w3.eth.get_transaction_count(from_addr, "pending")
+def _build_contract():
+    return registry.get("w3").eth.contract(
+        address=registry.get("contract_address"), abi=registry.get("contract_abi"),
+    )
 
-    # Base transaction fields
-    base = {
-        "from": from_addr,
-        "nonce": nonce,
-        "gasPrice": w3.eth.gas_price,  # current gas price from provider
-        "chainId": getattr(w3.eth, "chain_id", 137),  # try provider chain_id, fallback to 137
-    }
-    if tx_args:
-        base.update(tx_args)
 
-    # Build tx
-    built = txn_func.build_transaction(base)
+def _build_reader():
+    # batched view calls (Multicall3, JSON-RPC batch fallback)
+    from .multicall import BatchReader, MULTICALL3_ADDRESS
+    return BatchReader(registry.get("w3"), config("MULTICALL3_ADDRESS", default=MULTICALL3_ADDRESS))
 
-    # Estimate gas and add buffer
-    try:
-        gas_estimate = w3.eth.estimate_gas(built)
-        gas_with_buffer = int(gas_estimate * 1.2)
-        built["gas"] = gas_with_buffer
-    except Exception as e:
-        # fallback default if estimate fails (adjust as needed)
-        gas_with_buffer = built.get("gas", 500_000)
-        built["gas"] = gas_with_buffer
-        print("Gas estimation failed, using fallback:", e)
-
-    print(f"Estimated gas: {gas_estimate if 'gas_estimate' in locals() else 'n/a'}, using: {built['gas']}")
-
-    # Sign transaction
+
+def _build_usdc_contract():
+    return erc20_contract(usdc_token_address)
+
+
+def erc20_contract(address, client=None):
+    """ERC20 contract object for `address`, one per token per process on the default client."""
+    if client is not None:
+        return client.eth.contract(address=client.to_checksum_address(address), abi=erc20_abi)
+    client = registry.get("w3")
+    address = client.to_checksum_address(address)
+    return registry.get(f"erc20:{address}", lambda: client.eth.contract(address=address, abi=erc20_abi))
+
+
+registry.register("gateway", _build_gateway)
+registry.register("w3", _build_w3)
+registry.register("contract_abi", _build_contract_abi)
+registry.register("event_decoders", _build_event_decoders)
+registry.register("contract_address", _build_contract_address)
+registry.register("contract", _build_contract)
+registry.register("reader", _build_reader)
+registry.register("usdc_contract", _build_usdc_contract)
+
+# proxies: importing them is free, the first attribute access builds the client
+w3 = SimpleLazyObject(lambda: registry.get("w3"))
+contract = SimpleLazyObject(lambda: registry.get("contract"))
+rpc_gateway = SimpleLazyObject(lambda: registry.get("gateway"))
+reader = SimpleLazyObject(lambda: registry.get("reader"))
+event_decoders = SimpleLazyObject(lambda: registry.get("event_decoders"))
+usdc_contract = SimpleLazyObject(lambda: registry.get("usdc_contract"))
+
+_LAZY_CONSTANTS = {"CONTRACT_ABI": "contract_abi", "CONTRACT_ADDRESS": "contract_address"}
+
+
+def __getattr__(name):
+    # CONTRACT_ABI / CONTRACT_ADDRESS are plain values, loaded when first imported or read
+    if name in _LAZY_CONSTANTS:
+        return registry.get(_LAZY_CONSTANTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def warm_up():
+    """Build every chain client now (web3 import, ABI load, contract objects)."""
+    return registry.warm_up()
+
+
+FEE_FIELDS = {"gasPrice", "maxFeePerGas", "maxPriorityFeePerGas"}
+
+
+@lru_cache(maxsize=None)
+def owner_account():
+    """Owner LocalAccount, derived from the key once per process."""
     if not OWNER_PRIVATE_KEY:
         raise RuntimeError("OWNER_PRIVATE_KEY is not set or is empty. Cannot sign transaction.")
-    signed = w3.eth.account.sign_transaction(built, private_key=OWNER_PRIVATE_KEY)
+    return w3.eth.account.from_key(OWNER_PRIVATE_KEY)
+
 
+def owner_address():
+    return owner_account().address
+
+
+@lru_cache(maxsize=None)
+def owner_nonces():
+    return NonceManager(owner_address(), CHAIN)
+
+
+@lru_cache(maxsize=None)
+def gas_oracle():
+    return GasOracle(CHAIN)
+
+
+def _raw_transaction(signed):
     # Robustly extract raw tx bytes (try multiple attribute/key names)
     raw_tx = None
     # common attribute names used by eth-account/web3 versions
@@ -83,10 +166,66 @@ def send_owner_tx(txn_func, tx_args: dict | None = None):
             "Could not find raw transaction on signed object. "
             f"Signed object type: {type(signed)}. Available attrs/keys: {dir(signed) if not isinstance(signed, dict) else list(signed.keys())}"
         )
+    return raw_tx
 
-    # Send raw transaction
-    tx_hash = w3.eth.send_raw_transaction(raw_tx)
-    return tx_hash.hex()
+
+def send_owner_tx(txn_func, tx_args: dict | None = None):
+    """
+    Signs & sends a tx from the owner account (Polygon).
+    Fees and gas limit come from the gas oracle, the nonce from the shared
+    OwnerNonce counter; a nonce conflict resyncs it from the chain and the tx
+    is signed and sent once more.
+    """
+    client = txn_func.w3
+    account = owner_account()
+    oracle = gas_oracle()
+    tx_args = tx_args or {}
+
+    # Base transaction fields
+    base = {
+        "from": account.address,
+        "chainId": client.eth.chain_id,
+    }
+    if not FEE_FIELDS & tx_args.keys():
+        base.update(oracle.fees(client))  # cached for GAS_PRICE_TTL
+    base.update(tx_args)
+
+    # Build tx; a placeholder gas keeps web3 from running its own estimate
+    built = txn_func.build_transaction({"gas": DEFAULT_GAS, **base})
+
+    # Gas limit from the selector's estimate history, estimating when needed
+    if "gas" not in tx_args:
+        built["gas"] = oracle.gas_limit(client, built)
+
+    logger.debug("using gas: %s", built["gas"])
+
+    # Nonce is reserved last so a failed build/estimate does not leave a gap
+    nonces = owner_nonces()
+    for attempt in range(2):
+        if "nonce" not in tx_args:
+            built["nonce"] = nonces.allocate(client)
+
+        # Sign transaction
+        raw_tx = _raw_transaction(account.sign_transaction(built))
+
+        # Send raw transaction
+        try:
+            tx_hash = client.eth.send_raw_transaction(raw_tx)
+        except Exception as e:
+            # the node rejected it, so the reserved nonce was not used
+            nonces.resync(client)
+            if attempt or not is_nonce_error(e) or "nonce" in tx_args:
+                raise
+            logger.warning("nonce conflict, resynced from chain: %s", e)
+            continue
+        # followed up by the receipt poller (contract.tracker); the tx is on its
+        # way already, so a failed write must not cost the caller its hash
+        try:
+            with transaction.atomic():
+                record_owner_tx(CHAIN, built, tx_hash.hex(), txn_func.fn_name)
+        except DatabaseError:
+            logger.exception("owner tx %s sent but not recorded", tx_hash.hex())
+        return tx_hash.hex()
 
 
 
@@ -105,58 +244,104 @@ erc20_abi = [
         "outputs": [{"name": "", "type": "uint8"}],
         "type": "function",
     },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"name": "", "type": "string"}],
+        "type": "function",
+    },
 ]
-if config("TEST", cast=bool):
-    usdc_token_address = '0x41E94Eb019C0762f9Bfcf9Fb1E58725BfB0e7582'
-else:
-    usdc_token_address = '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359'
 
-usdc_contract = w3.eth.contract(address=usdc_token_address, abi =erc20_abi)
 
+def campaign_calls(functions, milestone_hints):
+    """The getCampaign / getMilestone calls of campaigns_onchain, plus the slots to read them back."""
+    calls, slots = [], []
+    for contract_id, hint in milestone_hints.items():
+        calls.append(functions.getCampaign(contract_id))
+        calls += [functions.getMilestone(contract_id, i) for i in range(hint)]
+        slots.append((contract_id, hint))
+    return calls, slots
+
+
+def campaign_results(results, slots):
+    """{contract_id: (core, milestones)} from the batch results, and the (contract_id, index) still to read."""
+    campaigns, position, missing = {}, 0, []
+    for contract_id, hint in slots:
+        core, milestones = results[position], results[position + 1:position + 1 + hint]
+        position += 1 + hint
+        if not isinstance(core, Exception):
+            milestone_count = int(core[10])
+            milestones = milestones[:milestone_count]
+            missing += [(contract_id, i) for i in range(len(milestones), milestone_count)]
+        campaigns[contract_id] = (core, milestones)
+    return campaigns, missing
+
+
+def campaigns_onchain(milestone_hints, campaign_contract=None, batch_reader=None, block_identifier='latest'):
+    """
+    getCampaign plus every getMilestone for several campaigns, batched.
+    `milestone_hints` maps contract_id -> milestones expected (e.g. the local
+    Milestone count); those are read in the same batch as the campaigns and only
+    extra on-chain milestones cost another. Returns {contract_id: (core, milestones)}
+    where core is an exception instance if getCampaign failed and unreadable
+    milestones are exception instances.
+    """
+    functions = (campaign_contract or contract).functions
+    batch_reader = batch_reader or reader
+
+    calls, slots = campaign_calls(functions, milestone_hints)
+    results = batch_reader.call(calls, allow_failure=True, block_identifier=block_identifier)
+    campaigns, missing = campaign_results(results, slots)
+
+    if missing:
+        extra = batch_reader.call([functions.getMilestone(*key) for key in missing],
+                                  allow_failure=True, block_identifier=block_identifier)
+        for (contract_id, _), milestone in zip(missing, extra):
+            campaigns[contract_id][1].append(milestone)
+    return campaigns
+
+
+def campaign_onchain(contract_id, milestone_hint=0, campaign_contract=None, batch_reader=None):
+    """Single-campaign form of campaigns_onchain; raises if getCampaign fails."""
+    core, milestones = campaigns_onchain({contract_id: milestone_hint}, campaign_contract, batch_reader)[contract_id]
+    if isinstance(core, Exception):
+        raise core
+    return core, milestones
 
-def vault_bal():
-    # balance = w3.eth.get_balance(CONTRACT_ADDRESS)
-    # pol_balance = round(w3.from_wei(balance, 'ether'), 2)
 
-    raw_balance = usdc_contract.functions.balanceOf(CONTRACT_ADDRESS).call()
-    decimals = usdc_contract.functions.decimals().call()
-    usdc_balance = raw_balance / (10 ** decimals)
-    usdc_balance = round(usdc_balance, 2)
-    
-    return usdc_balance
+def vault_bal():
+    from .balances import balance_service
+    return balance_service().balance(registry.get("contract_address"))
 
 
 def platform_wallet_bal():
-    # # get balance in Wei
-    wallet = config("TREASURY_WALLET_ADDRESS")
-    # balance_wei = w3.eth.get_balance(wallet)
-    # pol = w3.from_wei(balance_wei, 'ether')
-
-    raw_balance = usdc_contract.functions.balanceOf(wallet).call()
-    decimals = usdc_contract.functions.decimals().call()
-    usdc = raw_balance / (10 ** decimals)
-
-    return round(usdc, 2)
+    from .balances import balance_service
+    return balance_service().balance(config("TREASURY_WALLET_ADDRESS"))
 
 
 def transaction_details(tx_hash: str):
+    """
+    Transaction fields plus receipt status for `tx_hash`, or None if the node
+    does not know it. Served from the transaction cache (contract.txcache).
+    """
+    from web3 import Web3
+    from .txcache import transaction_cache
 
     try:
-        tx_details = w3.eth.get_transaction(tx_hash)
-        if tx_details:
-            data = dict(tx_details)
-            
-            # Convert hex values to integers and Wei to MATIC for readability
-            # Some fields may be None if the transaction is pending
-            if data['blockNumber'] is not None:
-                data['blockNumber'] = w3.to_int(data['blockNumber'])
-            
-            data['gas'] = w3.to_int(data['gas'])
-            data['value_matic'] = w3.from_wei(data['value'], 'ether')
-            
-            return data
-        else:
-            return None
+        tx, receipt = transaction_cache().lookup(tx_hash)
     except Exception:
         return None
+    if tx is None:
+        return None
 
+    data = dict(tx)
+    # hex quantities to ints, Wei to MATIC; blockNumber is None while pending
+    data['blockNumber'] = int(tx['blockNumber'], 16) if tx.get('blockNumber') else None
+    data['gas'] = int(tx['gas'], 16)
+    data['nonce'] = int(tx['nonce'], 16)
+    data['value_matic'] = Web3.from_wei(int(tx['value'], 16), 'ether')
+    if receipt:
+        data['status'] = int(receipt['status'], 16)
+        data['gasUsed'] = int(receipt['gasUsed'], 16)
+    return data
@@ -0,0 +1,60 @@
+"""
+On-chain campaign id -> Project pk, kept per process.
+
+Every contract event names its campaign by contract_id. Resolving it via
+the unique contract_id index on each event costs a lookup query before
+the row is even read. Ids are assigned once, by CampaignCreated, so the
+mapping is kept in memory. The webhook drops an entry when it applies
+CampaignCreated, and callers check the row they read against the id, in
+case another process re-pointed it. Misses are one query per batch.
+Unknown ids are not remembered, so a campaign created elsewhere is
+picked up on its first event.
+"""
+import threading
+
+from projects.models import Project
+
+
+class CampaignPks:
+
+    def __init__(self):
+        self._pks = {}
+        self._lock = threading.Lock()
+
+    def get(self, contract_id):
+        """pk of the campaign's project; raises Project.DoesNotExist for unknown ids."""
+        try:
+            return self._pks[contract_id]
+        except KeyError:
+            pass
+        pks = self.get_many([contract_id])
+        if contract_id not in pks:
+            raise Project.DoesNotExist(f"no project for campaign {contract_id}")
+        return pks[contract_id]
+
+    def get_many(self, contract_ids):
+        """{contract_id: pk} for the known ids; the misses cost one query."""
+        found, missing = {}, []
+        for contract_id in contract_ids:
+            pk = self._pks.get(contract_id)
+            if pk is None:
+                missing.append(contract_id)
+            else:
+                found[contract_id] = pk
+        if missing:
+            rows = dict(Project.objects.filter(contract_id__in=missing).values_list('contract_id', 'pk'))
+            with self._lock:
+                self._pks.update(rows)
+            found.update(rows)
+        return found
+
+    def invalidate(self, *contract_ids):
+        """Forget the given ids (all of them if none are given)."""
+        with self._lock:
+            if not contract_ids:
+                self._pks.clear()
+            for contract_id in contract_ids:
+                self._pks.pop(contract_id, None)
+
+
+campaign_pks = CampaignPks()
@@ -0,0 +1,56 @@
+"""
+Per-process registry of chain clients, built on first use.
+
+Factories are registered by name (see contract.blockchain) and run once per
+process, under a lock, the first time the client is asked for. Importing the
+registry does not import web3 or read the ABI, so processes that never touch
+the chain do not pay for either. warm_up() builds everything up front for
+processes that will (webhook workers, pollers, or web servers with
+CHAIN_WARM_UP set). Built clients are dropped in forked children so every
+process gets its own HTTP connections.
+"""
+import os
+import threading
+
+
+class ClientRegistry:
+
+    def __init__(self):
+        self._factories = {}
+        self._clients = {}
+        # re-entrant: factories may ask for the clients they are built from
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def get(self, name, factory=None):
+        """The client called `name`; `factory` builds unregistered ones (e.g. one per token)."""
+        try:
+            return self._clients[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = (factory or self._factories[name])()
+            return self._clients[name]
+
+    def is_built(self, name):
+        return name in self._clients
+
+    def warm_up(self, names=None):
+        """Build the given clients (default: all registered) now rather than on first use."""
+        names = list(names or self._factories)
+        for name in names:
+            self.get(name)
+        return names
+
+    def reset(self):
+        with self._lock:
+            self._clients.clear()
+
+
+registry = ClientRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry.reset)
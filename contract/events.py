@@ -0,0 +1,158 @@
+"""
+Contract event decoders compiled once from the ABI (contract.json).
+
+EventDecoders maps topic0 to an EventDecoder per ABI event. Each decoder
+knows its record type (a namedtuple, so records are slotted tuples read by
+attribute) and how to turn every topic and data word into a value:
+static inputs are sliced out of the 32-byte words directly, and only
+events with dynamic data (strings, bytes, arrays) go through eth_abi.
+Addresses are checksummed like web3's process_log, through a shared cache
+since the same donors and creators come back block after block.
+
+decode_logs() decodes a whole block in one pass; a log that does not
+decode gets its error instead of a record, so it can be reported on its
+own.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from eth_abi import decode as abi_decode
+from eth_utils import keccak, to_checksum_address
+
+WORD = 32
+DYNAMIC = ('string', 'bytes')
+
+
+@lru_cache(maxsize=65536)
+def checksum(address):
+    return to_checksum_address(address)
+
+
+def event_signature(abi):
+    return f"{abi['name']}({','.join(item['type'] for item in abi['inputs'])})"
+
+
+def event_topic(abi):
+    return '0x' + keccak(text=event_signature(abi)).hex()
+
+
+def _is_dynamic(type_str):
+    return type_str in DYNAMIC or type_str.endswith(']')
+
+
+def _word_converter(type_str):
+    """Converter for one 32-byte word holding a static value of `type_str`."""
+    if type_str == 'address':
+        return lambda word: checksum('0x' + word[12:].hex())
+    if type_str == 'bool':
+        return lambda word: word[-1] != 0
+    if type_str.startswith('uint'):
+        return lambda word: int.from_bytes(word, 'big')
+    if type_str.startswith('int'):
+        return lambda word: int.from_bytes(word, 'big', signed=True)
+    if type_str.startswith('bytes'):
+        size = int(type_str[5:])
+        return lambda word: word[:size]
+    raise ValueError(f"unsupported static type {type_str}")
+
+
+def _value_converter(type_str):
+    """Post-processing of an eth_abi decoded value (addresses checksummed)."""
+    if type_str == 'address':
+        return checksum
+    return None
+
+
+class EventDecoder:
+
+    def __init__(self, abi):
+        self.name = abi['name']
+        self.topic = event_topic(abi)
+        inputs = abi['inputs']
+        self.record = namedtuple(self.name, [item['name'] for item in inputs])
+        self.indexed = []   # (field position, converter) per topic after topic0
+        self.data = []      # (field position, type) per data value
+        for position, item in enumerate(inputs):
+            if item['indexed']:
+                # indexed dynamic values are only their keccak hash: kept as bytes32
+                convert = _word_converter('bytes32' if _is_dynamic(item['type']) else item['type'])
+                self.indexed.append((position, convert))
+            else:
+                self.data.append((position, item['type']))
+        self.width = len(inputs)
+        self.static = not any(_is_dynamic(type_str) for _, type_str in self.data)
+        if self.static:
+            self.words = [(position, _word_converter(type_str)) for position, type_str in self.data]
+        else:
+            self.types = [type_str for _, type_str in self.data]
+            self.converters = [(position, _value_converter(type_str)) for position, type_str in self.data]
+
+    def decode(self, topics, data):
+        """Record for a log's topics (hex strings, topic0 included) and data (bytes)."""
+        if len(topics) != len(self.indexed) + 1:
+            raise ValueError(f"{self.name}: expected {len(self.indexed) + 1} topics, got {len(topics)}")
+        values = [None] * self.width
+        for (position, convert), topic in zip(self.indexed, topics[1:]):
+            values[position] = convert(bytes.fromhex(topic[2:]))
+
+        if self.static:
+            if len(data) < WORD * len(self.words):
+                raise ValueError(f"{self.name}: {len(data)} bytes of data, expected {WORD * len(self.words)}")
+            for offset, (position, convert) in enumerate(self.words):
+                values[position] = convert(data[offset * WORD:(offset + 1) * WORD])
+        else:
+            for (position, convert), value in zip(self.converters, abi_decode(self.types, data)):
+                values[position] = convert(value) if convert else value
+        return self.record._make(values)
+
+
+class EventDecoders:
+
+    def __init__(self, abi):
+        self.by_topic = {}
+        self.by_name = {}
+        for item in abi:
+            if item.get('type') != 'event' or item.get('anonymous'):
+                continue
+            decoder = EventDecoder(item)
+            self.by_topic[decoder.topic] = decoder
+            self.by_name[decoder.name] = decoder
+
+    def topics(self, names=None):
+        """topic0 of every event, or of the events called `names`."""
+        return [d.topic for d in self.by_name.values() if names is None or d.name in names]
+
+    def name(self, topic):
+        decoder = self.by_topic.get(topic.lower())
+        return decoder.name if decoder else None
+
+    def decode(self, web3_log):
+        """(event name, record) of a normalized log; (None, None) when topic0 is not a contract event."""
+        topics = web3_log.get('topics') or []
+        decoder = self.by_topic.get(topics[0].lower()) if topics else None
+        if decoder is None:
+            return None, None
+        data = web3_log.get('data') or '0x'
+        return decoder.name, decoder.decode(topics, bytes.fromhex(data[2:]))
+
+    def decode_logs(self, web3_logs, names=None):
+        """
+        Decode a block's normalized logs in one pass. Returns one
+        (event name, record, error) per log: name None for unknown topics
+        (or events not in `names`), record None and the exception when
+        the log does not decode.
+        """
+        by_topic = self.by_topic
+        decoded = []
+        for web3_log in web3_logs:
+            topics = web3_log.get('topics') or []
+            decoder = by_topic.get(topics[0].lower()) if topics else None
+            if decoder is None or (names is not None and decoder.name not in names):
+                decoded.append((None, None, None))
+                continue
+            data = web3_log.get('data') or '0x'
+            try:
+                decoded.append((decoder.name, decoder.decode(topics, bytes.fromhex(data[2:])), None))
+            except Exception as e:
+                decoded.append((decoder.name, None, e))
+        return decoded
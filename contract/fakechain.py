@@ -0,0 +1,606 @@
+"""
+In-memory stand-in for the Polygon JSON-RPC endpoint.
+
+FakeChain keeps blocks of MilestoneCrowdfund logs encoded against the real
+ABI. It can be used in-process through FakeChainProvider
+(`Web3(FakeChainProvider(chain))`) or served over HTTP with serve_http() for
+commands that take an --rpc-url. AsyncFakeChainProvider does the same for
+AsyncWeb3, waiting out the latency without blocking the event loop.
+FakeWsServer adds eth_subscribe("logs" / "newHeads") on top for the websocket subscriber.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils.abi import function_abi_to_4byte_selector, get_abi_input_types, get_abi_output_types
+from web3 import Web3
+from web3._utils.caching import async_handle_request_caching, handle_request_caching
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+
+from .blockchain import CONTRACT_ABI, CONTRACT_ADDRESS, erc20_abi
+from .multicall import MULTICALL3_ABI, MULTICALL3_ADDRESS
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeChain:
+    """Blocks of contract logs plus the handful of RPC methods the ingestion code uses."""
+
+    def __init__(self, address=CONTRACT_ADDRESS, chain_id=137, max_block_range=None, max_results=10_000,
+                 latency=0.0, gas_price=30 * 10 ** 9, multicall=True):
+        self.address = Web3.to_checksum_address(address)
+        self.chain_id = chain_id
+        # seconds added to every round trip (a JSON-RPC batch is one), to stand in for the provider
+        self.latency = latency
+        # provider trouble: every round trip fails while down (after down_latency
+        # seconds, like a timeout), otherwise a fail_rate share of them fails
+        self.down = False
+        self.down_latency = 0.0
+        self.fail_rate = 0.0
+        self.gas_price = gas_price
+        self.calls = 0
+        self.round_trips = 0
+        # eth_call results: (address, function name, args) -> outputs, see set_view()
+        self.views = {}
+        self.multicall = multicall
+        self._functions = {}
+        for contract_address, abi in ((self.address, CONTRACT_ABI), (MULTICALL3_ADDRESS, MULTICALL3_ABI)):
+            for item in abi:
+                if item.get('type') == 'function':
+                    selector = '0x' + function_abi_to_4byte_selector(item).hex()
+                    self._functions[(contract_address.lower(), selector)] = item
+        self.nonces = {}        # sender (lowercase) -> next nonce
+        self.transactions = {}  # tx hash -> {'from', 'nonce', 'fee', 'raw', 'block', ...}
+        # mimic provider limits so callers have to adapt their ranges
+        self.max_block_range = max_block_range
+        self.max_results = max_results
+        self.blocks = [[]]  # genesis
+        # bumped by reorg(): blocks mined afterwards get other hashes
+        self.fork = 0
+        self.lock = threading.Lock()
+        self.listeners = []
+        self._events = {
+            item['name']: item for item in CONTRACT_ABI if item.get('type') == 'event'
+        }
+
+    # -------------------------
+    # chain state
+    # -------------------------
+    @property
+    def head(self):
+        return len(self.blocks) - 1
+
+    def topic(self, name):
+        abi = self._events[name]
+        signature = f"{name}({','.join(i['type'] for i in abi['inputs'])})"
+        return Web3.keccak(text=signature).to_0x_hex()
+
+    def block_hash(self, number):
+        return Web3.keccak(text=f'block:{number}' + (f':{self.fork}' if self.fork else '')).to_0x_hex()
+
+    def encode_log(self, name, args, block_number, log_index, tx_hash):
+        abi = self._events[name]
+        topics = [self.topic(name)]
+        data_types, data_values = [], []
+        for item in abi['inputs']:
+            if item['indexed']:
+                topics.append('0x' + encode([item['type']], [args[item['name']]]).hex())
+            else:
+                data_types.append(item['type'])
+                data_values.append(args[item['name']])
+        return {
+            'address': self.address,
+            'topics': topics,
+            'data': '0x' + encode(data_types, data_values).hex(),
+            'blockNumber': hex(block_number),
+            'blockHash': self.block_hash(block_number),
+            'transactionHash': tx_hash,
+            'transactionIndex': hex(log_index),
+            'logIndex': hex(log_index),
+            'removed': False,
+        }
+
+    def mine(self, events=()):
+        """Append a block holding `events` ([(name, args), ...]); returns its number."""
+        with self.lock:
+            number = len(self.blocks)
+            logs = []
+            for index, (name, args) in enumerate(events):
+                tx_hash = Web3.keccak(text=f'tx:{number}:{index}' + (f':{self.fork}' if self.fork else '')).to_0x_hex()
+                logs.append(self.encode_log(name, args, number, index, tx_hash))
+            self.blocks.append(logs)
+        for listener in list(self.listeners):
+            listener(number, logs)
+        return number
+
+    def reorg(self, depth):
+        """Drop the last `depth` blocks; subscribers get their logs again with removed=True."""
+        with self.lock:
+            dropped = self.blocks[len(self.blocks) - depth:]
+            del self.blocks[len(self.blocks) - depth:]
+            self.fork += 1
+        removed = [dict(log, removed=True) for logs in dropped for log in logs]
+        for listener in list(self.listeners):
+            listener(None, removed)
+
+    # -------------------------
+    # JSON-RPC
+    # -------------------------
+    def get_logs(self, params):
+        head = self.head
+        from_block = self._block_param(params.get('fromBlock', 'latest'), head)
+        to_block = self._block_param(params.get('toBlock', 'latest'), head)
+        if self.max_block_range and to_block - from_block + 1 > self.max_block_range:
+            raise RpcError(-32600, f"block range too large, max is {self.max_block_range}")
+
+        matches = self.log_filter(params)
+        result = []
+        for number in range(max(from_block, 0), min(to_block, head) + 1):
+            result += [log for log in self.blocks[number] if matches(log)]
+            if len(result) > self.max_results:
+                raise RpcError(-32005, f"query returned more than {self.max_results} results")
+        return result
+
+    @staticmethod
+    def log_filter(params):
+        """Predicate for the address / topic0 part of a log filter."""
+        address = params.get('address')
+        addresses = {a.lower() for a in ([address] if isinstance(address, str) else address or [])}
+        topics = params.get('topics') or []
+        wanted = topics[0] if topics else None
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        wanted = {t.lower() for t in wanted} if wanted else None
+
+        def matches(log):
+            if addresses and log['address'].lower() not in addresses:
+                return False
+            return not wanted or log['topics'][0] in wanted
+        return matches
+
+    def _block_param(self, value, head):
+        if value in ('latest', 'safe', 'finalized', 'pending'):
+            return head
+        if value == 'earliest':
+            return 0
+        return int(value, 16) if isinstance(value, str) else int(value)
+
+    def send_raw_transaction(self, raw):
+        raw = bytes.fromhex(raw[2:] if raw.startswith('0x') else raw)
+        fields = self._decode_raw(raw)
+        nonce, fee = fields['nonce'], fields['fee']
+        sender = Account.recover_transaction(raw).lower()
+        tx_hash = Web3.keccak(raw).to_0x_hex()
+        with self.lock:
+            if tx_hash in self.transactions:
+                raise RpcError(-32000, 'already known')
+            same_nonce = [h for h, tx in self.transactions.items()
+                          if tx['from'] == sender and tx['nonce'] == nonce]
+            if same_nonce:
+                # replace-by-fee, as long as the one it replaces is still in the mempool
+                old = self.transactions[same_nonce[0]]
+                if old['block'] is not None:
+                    raise RpcError(-32000, f"nonce too low: tx nonce {nonce} already mined")
+                if fee < old['fee'] * 1.1:
+                    raise RpcError(-32000, 'replacement transaction underpriced')
+                del self.transactions[same_nonce[0]]
+            else:
+                expected = self.nonces.get(sender, 0)
+                if nonce < expected:
+                    raise RpcError(-32000, f"nonce too low: next nonce {expected}, tx nonce {nonce}")
+                # future nonces wait in the queue until the gap is filled, like a real mempool
+                used = {tx['nonce'] for tx in self.transactions.values() if tx['from'] == sender} | {nonce}
+                while expected in used:
+                    expected += 1
+                self.nonces[sender] = expected
+            self.transactions[tx_hash] = {'from': sender, 'nonce': nonce, 'fee': fee, 'raw': raw, 'block': None}
+        return tx_hash
+
+    @staticmethod
+    def _decode_raw(raw):
+        # typed (EIP-2718) envelopes start with the type byte, then
+        # [chainId, nonce, tip, maxFee, gas, to, value, data, ...]; legacy ones are [nonce, gasPrice, gas, ...]
+        if raw[0] < 0x80:
+            fields = rlp.decode(raw[1:])
+            nonce, fee, gas, to, value, data = fields[1], fields[3], fields[4], fields[5], fields[6], fields[7]
+        else:
+            fields = rlp.decode(raw)
+            nonce, fee, gas, to, value, data = fields[0], fields[1], fields[2], fields[3], fields[4], fields[5]
+        number = lambda b: int.from_bytes(b, 'big')
+        return {'nonce': number(nonce), 'fee': number(fee), 'gas': number(gas),
+                'to': '0x' + to.hex() if to else None, 'value': number(value), 'data': '0x' + data.hex()}
+
+    def transaction(self, tx_hash):
+        tx = self.transactions.get(tx_hash.lower())
+        if tx is None:
+            return None
+        fields = self._decode_raw(tx['raw'])
+        mined = tx['block'] is not None
+        return {
+            'hash': tx_hash.lower(),
+            'from': tx['from'],
+            'to': fields['to'],
+            'nonce': hex(fields['nonce']),
+            'gas': hex(fields['gas']),
+            'gasPrice': hex(fields['fee']),
+            'value': hex(fields['value']),
+            'input': fields['data'],
+            'blockNumber': hex(tx['block']) if mined else None,
+            'blockHash': self.block_hash(tx['block']) if mined else None,
+            'transactionIndex': hex(tx['index']) if mined else None,
+            'chainId': hex(self.chain_id),
+        }
+
+    def mine_transactions(self, min_fee=0, status=1, gas_used=60_000):
+        """
+        Mine a block with every sent transaction that is ready (no nonce gap)
+        and pays at least `min_fee`; returns the block number.
+        """
+        with self.lock:
+            number = len(self.blocks)
+            included, blocked = 0, set()
+            for tx in sorted(self.transactions.values(), key=lambda tx: tx['nonce']):
+                if tx['block'] is not None:
+                    continue
+                # an underpriced or queued transaction holds back the sender's later nonces
+                if tx['from'] in blocked or tx['nonce'] >= self.nonces.get(tx['from'], 0) or tx['fee'] < min_fee:
+                    blocked.add(tx['from'])
+                    continue
+                tx.update(block=number, index=included, status=status, gas_used=gas_used)
+                included += 1
+            self.blocks.append([])
+        for listener in list(self.listeners):
+            listener(number, [])
+        return number
+
+    def receipt(self, tx_hash):
+        tx = self.transactions.get(tx_hash.lower())
+        if tx is None or tx['block'] is None:
+            return None
+        return {
+            'transactionHash': tx_hash.lower(),
+            'transactionIndex': hex(tx['index']),
+            'blockNumber': hex(tx['block']),
+            'blockHash': self.block_hash(tx['block']),
+            'from': tx['from'],
+            'to': self.address.lower(),
+            'status': hex(tx['status']),
+            'gasUsed': hex(tx['gas_used']),
+            'cumulativeGasUsed': hex(tx['gas_used'] * (tx['index'] + 1)),
+            'effectiveGasPrice': hex(tx['fee']),
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'type': '0x2',
+        }
+
+    def set_view(self, name, args, result, address=None):
+        """Make eth_call of `name(*args)` return `result` (the decoded outputs, as .call() would)."""
+        self.views[((address or self.address).lower(), name, tuple(args))] = result
+
+    def add_token(self, address, symbol='USDC', decimals=6, balances=None):
+        """Serve an ERC20 at `address`: decimals(), symbol() and balanceOf() for `balances` {holder: raw}."""
+        for item in erc20_abi:
+            selector = '0x' + function_abi_to_4byte_selector(item).hex()
+            self._functions[(address.lower(), selector)] = item
+        self.set_view('decimals', [], decimals, address=address)
+        self.set_view('symbol', [], symbol, address=address)
+        for holder, raw in (balances or {}).items():
+            self.set_view('balanceOf', [Web3.to_checksum_address(holder)], raw, address=address)
+
+    def add_campaign(self, contract_id, goal=1_000_000 * 10 ** 6, raised=0, milestones=3,
+                     creator='0x' + 'ab' * 20, deadline=1_900_000_000, state=0):
+        """Register getCampaign / getMilestone views for an ERC20 campaign."""
+        token = '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359'
+        self.set_view('getCampaign', [contract_id], (
+            Web3.to_checksum_address(creator), 1, token, goal, raised, 0, deadline, state,
+            '', f'offchain-{contract_id}', milestones, 0, 0,
+        ))
+        for i in range(milestones):
+            self.set_view('getMilestone', [contract_id, i], (f'milestone {i + 1}', 10_000 // milestones, False, False))
+
+    def code(self, address):
+        """Runtime code stand-in: non-empty for the contract, and for multicall when it is deployed."""
+        address = address.lower()
+        if address == self.address.lower() or (self.multicall and address == MULTICALL3_ADDRESS.lower()):
+            return '0x6080'
+        return '0x'
+
+    def eth_call(self, to, data):
+        """Returns (success, return data bytes) for a call to a known view."""
+        data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+        abi = self._functions.get((to.lower(), '0x' + data[:4].hex()))
+        if abi is None:
+            return False, b''
+        args = decode(get_abi_input_types(abi), data[4:])
+
+        if abi['name'] == 'aggregate3' and to.lower() == MULTICALL3_ADDRESS.lower():
+            if not self.multicall:
+                return False, b''
+            results = []
+            for target, allow_failure, call_data in args[0]:
+                success, returned = self.eth_call(target, call_data)
+                if not success and not allow_failure:
+                    return False, b''
+                results.append((success, returned))
+            return True, encode(get_abi_output_types(abi), [results])
+
+        key = (to.lower(), abi['name'], tuple(args))
+        if key not in self.views:
+            return False, b''
+        outputs = get_abi_output_types(abi)
+        result = self.views[key]
+        return True, encode(outputs, [result] if len(outputs) == 1 else list(result))
+
+    def handle(self, method, params):
+        if method == 'eth_chainId':
+            return hex(self.chain_id)
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'eth_getLogs':
+            return self.get_logs(params[0])
+        if method == 'eth_gasPrice':
+            return hex(self.gas_price)
+        if method == 'eth_getCode':
+            return self.code(params[0])
+        if method == 'eth_call':
+            success, returned = self.eth_call(params[0]['to'], params[0].get('data') or params[0].get('input'))
+            if not success:
+                raise RpcError(3, 'execution reverted')
+            return '0x' + returned.hex()
+        if method == 'eth_maxPriorityFeePerGas':
+            return hex(self.gas_price // 2)
+        if method == 'eth_feeHistory':
+            return {
+                'oldestBlock': hex(self.head),
+                'baseFeePerGas': [hex(self.gas_price // 2)] * 2,
+                'gasUsedRatio': [0.5],
+                'reward': [[hex(self.gas_price // 2)]],
+            }
+        if method == 'eth_estimateGas':
+            return hex(60_000)
+        if method == 'eth_getTransactionCount':
+            return hex(self.nonces.get(params[0].lower(), 0))
+        if method == 'eth_sendRawTransaction':
+            return self.send_raw_transaction(params[0])
+        if method == 'eth_getTransactionReceipt':
+            return self.receipt(params[0])
+        if method == 'eth_getTransactionByHash':
+            return self.transaction(params[0])
+        if method == 'net_version':
+            return str(self.chain_id)
+        raise RpcError(-32601, f"method {method} not supported by FakeChain")
+
+    def rpc(self, request):
+        """Answer one JSON-RPC request dict (one round trip)."""
+        self._round_trip()
+        return self._answer(request)
+
+    def rpc_batch(self, requests):
+        """Answer a JSON-RPC batch in a single round trip."""
+        self._round_trip()
+        return [self._answer(request) for request in requests]
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.down:
+            time.sleep(self.down_latency)
+            raise ConnectionError('FakeChain is down')
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError('FakeChain dropped the connection')
+
+    async def arpc(self, request):
+        await self._async_round_trip()
+        return self._answer(request)
+
+    async def arpc_batch(self, requests):
+        await self._async_round_trip()
+        return [self._answer(request) for request in requests]
+
+    async def _async_round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _answer(self, request):
+        self.calls += 1
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            response['result'] = self.handle(request['method'], request.get('params') or [])
+        except RpcError as e:
+            response['error'] = {'code': e.code, 'message': e.message}
+        return response
+
+
+class FakeChainProvider(JSONBaseProvider):
+    """web3 provider answering from a FakeChain in the same process."""
+
+    def __init__(self, chain, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain
+
+    def _request(self, method, params):
+        # through JSON like the HTTP provider, so bytes/HexBytes params are encoded the same way
+        return json.loads(self.encode_rpc_request(method, params))
+
+    @handle_request_caching
+    def make_request(self, method, params):
+        return self.chain.rpc(self._request(method, params))
+
+    def make_batch_request(self, requests):
+        return self.chain.rpc_batch([self._request(method, params) for method, params in requests])
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+
+class AsyncFakeChainProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider answering from a FakeChain in the same process."""
+
+    def __init__(self, chain, **kwargs):
+        super().__init__(**kwargs)
+        self.chain = chain
+
+    def _request(self, method, params):
+        return json.loads(self.encode_rpc_request(method, params))
+
+    @async_handle_request_caching
+    async def make_request(self, method, params):
+        return await self.chain.arpc(self._request(method, params))
+
+    async def make_batch_request(self, requests):
+        return await self.chain.arpc_batch([self._request(method, params) for method, params in requests])
+
+    async def is_connected(self, show_traceback=False):
+        return True
+
+
+def serve_http(chain, host='127.0.0.1', port=8545):
+    """Serve `chain` as a JSON-RPC endpoint (single and batch requests). Blocks."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if isinstance(body, list):
+                result = chain.rpc_batch(body)
+            else:
+                result = chain.rpc(body)
+            payload = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class FakeWsServer:
+    """
+    Websocket JSON-RPC endpoint for a FakeChain with eth_subscribe("logs") and
+    ("newHeads"); a block's logs are pushed before its head.
+    Runs its own event loop in a background thread; drop() closes every open
+    connection so reconnect handling can be exercised.
+    """
+
+    def __init__(self, chain, host='127.0.0.1', port=8546):
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.connections = set()
+        self.loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='fake-ws', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop and self._server:
+            self.loop.call_soon_threadsafe(self._server.close)
+            self._thread.join(timeout=5)
+
+    def drop(self):
+        """Close all client connections (the server keeps accepting new ones)."""
+        for connection in list(self.connections):
+            asyncio.run_coroutine_threadsafe(connection.close(), self.loop)
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        from websockets.asyncio.server import serve
+
+        self.loop = asyncio.get_running_loop()
+        async with serve(self._handle, self.host, self.port) as server:
+            self._server = server
+            self._ready.set()
+            await server.wait_closed()
+
+    async def _handle(self, connection):
+        from websockets.exceptions import ConnectionClosed
+
+        self.connections.add(connection)
+        subscriptions = {}
+        blocks = asyncio.Queue()
+
+        def on_block(number, logs):
+            self.loop.call_soon_threadsafe(blocks.put_nowait, (number, logs))
+
+        async def push(sub_id, result):
+            await connection.send(json.dumps({
+                'jsonrpc': '2.0',
+                'method': 'eth_subscription',
+                'params': {'subscription': sub_id, 'result': result},
+            }))
+
+        async def notify():
+            while True:
+                number, logs = await blocks.get()
+                for log in logs:
+                    for sub_id, matches in list(subscriptions.items()):
+                        if matches is not None and matches(log):
+                            await push(sub_id, log)
+                if number is None:
+                    continue
+                for sub_id, matches in list(subscriptions.items()):
+                    if matches is None:
+                        await push(sub_id, {'number': hex(number), 'hash': self.chain.block_hash(number)})
+
+        self.chain.listeners.append(on_block)
+        notifier = asyncio.create_task(notify())
+        try:
+            async for message in connection:
+                request = json.loads(message)
+                method, params = request.get('method'), request.get('params') or []
+                response = {'jsonrpc': '2.0', 'id': request.get('id')}
+                if method == 'eth_subscribe':
+                    if params[0] not in ('logs', 'newHeads'):
+                        response['error'] = {'code': -32601, 'message': f"{params[0]} subscriptions not supported"}
+                    else:
+                        sub_id = hex(len(subscriptions) + 1 + id(connection) % 10 ** 6)
+                        # None marks a newHeads subscription
+                        subscriptions[sub_id] = (
+                            self.chain.log_filter(params[1] if len(params) > 1 else {}) if params[0] == 'logs' else None
+                        )
+                        response['result'] = sub_id
+                elif method == 'eth_unsubscribe':
+                    response['result'] = subscriptions.pop(params[0], None) is not None
+                else:
+                    response = self.chain.rpc(request)
+                await connection.send(json.dumps(response))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.chain.listeners.remove(on_block)
+            notifier.cancel()
+            self.connections.discard(connection)
@@ -0,0 +1,121 @@
+"""
+Gas price and gas limit for owner transactions.
+
+Fees are fetched at most once per GAS_PRICE_TTL and shared through the Django
+cache. Gas limits come from a per-function-selector history of estimates:
+once a selector (finalize, approveMilestone, haltCampaign, ...) has enough
+samples, the largest recent one plus a buffer is used instead of calling
+eth_estimateGas. Note that a skipped estimate also skips the early revert
+check it gives, the same as the existing fallback path.
+"""
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAS = 500_000
+
+
+class GasOracle:
+
+    def __init__(self, chain, price_ttl=None, eip1559=None, buffer=1.2,
+                 min_samples=3, max_samples=20, refresh_every=25, reuse_estimates=True):
+        self.chain = chain
+        self.price_ttl = settings.GAS_PRICE_TTL if price_ttl is None else price_ttl
+        self.eip1559 = settings.GAS_EIP1559 if eip1559 is None else eip1559
+        self.buffer = buffer
+        # history is trusted once it holds min_samples; every refresh_every-th
+        # use still estimates so the history follows contract changes
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.refresh_every = refresh_every
+        self.reuse_estimates = reuse_estimates
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    # -------------------------
+    # fees
+    # -------------------------
+    def fees(self, client):
+        """Fee fields for a transaction: gasPrice, or maxFeePerGas + maxPriorityFeePerGas."""
+        cache_key = f"gas_fees_{self.chain}_{'1559' if self.eip1559 else 'legacy'}"
+        fees = cache.get(cache_key) if self.price_ttl else None
+        if fees is not None:
+            self._count('fees_hit')
+            return dict(fees)
+
+        self._count('fees_miss')
+        if self.eip1559:
+            # one call gives the next block's base fee and a median tip
+            history = client.eth.fee_history(1, 'latest', [50])
+            priority = history['reward'][0][0]
+            fees = {
+                'maxPriorityFeePerGas': priority,
+                'maxFeePerGas': 2 * history['baseFeePerGas'][-1] + priority,
+            }
+        else:
+            fees = {'gasPrice': client.eth.gas_price}
+        if self.price_ttl:
+            cache.set(cache_key, fees, self.price_ttl)
+        return dict(fees)
+
+    # -------------------------
+    # gas limit
+    # -------------------------
+    def _history_key(self, tx):
+        selector = (tx.get('data') or '0x')[:10]
+        return f"gas_estimates_{self.chain}_{str(tx.get('to', '')).lower()}_{selector}"
+
+    def record(self, tx, gas):
+        """Add an estimate (or a receipt's gasUsed) to the selector's history."""
+        key = self._history_key(tx)
+        samples = (cache.get(key) or [])[-(self.max_samples - 1):] + [int(gas)]
+        cache.set(key, samples, None)
+        return samples
+
+    def gas_limit(self, client, tx):
+        """Gas limit for a built transaction (estimate RPC only for unknown or stale selectors)."""
+        key = self._history_key(tx)
+        samples = cache.get(key) or []
+        uses = self._bump(f"{key}_uses")
+        refresh = self.refresh_every and uses % self.refresh_every == 0
+        if self.reuse_estimates and len(samples) >= self.min_samples and not refresh:
+            self._count('estimate_hit')
+            return int(max(samples) * self.buffer)
+
+        self._count('estimate_miss')
+        try:
+            estimate = client.eth.estimate_gas({k: v for k, v in tx.items() if k not in ('gas', 'nonce')})
+        except Exception as e:
+            # fallback: what this selector needed before, else the old default
+            self._count('estimate_error')
+            logger.warning("gas estimation failed, using fallback: %s", e)
+            return int(max(samples) * self.buffer) if samples else DEFAULT_GAS
+        self.record(tx, estimate)
+        return int(estimate * self.buffer)
+
+    def _bump(self, key):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+            return 1
+
+    # -------------------------
+    # reporting
+    # -------------------------
+    def stats(self):
+        """Per-process counters plus hit rates for fees and estimates."""
+        counts = dict(self.counts)
+        for kind in ('fees', 'estimate'):
+            hits, misses = counts.get(f'{kind}_hit', 0), counts.get(f'{kind}_miss', 0)
+            counts[f'{kind}_hit_rate'] = hits / (hits + misses) if hits + misses else None
+        return counts
@@ -0,0 +1,276 @@
+"""
+One gateway for every JSON-RPC request the sync web3 client makes.
+
+GatewayHTTPProvider hands each request to an RpcGateway, which
+- coalesces identical concurrent reads: one request goes out, the other
+  callers wait for its response (single flight);
+- gives each method its own timeout (RPC_TIMEOUTS, default RPC_TIMEOUT);
+- retries transport failures of reads with full-jitter exponential backoff;
+- counts failures in a circuit breaker. After RPC_BREAKER_THRESHOLD failures
+  in a row it opens: requests fail fast with RpcUnavailable, or get the last
+  good response for the same read, until a probe after RPC_BREAKER_RESET
+  seconds succeeds;
+- keeps per-method call / error / retry counts and latency percentiles
+  (stats()).
+
+JSON-RPC error responses (reverts, range limits) are answers, not provider
+failures, and pass through untouched. Sends are never retried: a send that
+timed out may still have reached the node.
+"""
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from django.conf import settings
+
+# reads that are safe to share between callers and to answer from the last good response
+COALESCE = {
+    'eth_blockNumber', 'eth_call', 'eth_chainId', 'eth_feeHistory', 'eth_gasPrice', 'eth_getBalance',
+    'eth_getBlockByNumber', 'eth_getCode', 'eth_getLogs', 'eth_getTransactionByHash',
+    'eth_getTransactionReceipt', 'eth_maxPriorityFeePerGas', 'net_version',
+}
+# never sent twice by the gateway
+NO_RETRY = {'eth_sendRawTransaction', 'eth_sendTransaction'}
+
+_request = threading.local()
+
+
+def current_timeout():
+    """Timeout of the request being made on this thread, for the provider."""
+    return getattr(_request, 'timeout', None)
+
+
+class RpcUnavailable(Exception):
+    """The circuit breaker is open and there is no cached response to serve."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold, reset_after, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.probing else 'open'
+
+    def allow(self):
+        """True if a request may go out; after reset_after one probe is let through."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self.probing and self.clock() - self.opened_at >= self.reset_after:
+                self.probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self.probing = False
+
+
+class _Flight:
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class MethodStats:
+
+    def __init__(self, samples=1000):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=samples)
+
+    def as_dict(self):
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2) if ordered else None
+        return {
+            'calls': self.calls, 'errors': self.errors, 'retries': self.retries, 'coalesced': self.coalesced,
+            'stale': self.stale, 'rejected': self.rejected, 'p50_ms': pct(50), 'p99_ms': pct(99),
+        }
+
+
+class RpcGateway:
+
+    def __init__(self, timeout=None, timeouts=None, retries=None, backoff=0.2,
+                 breaker_threshold=None, breaker_reset=None, stale_size=2048):
+        self.timeout = settings.RPC_TIMEOUT if timeout is None else timeout
+        self.timeouts = settings.RPC_TIMEOUTS if timeouts is None else timeouts
+        self.retries = settings.RPC_RETRIES if retries is None else retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(
+            settings.RPC_BREAKER_THRESHOLD if breaker_threshold is None else breaker_threshold,
+            settings.RPC_BREAKER_RESET if breaker_reset is None else breaker_reset,
+        )
+        self.stale_size = stale_size
+        self._stale = OrderedDict()  # request key -> last good response
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = defaultdict(MethodStats)
+
+    # -------------------------
+    # requests
+    # -------------------------
+    def call(self, method, params, make_request):
+        """make_request(method, params) through coalescing, timeout, retries and the breaker."""
+        if method not in COALESCE:
+            return self._call(method, params, make_request, None)
+
+        key = method + json.dumps(params, sort_keys=True, default=str)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader and flight.owner == threading.get_ident():
+            # the provider re-entering for the request it is making (web3's request
+            # caching asks for eth_chainId from inside eth_chainId)
+            return self._call(method, params, make_request, key)
+        if not leader:
+            self._stats[method].coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        try:
+            flight.response = self._call(method, params, make_request, key)
+            return flight.response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def call_batch(self, requests, make_batch_request):
+        """A JSON-RPC batch: one request as far as timeouts, retries and the breaker are concerned."""
+        methods = {method for method, _ in requests}
+        retries = 0 if methods & NO_RETRY else self.retries
+        timeout = max((self.timeout_for(method) for method in methods), default=self.timeout)
+        return self._attempt('batch', lambda: make_batch_request(requests), timeout, retries, None)
+
+    def _call(self, method, params, make_request, key):
+        retries = 0 if method in NO_RETRY else self.retries
+        response = self._attempt(method, lambda: make_request(method, params), self.timeout_for(method), retries, key)
+        if key is not None and 'error' not in response:
+            self._remember(key, response)
+        return response
+
+    def _attempt(self, method, request, timeout, retries, key):
+        stats = self._stats[method]
+        for attempt in range(retries + 1):
+            if not self.breaker.allow():
+                return self._fail_fast(method, key, None)
+            stats.calls += 1
+            start = time.perf_counter()
+            _request.timeout = timeout
+            try:
+                response = request()
+            except Exception as e:
+                stats.latencies.append(time.perf_counter() - start)
+                stats.errors += 1
+                self.breaker.failure()
+                if self.breaker.state == 'open':
+                    return self._fail_fast(method, key, e)
+                if attempt == retries:
+                    raise
+                stats.retries += 1
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                continue
+            finally:
+                _request.timeout = None
+            stats.latencies.append(time.perf_counter() - start)
+            self.breaker.success()
+            return response
+
+    def timeout_for(self, method):
+        return self.timeouts.get(method, self.timeout)
+
+    # -------------------------
+    # breaker open
+    # -------------------------
+    def _remember(self, key, response):
+        with self._lock:
+            self._stale[key] = response
+            self._stale.move_to_end(key)
+            while len(self._stale) > self.stale_size:
+                self._stale.popitem(last=False)
+
+    def _fail_fast(self, method, key, error):
+        with self._lock:
+            response = self._stale.get(key) if key is not None else None
+        if response is not None:
+            self._stats[method].stale += 1
+            return response
+        self._stats[method].rejected += 1
+        raise RpcUnavailable(f"RPC provider unavailable ({method}), circuit breaker open") from error
+
+    # -------------------------
+    # metrics
+    # -------------------------
+    def stats(self):
+        return {
+            'breaker': self.breaker.state,
+            'methods': {method: stats.as_dict() for method, stats in sorted(self._stats.items())},
+        }
+
+
+class GatewayProviderMixin:
+    """Provider mixin routing make_request / make_batch_request through an RpcGateway."""
+
+    def __init__(self, *args, gateway, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gateway = gateway
+
+    def make_request(self, method, params):
+        return self.gateway.call(method, params, super().make_request)
+
+    def make_batch_request(self, requests):
+        return self.gateway.call_batch(requests, super().make_batch_request)
+
+
+def http_provider(endpoint_uri, gateway, **kwargs):
+    """HTTPProvider behind `gateway`; the gateway's per-method timeout replaces the provider's."""
+    from web3 import HTTPProvider
+
+    class GatewayHTTPProvider(GatewayProviderMixin, HTTPProvider):
+
+        def get_request_kwargs(self):
+            request_kwargs = dict(super().get_request_kwargs())
+            timeout = current_timeout()
+            if timeout is not None:
+                request_kwargs['timeout'] = timeout
+            return request_kwargs.items()
+
+    # retries are the gateway's job
+    return GatewayHTTPProvider(endpoint_uri, gateway=gateway, exception_retry_configuration=None, **kwargs)
@@ -0,0 +1,113 @@
+"""
+Incremental reading of Alchemy webhook bodies.
+
+json.loads on a full block builds every log at once (and every caller
+that kept `data` around kept all of them). stream_logs walks the raw body
+with the stdlib scanner instead: it steps through the objects on the way
+to event.data.block.logs and decodes one log at a time, so only the block
+header and the log being applied are alive. Block fields that come after
+`logs` in the body (Alchemy sends them first) are only in the header once
+the logs are exhausted.
+"""
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+class _Reader:
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def peek(self):
+        self.pos = _whitespace.match(self.text, self.pos).end()
+        if self.pos >= len(self.text):
+            raise json.JSONDecodeError("Unexpected end of body", self.text, self.pos)
+        return self.text[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.text, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        value, self.pos = _decoder.raw_decode(self.text, self.pos)
+        return value
+
+    def end(self):
+        """Only whitespace may follow the document, as json.loads has it."""
+        self.pos = _whitespace.match(self.text, self.pos).end()
+        if self.pos != len(self.text):
+            raise json.JSONDecodeError("Extra data", self.text, self.pos)
+
+    def _close(self, end):
+        """Consume ',' (more to come) or `end`; True when the container is finished."""
+        char = self.peek()
+        self.pos += 1
+        if char == end:
+            return True
+        if char != ',':
+            raise json.JSONDecodeError(f"Expecting ',' or '{end}'", self.text, self.pos - 1)
+        return False
+
+    def members(self):
+        """Keys of the object at the cursor; the caller reads each value before asking for the next key."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", self.text, self.pos)
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self._close('}'):
+                return
+
+    def items(self):
+        """Elements of the array at the cursor, decoded one at a time."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._close(']'):
+                return
+
+
+def _path(reader, keys, leaf):
+    """Walk down the object members `keys` (skipping the others) and yield from leaf(reader) there."""
+    for key in reader.members():
+        if key != keys[0]:
+            reader.value()
+        elif len(keys) == 1:
+            yield from leaf(reader)
+        else:
+            yield from _path(reader, keys[1:], leaf)
+
+
+def stream_logs(body, header):
+    """
+    Yield the logs of event.data.block.logs from a raw Alchemy webhook body,
+    one decoded log at a time. The block's other fields are stored in
+    `header` as they are read. Raises json.JSONDecodeError on bad bodies,
+    for what follows the logs once they are exhausted.
+    """
+    def block(reader):
+        for key in reader.members():
+            if key != 'logs':
+                header[key] = reader.value()
+            elif reader.peek() == 'n':
+                reader.value()
+            else:
+                yield from reader.items()
+
+    reader = _Reader(body)
+    yield from _path(reader, ['event', 'data', 'block'], block)
+    reader.end()
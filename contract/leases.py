@@ -0,0 +1,38 @@
+"""
+Single-process workers: a WorkerLease row names the process allowed to run
+a worker. The holder renews it well within its ttl; another process may
+take it only once it has expired, e.g. after the holder crashed.
+"""
+import os
+import socket
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import WorkerLease
+
+
+def lease_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name, ttl, owner=None):
+    """Take or renew the lease for `ttl` seconds. Returns (acquired, lease)."""
+    owner = owner or lease_owner()
+    try:
+        WorkerLease.objects.get_or_create(name=name)
+    except IntegrityError:
+        # created by another process meanwhile
+        pass
+    with transaction.atomic():
+        lease = WorkerLease.objects.select_for_update().get(name=name)
+        now = timezone.now()
+        if lease.owner not in ('', owner) and lease.expires_at and lease.expires_at > now:
+            return False, lease
+        lease.owner = owner
+        lease.expires_at = now + timedelta(seconds=ttl)
+        lease.save(update_fields=['owner', 'expires_at'])
+    return True, lease
+
+
+def release_lease(name, owner=None):
+    return WorkerLease.objects.filter(name=name, owner=owner or lease_owner()).update(owner='', expires_at=None)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from accounts.models import Transaction
+from contract.txcache import normalize_hash, transaction_cache
+
+
+class Command(BaseCommand):
+    help = 'Compare recorded Transaction statuses with their on-chain receipts (cached lookups, read only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=500, help='hashes looked up per round')
+
+    def handle(self, *args, **options):
+        cache = transaction_cache()
+        rows = Transaction.objects.exclude(tx_hash__isnull=True).exclude(tx_hash='').order_by('created_at')
+        checked = mismatches = 0
+        chunk = []
+        for row in rows.values_list('id', 'tx_hash', 'status').iterator(chunk_size=options['chunk']):
+            chunk.append(row)
+            if len(chunk) == options['chunk']:
+                checked, mismatches = self._check(cache, chunk, checked, mismatches)
+                chunk = []
+        if chunk:
+            checked, mismatches = self._check(cache, chunk, checked, mismatches)
+        self.stdout.write(f"{checked} transaction(s) checked, {mismatches} mismatch(es); lookups {cache.hits}")
+
+    def _check(self, cache, rows, checked, mismatches):
+        records = cache.lookup_many(tx_hash for _, tx_hash, _ in rows)
+        for pk, tx_hash, status in rows:
+            _, receipt = records[normalize_hash(tx_hash)]
+            if receipt is None:
+                onchain = Transaction.PENDING
+            else:
+                onchain = Transaction.SUCCESSFUL if int(receipt['status'], 16) == 1 else Transaction.FAILED
+            if onchain != status:
+                mismatches += 1
+                self.stdout.write(f"{pk} {tx_hash}: recorded {status}, on chain {onchain}")
+        return checked + len(rows), mismatches
@@ -0,0 +1,52 @@
+import time
+from django.core.management.base import BaseCommand
+from web3 import AsyncWeb3, Web3
+from contract.benchmarks import bench_database, make_campaign
+from contract.blockchain import CONTRACT_ABI, CONTRACT_ADDRESS, PROVIDER_CACHING
+from contract.fakechain import AsyncFakeChainProvider, FakeChain, FakeChainProvider
+from contract.models import CampaignSnapshot
+from contract.multicall import AsyncBatchReader, BatchReader
+from contract.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = 'CampaignSnapshot sweep on the sync client vs the AsyncWeb3 client (concurrent chunks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=500)
+        parser.add_argument('--milestones', type=int, default=3)
+        parser.add_argument('--latency', type=float, default=0.15, help='simulated RPC round trip (seconds)')
+        parser.add_argument('--max-calls', type=int, default=200, help='calls per aggregate3 / batch chunk')
+
+    def handle(self, *args, **options):
+        results = []
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id, milestones=options['milestones'])
+
+            for multicall in (True, False):
+                for use_async in (False, True):
+                    chain = FakeChain(latency=options['latency'], multicall=multicall)
+                    for contract_id in range(1, options['campaigns'] + 1):
+                        chain.add_campaign(contract_id, milestones=options['milestones'], raised=contract_id * 10 ** 6)
+                    if use_async:
+                        client = AsyncWeb3(AsyncFakeChainProvider(chain, **PROVIDER_CACHING))
+                        reader = AsyncBatchReader(client, max_calls=options['max_calls'])
+                    else:
+                        client = Web3(FakeChainProvider(chain, **PROVIDER_CACHING))
+                        reader = BatchReader(client, max_calls=options['max_calls'])
+                    campaign_contract = client.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+
+                    CampaignSnapshot.objects.all().delete()
+                    start = time.perf_counter()
+                    refreshed, failed = refresh_snapshots(campaign_contract=campaign_contract, batch_reader=reader,
+                                                          use_async=use_async)
+                    elapsed = time.perf_counter() - start
+                    assert refreshed == options['campaigns'] and not failed
+                    assert CampaignSnapshot.objects.filter(total_raised=options['campaigns'] * 10 ** 6).exists()
+                    results.append(('multicall' if multicall else 'rpc batch', 'async' if use_async else 'sync',
+                                    elapsed, chain.round_trips))
+
+        for transport, mode, elapsed, round_trips in results:
+            self.stdout.write(f"{transport:<9} {mode:<5} {options['campaigns']} campaigns in {elapsed:.3f}s, "
+                              f"{round_trips} round trips")
@@ -0,0 +1,43 @@
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.balances import BalanceService
+from contract.benchmarks import summarize
+from contract.blockchain import PROVIDER_CACHING, usdc_token_address
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.multicall import BatchReader
+
+
+class Command(BaseCommand):
+    help = 'Dashboard balance reads: uncached (TTL 0) vs cached with stale-while-revalidate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loads', type=int, default=200, help='dashboard loads per mode')
+        parser.add_argument('--ttl', type=float, default=0.5, help='seconds a cached balance stays fresh')
+        parser.add_argument('--interval', type=float, default=0.01, help='seconds between dashboard loads')
+        parser.add_argument('--latency', type=float, default=0.02, help='simulated RPC round trip (seconds)')
+
+    def handle(self, *args, **options):
+        vault, treasury = '0x' + '11' * 20, '0x' + '22' * 20
+        results = []
+        for mode, ttl in (('uncached', 0), ('cached', options['ttl'])):
+            cache.clear()
+            chain = FakeChain(latency=options['latency'])
+            chain.add_token(usdc_token_address, balances={vault: 1_234_560_000, treasury: 98_760_000})
+            client = Web3(FakeChainProvider(chain, **PROVIDER_CACHING))
+            # max_stale 0 re-reads on every load, like the old vault_bal / platform_wallet_bal
+            service = BalanceService(ttl=ttl, max_stale=ttl * 10, batch_reader=BatchReader(client))
+
+            latencies = []
+            for _ in range(options['loads']):
+                t = time.perf_counter()
+                balances = service.balances([vault, treasury])
+                latencies.append(time.perf_counter() - t)
+                assert balances == {vault: 1234.56, treasury: 98.76}
+                time.sleep(options['interval'])
+            results.append((mode, latencies, chain.round_trips / options['loads'], service.refreshes))
+
+        for mode, latencies, round_trips, refreshes in results:
+            self.stdout.write(f"{mode:<9} {summarize(latencies)}  {round_trips:.2f} round trips/load, "
+                              f"{refreshes} refreshes")
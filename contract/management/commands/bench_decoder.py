@@ -0,0 +1,83 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import alchemy_log
+from contract.blockchain import contract, event_decoders
+from contract.webhook import EVENT_HANDLERS, _normalize_alchemy_log
+
+
+def _block_logs(count, seed):
+    """A block's worth of normalized logs, mostly Pledged like production traffic."""
+    rng = random.Random(seed)
+    donors = [Web3.to_checksum_address(f'0x{i + 1:040x}') for i in range(50)]
+    logs = []
+    for index in range(count):
+        tx_hash = Web3.keccak(text=f'decoder:{index}').to_0x_hex()
+        kind = rng.random()
+        if kind < 0.8:
+            raw = alchemy_log('Pledged', {
+                'id': rng.randint(1, 100), 'donor': rng.choice(donors), 'netAmount': rng.randint(1, 10 ** 9),
+                'feeAmount': 0, 'tipAmount': 0,
+            }, tx_hash, index)
+        elif kind < 0.9:
+            raw = alchemy_log('RefundClaimed', {
+                'id': rng.randint(1, 100), 'donor': rng.choice(donors), 'amount': rng.randint(1, 10 ** 9),
+            }, tx_hash, index)
+        elif kind < 0.95:
+            raw = alchemy_log('MilestoneWithdrawn', {
+                'id': rng.randint(1, 100), 'milestoneIndex': 1, 'amount': 10 ** 6, 'totalWithdrawn': 10 ** 6,
+            }, tx_hash, index)
+        else:
+            raw = alchemy_log('CampaignCreated', {
+                'id': rng.randint(1, 100), 'creator': rng.choice(donors), 'currencyType': 1,
+                'token': donors[0], 'goal': 10 ** 9, 'deadline': 1_900_000_000, 'offchainId': str(index),
+            }, tx_hash, index)
+        logs.append(_normalize_alchemy_log(raw, {'number': 1, 'hash': '0x' + '00' * 32}))
+    return logs
+
+
+class Command(BaseCommand):
+    help = "Event decoding: web3 process_log per log vs the compiled decoders, per log and per block"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logs', type=int, default=200, help='logs per block')
+        parser.add_argument('--blocks', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        blocks = [_block_logs(options['logs'], options['seed'] + n) for n in range(options['blocks'])]
+        events = options['logs'] * options['blocks']
+
+        def web3_path(logs):
+            # previous path: topic lookup, then web3 builds an AttributeDict per log
+            for log in logs:
+                name = event_decoders.name(log['topics'][0])
+                getattr(contract.events, name)().process_log(log)['args']
+
+        def per_log(logs):
+            for log in logs:
+                event_decoders.decode(log)
+
+        def per_block(logs):
+            event_decoders.decode_logs(logs, EVENT_HANDLERS)
+
+        # same values either way
+        for log in blocks[0]:
+            name, record = event_decoders.decode(log)
+            expected = getattr(contract.events, name)().process_log(log)['args']
+            assert record._asdict() == dict(expected), (name, record, expected)
+
+        timings = {}
+        for label, run in (('web3 process_log', web3_path), ('compiled, per log', per_log), ('compiled, per block', per_block)):
+            run(blocks[0])  # warm up
+            start = time.perf_counter()
+            for logs in blocks:
+                run(logs)
+            timings[label] = time.perf_counter() - start
+
+        self.stdout.write(f"{options['blocks']} blocks x {options['logs']} logs ({events} events)")
+        baseline = timings['web3 process_log']
+        for label, elapsed in timings.items():
+            self.stdout.write(f"  {label:<20} {events / elapsed:>12.0f} events/s  "
+                              f"{elapsed / events * 1e6:8.2f} us/event  x{baseline / elapsed:.1f}")
@@ -0,0 +1,83 @@
+import threading
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.test.utils import override_settings
+from contract.benchmarks import bench_database, make_campaign, summarize
+from projects.funding import add_funds, funding_totals, rollup_funding
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Contention on one hot campaign: pledges updating the Project row vs sharded funding counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='concurrent workers pledging to one campaign')
+        parser.add_argument('--pledges', type=int, default=100, help='pledges per worker')
+        parser.add_argument('--shards', type=int, default=16)
+        parser.add_argument('--hold', type=float, default=2.0,
+                            help='ms each pledge transaction keeps working after the increment (rest of the handler)')
+
+    def _run(self, project, increment, options):
+        latencies, retries = [], [0]
+        lock = threading.Lock()
+
+        def worker():
+            mine = []
+            try:
+                for _ in range(options['pledges']):
+                    start = time.perf_counter()
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                increment(project, Decimal('1.00'))
+                                time.sleep(options['hold'] / 1000)
+                            break
+                        except OperationalError:
+                            # sqlite: the write lock was not free in time
+                            with lock:
+                                retries[0] += 1
+                    mine.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, retries[0]
+
+    def handle(self, *args, **options):
+        pledges = options['threads'] * options['pledges']
+
+        def row_update(project, amount):
+            Project.objects.filter(pk=project.pk).update(total_funds=F('total_funds') + amount)
+
+        def shard_update(project, amount):
+            add_funds({project.pk: amount})
+
+        results = []
+        with bench_database(), override_settings(FUNDING_SHARDS=options['shards']):
+            for label, increment in (('project row', row_update), (f"{options['shards']} shards", shard_update)):
+                project = make_campaign(len(results) + 1, goal=Decimal(pledges * 2))
+                elapsed, latencies, retries = self._run(project, increment, options)
+                project.refresh_from_db()
+                pending = funding_totals([project])[project.pk]
+                rollup_start = time.perf_counter()
+                rollup_funding()
+                rollup = time.perf_counter() - rollup_start
+                project.refresh_from_db()
+                results.append((label, elapsed, latencies, retries, pending, project.total_funds, rollup))
+
+        self.stdout.write(f"{options['threads']} workers x {options['pledges']} pledges to one campaign "
+                          f"({connection.vendor}, {options['hold']}ms of work per pledge transaction)")
+        for label, elapsed, latencies, retries, pending, total, rollup in results:
+            self.stdout.write(f"  {label:<12} {pledges / elapsed:8.1f} pledges/s  {summarize(latencies)}  "
+                              f"retries={retries}  total before/after rollup {pending}/{total} "
+                              f"(rollup {rollup * 1000:.1f}ms)")
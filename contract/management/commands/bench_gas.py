@@ -0,0 +1,65 @@
+import time
+from collections import Counter
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract import blockchain
+from contract.benchmarks import bench_database, summarize
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.gas import GasOracle
+from contract.models import OwnerTransaction
+
+
+class Command(BaseCommand):
+    help = 'Owner transaction latency and RPC calls with and without the gas oracle caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--txs', type=int, default=150)
+        parser.add_argument('--latency', type=float, default=0.005, help='simulated RPC round trip (seconds)')
+        parser.add_argument('--eip1559', action='store_true')
+
+    def handle(self, *args, **options):
+        modes = [
+            ('no caching', GasOracle(blockchain.CHAIN, price_ttl=0, eip1559=options['eip1559'], reuse_estimates=False)),
+            ('oracle', GasOracle(blockchain.CHAIN, eip1559=options['eip1559'])),
+        ]
+        results = []
+        with bench_database():
+            for name, oracle in modes:
+                cache.clear()
+                # every mode replays the same nonces on a fresh chain, so the same signed txs
+                OwnerTransaction.objects.all().delete()
+                chain = FakeChain(latency=options['latency'])
+                methods = Counter()
+                handle = chain.handle
+
+                def counted(method, params, handle=handle, methods=methods):
+                    methods[method] += 1
+                    return handle(method, params)
+                chain.handle = counted
+
+                client = Web3(FakeChainProvider(chain, **blockchain.PROVIDER_CACHING))
+                contract = client.eth.contract(address=blockchain.CONTRACT_ADDRESS, abi=blockchain.CONTRACT_ABI)
+                calls = [
+                    lambda i: contract.functions.finalize(i),
+                    lambda i: contract.functions.approveMilestone(i, 0),
+                    lambda i: contract.functions.haltCampaign(i),
+                ]
+                blockchain.owner_nonces().resync(client)
+                original = blockchain.gas_oracle
+                blockchain.gas_oracle = lambda: oracle
+                try:
+                    latencies = []
+                    for i in range(options['txs']):
+                        t = time.perf_counter()
+                        blockchain.send_owner_tx(calls[i % len(calls)](i + 1))
+                        latencies.append(time.perf_counter() - t)
+                finally:
+                    blockchain.gas_oracle = original
+                results.append((name, latencies, methods, oracle.stats()))
+
+        for name, latencies, methods, stats in results:
+            self.stdout.write(f"{name:<11} {summarize(latencies)}  "
+                              f"{sum(methods.values()) / options['txs']:.2f} RPC calls/tx {dict(methods)}")
+            self.stdout.write(f"{'':<11} fee hit rate {stats['fees_hit_rate']:.0%}, "
+                              f"estimate hit rate {stats['estimate_hit_rate']:.0%}")
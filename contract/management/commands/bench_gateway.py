@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import summarize
+from contract.blockchain import CONTRACT_ABI, CONTRACT_ADDRESS, PROVIDER_CACHING
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.gateway import GatewayProviderMixin, RpcGateway
+
+
+class GatewayFakeChainProvider(GatewayProviderMixin, FakeChainProvider):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'RPC gateway: coalesced concurrent reads, retries on a flaky provider, circuit breaker in an outage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20)
+        parser.add_argument('--reads', type=int, default=200, help='reads per scenario')
+        parser.add_argument('--latency', type=float, default=0.03, help='simulated RPC round trip (seconds)')
+        parser.add_argument('--fail-rate', type=float, default=0.2)
+        parser.add_argument('--timeout', type=float, default=0.5, help='how long a failing request hangs in the outage')
+
+    def _client(self, chain, gateway):
+        if gateway is None:
+            return Web3(FakeChainProvider(chain, **PROVIDER_CACHING))
+        return Web3(GatewayFakeChainProvider(chain, gateway=gateway, **PROVIDER_CACHING))
+
+    def _run(self, client, reads, threads):
+        campaign = client.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+
+        def read(_):
+            start = time.perf_counter()
+            try:
+                campaign.functions.getCampaign(1).call()
+                ok = True
+            except Exception:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(read, range(reads)))
+        return [latency for latency, _ in results], sum(ok for _, ok in results)
+
+    def handle(self, *args, **options):
+        reads, threads = options['reads'], options['threads']
+        lines = []
+        for name in ('coalescing', 'flaky', 'outage'):
+            for gateway in (None, RpcGateway(retries=2, backoff=0.01, breaker_threshold=5, breaker_reset=60)):
+                chain = FakeChain(latency=options['latency'])
+                chain.add_campaign(1)
+                client = self._client(chain, gateway)
+                if name == 'flaky':
+                    chain.fail_rate = options['fail_rate']
+                if name == 'outage':
+                    # a good read before the provider goes away, so there is something to serve
+                    client.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI).functions.getCampaign(1).call()
+                    chain.down, chain.down_latency = True, options['timeout']
+                trips = chain.round_trips
+                latencies, ok = self._run(client, reads, threads)
+                lines.append(f"{name:<10} {'gateway' if gateway else 'direct':<7} {ok:>4}/{reads} ok  "
+                             f"{chain.round_trips - trips:>4} round trips  {summarize(latencies)}")
+                if gateway is not None:
+                    stats = gateway.stats()
+                    lines.append(f"{'':<18} breaker {stats['breaker']}, eth_call {stats['methods']['eth_call']}")
+
+        for line in lines:
+            self.stdout.write(line)
@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from web3 import Web3
+from contract import blockchain
+from contract.benchmarks import bench_database, summarize
+from contract.fakechain import FakeChain, FakeChainProvider
+
+
+def _legacy_send(client, txn_func):
+    """send_owner_tx as it was before the nonce counter: key derivation and pending count per call."""
+    acct = client.eth.account.from_key(blockchain.OWNER_PRIVATE_KEY)
+    built = txn_func.build_transaction({
+        "from": acct.address,
+        "nonce": client.eth.get_transaction_count(acct.address, "pending"),
+        "gasPrice": client.eth.gas_price,
+        "chainId": client.eth.chain_id,
+    })
+    built["gas"] = int(client.eth.estimate_gas(built) * 1.2)
+    signed = client.eth.account.sign_transaction(built, private_key=blockchain.OWNER_PRIVATE_KEY)
+    return client.eth.send_raw_transaction(signed.raw_transaction).hex()
+
+
+class Command(BaseCommand):
+    help = 'Owner transaction submission: per-call nonce lookup vs the shared nonce counter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--txs', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4, help='concurrent senders for the collision test')
+        parser.add_argument('--latency', type=float, default=0.005, help='simulated RPC round trip (seconds)')
+
+    def handle(self, *args, **options):
+        with bench_database():
+            results = []
+            for mode in ('per-call', 'counter'):
+                chain = FakeChain(latency=options['latency'])
+                # the counter mode also gets the production provider's eth_chainId cache
+                client = Web3(FakeChainProvider(chain, **(blockchain.PROVIDER_CACHING if mode == 'counter' else {})))
+                contract = client.eth.contract(address=blockchain.CONTRACT_ADDRESS, abi=blockchain.CONTRACT_ABI)
+                blockchain.owner_nonces().resync(client)
+
+                def send(i):
+                    txn_func = contract.functions.finalize(i)
+                    t = time.perf_counter()
+                    try:
+                        if mode == 'per-call':
+                            _legacy_send(client, txn_func)
+                        else:
+                            blockchain.send_owner_tx(txn_func)
+                        return time.perf_counter() - t, None
+                    except Exception as e:
+                        return time.perf_counter() - t, e
+                    finally:
+                        if mode == 'counter':
+                            connection.close()
+
+                # sequential latency, then the same count from concurrent senders
+                sequential = [send(i) for i in range(options['txs'])]
+                with ThreadPoolExecutor(options['threads']) as pool:
+                    start = time.perf_counter()
+                    concurrent = list(pool.map(send, range(options['txs'])))
+                    elapsed = time.perf_counter() - start
+                results.append((
+                    mode,
+                    [d for d, _ in sequential],
+                    sum(1 for _, e in sequential + concurrent if e),
+                    options['txs'] / elapsed,
+                    chain.calls,
+                    len(chain.transactions),
+                ))
+
+        for mode, latencies, failures, rate, calls, sent in results:
+            self.stdout.write(f"{mode:<9} sequential {summarize(latencies)}  concurrent {rate:,.1f} tx/s  "
+                              f"{failures} failed, {sent} accepted, {calls} RPC calls")
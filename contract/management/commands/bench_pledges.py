@@ -0,0 +1,55 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from contract.benchmarks import bench_database, make_campaign, make_donor, pledged_log, alchemy_payload, summarize
+from contract.webhook import process_payload
+
+
+class Command(BaseCommand):
+    help = 'Throughput of Pledged-heavy blocks: per-log application vs block-level batch mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 500], help='Pledged logs per block')
+        parser.add_argument('--events', type=int, default=1000, help='approximate pledges per measurement')
+        parser.add_argument('--campaigns', type=int, default=10)
+        parser.add_argument('--donors', type=int, default=50)
+
+    def handle(self, *args, **options):
+        block = 0
+        results = []
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id)
+            donors = [make_donor(i) for i in range(options['donors'])]
+
+            for size in options['sizes']:
+                blocks = max(1, options['events'] // size)
+                for batch in (False, True):
+                    payloads = []
+                    for _ in range(blocks):
+                        block += 1
+                        logs = [
+                            pledged_log(
+                                campaign_id=(block + i) % options['campaigns'] + 1,
+                                donor=donors[(block * size + i) % len(donors)],
+                                net_amount=Decimal('5'),
+                                tip=Decimal('1'),
+                                log_index=i,
+                            )
+                            for i in range(size)
+                        ]
+                        payloads.append(alchemy_payload(logs, block_number=block))
+
+                    latencies = []
+                    with override_settings(WEBHOOK_BATCH_PLEDGES=batch):
+                        start = time.perf_counter()
+                        for data in payloads:
+                            t = time.perf_counter()
+                            process_payload(data)
+                            latencies.append(time.perf_counter() - t)
+                        total = time.perf_counter() - start
+                    results.append((size, 'batch' if batch else 'per-log', blocks * size / total, latencies))
+
+        for size, mode, rate, latencies in results:
+            self.stdout.write(f"{size:>4} pledges/block  {mode:<8} {rate:>9.1f} events/s  block {summarize(latencies)}")
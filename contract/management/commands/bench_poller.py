@@ -0,0 +1,61 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import bench_database, make_campaign, make_donor
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.models import ProcessedEvent
+from contract.poller import LogPoller
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Replay a fake chain through the eth_getLogs poller and report blocks/min'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blocks', type=int, default=5000)
+        parser.add_argument('--pledge-every', type=int, default=10, help='one Pledged log every N blocks')
+        parser.add_argument('--campaigns', type=int, default=5)
+        parser.add_argument('--donors', type=int, default=20)
+        parser.add_argument('--max-block-range', type=int, default=500, help='provider limit the poller must adapt to')
+
+    def handle(self, *args, **options):
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id)
+            donors = [make_donor(i) for i in range(options['donors'])]
+
+            chain = FakeChain(max_block_range=options['max_block_range'])
+            pledged = Decimal(0)
+            for n in range(options['blocks']):
+                events = []
+                if n % options['pledge_every'] == 0:
+                    events.append(('Pledged', {
+                        'id': n % options['campaigns'] + 1,
+                        'donor': donors[n % len(donors)],
+                        'netAmount': 3 * 10 ** 6,
+                        'feeAmount': 0,
+                        'tipAmount': 0,
+                    }))
+                    pledged += 3
+                chain.mine(events)
+
+            poller = LogPoller(Web3(FakeChainProvider(chain)), confirmations=0)
+            checkpoint = poller.checkpoint(start_block=1)
+            start = time.perf_counter()
+            while poller.poll_once(checkpoint)[0]:
+                pass
+            elapsed = time.perf_counter() - start
+
+            # a second pass over the same range is a no-op thanks to the ledger
+            replay_start = time.perf_counter()
+            poller.backfill(1, chain.head)
+            replay = time.perf_counter() - replay_start
+
+            total = sum(Project.objects.values_list('total_funds', flat=True))
+            events = ProcessedEvent.objects.count()
+
+        self.stdout.write(f"{chain.head} blocks, {events} events applied in {elapsed:.2f}s "
+                          f"({chain.head / elapsed * 60:,.0f} blocks/min, {poller.rpc_calls} RPC calls)")
+        self.stdout.write(f"re-scan of the same range: {replay:.2f}s ({chain.head / replay * 60:,.0f} blocks/min)")
+        self.stdout.write(f"total_funds {total} / pledged {pledged}: {'OK' if total == pledged else 'MISMATCH'}")
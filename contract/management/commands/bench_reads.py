@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import summarize
+from contract.blockchain import CONTRACT_ABI, CONTRACT_ADDRESS, PROVIDER_CACHING, campaign_onchain
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.multicall import BatchReader
+
+
+class Command(BaseCommand):
+    help = 'Campaign + milestones read: sequential eth_calls vs Multicall3 vs JSON-RPC batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--milestones', type=int, default=3)
+        parser.add_argument('--reads', type=int, default=50)
+        parser.add_argument('--latency', type=float, default=0.02, help='simulated RPC round trip (seconds)')
+
+    def _chain(self, options, multicall):
+        chain = FakeChain(latency=options['latency'], multicall=multicall)
+        owner = Web3.to_checksum_address('0x' + 'ab' * 20)
+        token = '0x0000000000000000000000000000000000000000'
+        count = options['milestones']
+        chain.set_view('getCampaign', [1], (owner, 1, token, 300 * 10 ** 6, 120 * 10 ** 6, 0, 1_900_000_000,
+                                            0, 'ctx', 'offchain-1', count, 0, 0))
+        for i in range(count):
+            chain.set_view('getMilestone', [1, i], (f'Milestone {i + 1}', 10_000 // count, False, False))
+        return chain
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in ('sequential', 'multicall', 'rpc batch'):
+            chain = self._chain(options, multicall=mode == 'multicall')
+            client = Web3(FakeChainProvider(chain, **PROVIDER_CACHING))
+            campaign = client.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+            reader = BatchReader(client)
+
+            latencies, expected = [], None
+            for _ in range(options['reads']):
+                t = time.perf_counter()
+                if mode == 'sequential':
+                    # the previous admin code path: getCampaign, then one getMilestone per milestone
+                    core = campaign.functions.getCampaign(1).call()
+                    milestones = [campaign.functions.getMilestone(1, i).call() for i in range(int(core[10]))]
+                else:
+                    core, milestones = campaign_onchain(1, milestone_hint=options['milestones'],
+                                                        campaign_contract=campaign, batch_reader=reader)
+                latencies.append(time.perf_counter() - t)
+                expected = expected or (core, milestones)
+                assert (core, milestones) == expected
+            results.append((mode, latencies, chain.round_trips / options['reads'], chain.calls / options['reads']))
+
+        for mode, latencies, round_trips, calls in results:
+            self.stdout.write(f"{mode:<10} {summarize(latencies)}  {round_trips:.1f} round trips/read, "
+                              f"{calls:.1f} requests/read")
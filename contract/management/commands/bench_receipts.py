@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract import blockchain
+from contract.benchmarks import bench_database
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.models import OwnerTransaction
+from contract.tracker import ReceiptPoller, speed_up
+
+
+class Command(BaseCommand):
+    help = 'Owner transaction follow-up: per-hash receipt lookups vs the batched receipt poller, and stuck fee bumps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--txs', type=int, default=200)
+        parser.add_argument('--stuck', type=int, default=10, help='underpriced transactions to bump')
+        parser.add_argument('--latency', type=float, default=0.02, help='simulated RPC round trip (seconds)')
+
+    def handle(self, *args, **options):
+        chain = FakeChain(latency=options['latency'])
+        client = Web3(FakeChainProvider(chain, **blockchain.PROVIDER_CACHING))
+        contract = client.eth.contract(address=blockchain.CONTRACT_ADDRESS, abi=blockchain.CONTRACT_ABI)
+
+        with bench_database():
+            blockchain.owner_nonces().resync(client)
+            hashes = [blockchain.send_owner_tx(contract.functions.finalize(i + 1)) for i in range(options['txs'])]
+            chain.mine_transactions()
+
+            # before: one eth_getTransactionReceipt per hash
+            trips = chain.round_trips
+            start = time.perf_counter()
+            for tx_hash in hashes:
+                client.eth.get_transaction_receipt(tx_hash)
+            per_hash = time.perf_counter() - start, chain.round_trips - trips
+
+            poller = ReceiptPoller(client, blockchain.CHAIN, stuck_after=0)
+            trips = chain.round_trips
+            start = time.perf_counter()
+            mined, stuck, pending = poller.poll_once()
+            batched = time.perf_counter() - start, chain.round_trips - trips
+            assert mined == options['txs'] and not pending
+            assert OwnerTransaction.objects.filter(status=OwnerTransaction.SUCCESS).count() == options['txs']
+
+            # underpriced transactions stay out of blocks until re-sent with higher fees
+            low_fee = {'gasPrice': chain.gas_price // 4}
+            for i in range(options['stuck']):
+                blockchain.send_owner_tx(contract.functions.haltCampaign(i + 1), low_fee)
+            chain.mine_transactions(min_fee=chain.gas_price)
+            mined, stuck, pending = poller.poll_once()
+            assert (mined, stuck) == (0, options['stuck'])
+            for owner_tx in poller.stuck():
+                speed_up(owner_tx, client)
+            chain.mine_transactions(min_fee=chain.gas_price)
+            mined, stuck, pending = poller.poll_once()
+            dropped = OwnerTransaction.objects.filter(status=OwnerTransaction.DROPPED).count()
+            assert mined == dropped == options['stuck'] and not pending
+
+        self.stdout.write(f"per-hash lookups  {options['txs']} receipts in {per_hash[0] * 1000:.1f}ms, "
+                          f"{per_hash[1]} round trips")
+        self.stdout.write(f"batched poller    {options['txs']} receipts in {batched[0] * 1000:.1f}ms, "
+                          f"{batched[1]} round trips")
+        self.stdout.write(f"stuck: {options['stuck']} flagged, bumped and mined; {dropped} originals dropped")
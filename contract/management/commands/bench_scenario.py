@@ -0,0 +1,72 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from web3 import Web3
+from contract.benchmarks import bench_database, summarize
+from contract.blockchain import PROVIDER_CACHING
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.models import ProcessedEvent
+from contract.poller import LogPoller
+from contract.scenarios import SCENARIOS, Scenario
+from contract.webhook import flush_funding, process_payload
+
+
+class Command(BaseCommand):
+    help = 'Deterministic contract load scenario through the webhook or the eth_getLogs poller: events/s and p99'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='lifecycle')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--campaigns', type=int, default=10)
+        parser.add_argument('--donors', type=int, default=50)
+        parser.add_argument('--pledges', type=int, default=1000)
+        parser.add_argument('--max-block-logs', type=int, default=20)
+        parser.add_argument('--path', choices=['webhook', 'poller'], default='webhook')
+        parser.add_argument('--batch', action='store_true', help='WEBHOOK_BATCH_PLEDGES on')
+        parser.add_argument('--shards', type=int, default=0, help='FUNDING_SHARDS (rolled up at the end)')
+        parser.add_argument('--partition-workers', type=int, default=1,
+                            help='WEBHOOK_PARTITION_WORKERS: campaigns applied in parallel')
+
+    def handle(self, *args, **options):
+        overrides = {
+            'WEBHOOK_BATCH_PLEDGES': options['batch'],
+            'WEBHOOK_PARTITION_WORKERS': options['partition_workers'],
+            'FUNDING_SHARDS': options['shards'],
+        }
+        with bench_database(), override_settings(**overrides):
+            scenario = Scenario(
+                options['scenario'], seed=options['seed'], campaigns=options['campaigns'], donors=options['donors'],
+                pledges=options['pledges'], max_block_logs=options['max_block_logs'],
+            ).setup()
+
+            latencies = []
+            start = time.perf_counter()
+            if options['path'] == 'webhook':
+                for data in scenario.payloads():
+                    t = time.perf_counter()
+                    process_payload(data)
+                    latencies.append(time.perf_counter() - t)
+            else:
+                chain = FakeChain()
+                scenario.mine(chain)
+                poller = LogPoller(Web3(FakeChainProvider(chain, **PROVIDER_CACHING)), confirmations=0,
+                                   max_range=options['max_block_logs'])
+                checkpoint = poller.checkpoint(start_block=1)
+                while checkpoint.block_number < chain.head:
+                    t = time.perf_counter()
+                    poller.poll_once(checkpoint)
+                    latencies.append(time.perf_counter() - t)
+            if options['shards']:
+                flush_funding()
+            elapsed = time.perf_counter() - start
+
+            applied = ProcessedEvent.objects.count()
+            wrong = scenario.check()
+
+        unit = 'block' if options['path'] == 'webhook' else 'poll'
+        self.stdout.write(f"{options['scenario']} seed {options['seed']} via {options['path']} "
+                          f"({options['partition_workers']} partition workers): "
+                          f"{scenario.events} events in {len(scenario.blocks)} blocks {scenario.counts()}")
+        self.stdout.write(f"{scenario.events / elapsed:.1f} events/s, {unit} {summarize(latencies)}")
+        self.stdout.write(f"{applied}/{scenario.events} applied, "
+                          f"{len(wrong)} campaign(s) with wrong total_funds {wrong[:10]}")
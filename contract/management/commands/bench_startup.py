@@ -0,0 +1,48 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# run in a fresh interpreter: django.setup() + the URLconf (admin, views, webhook),
+# optionally followed by building every chain client
+SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+import django
+django.setup()
+import core.urls
+booted = time.perf_counter()
+if sys.argv[1] == 'warm':
+    from contract.blockchain import warm_up
+    warm_up()
+print(json.dumps({'boot': booted - start, 'total': time.perf_counter() - start, 'web3': 'web3' in sys.modules}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Process startup time with lazy chain clients vs warming them up at boot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+
+    def _run(self, mode):
+        env = dict(os.environ, CHAIN_WARM_UP='False')
+        out = subprocess.run([sys.executable, '-c', SCRIPT, mode], cwd=settings.BASE_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in ('lazy', 'warm'):
+            runs = [self._run(mode) for _ in range(options['runs'])]
+            results[mode] = (statistics.median(r['total'] for r in runs), runs[0]['web3'])
+
+        for mode, (total, web3_loaded) in results.items():
+            self.stdout.write(f"{mode:<5} startup {total * 1000:8.1f}ms (median of {options['runs']})  "
+                              f"web3 imported: {web3_loaded}")
+        gain = results['warm'][0] - results['lazy'][0]
+        self.stdout.write(f"saved per process that never touches the chain: {gain * 1000:.1f}ms")
@@ -0,0 +1,105 @@
+import asyncio
+import socket
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import bench_database, make_campaign, make_donor, summarize
+from contract.fakechain import FakeChain, FakeChainProvider, FakeWsServer
+from contract.subscriber import LogSubscriber
+from projects.models import Project
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'Block-to-applied latency of the websocket subscriber against a local fake chain'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blocks', type=int, default=200, help='blocks mined while subscribed')
+        parser.add_argument('--backlog', type=int, default=50, help='blocks mined before the first connect')
+        parser.add_argument('--block-time', type=float, default=0.1, help='seconds between mined blocks')
+        parser.add_argument('--drop-every', type=int, default=0, help='close the socket every N blocks (0: never)')
+        parser.add_argument('--reorg-every', type=int, default=0,
+                            help='reorg the newest block out every N blocks (0: never); its pledge is mined again')
+        parser.add_argument('--confirmations', type=int, default=settings.SUBSCRIBE_CONFIRMATIONS)
+        parser.add_argument('--campaigns', type=int, default=5)
+        parser.add_argument('--donors', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id)
+            donors = [make_donor(i) for i in range(options['donors'])]
+
+            chain = FakeChain()
+            server = FakeWsServer(chain, port=_free_port()).start()
+            mined, latencies, backlog = {}, [], set()
+            pledged = Decimal(0)
+
+            def mine():
+                nonlocal pledged
+                n = chain.head + 1
+                pledged += 2
+                mined[n] = time.perf_counter()
+                chain.mine([('Pledged', {
+                    'id': n % options['campaigns'] + 1,
+                    'donor': donors[n % len(donors)],
+                    'netAmount': 2 * 10 ** 6,
+                    'feeAmount': 0,
+                    'tipAmount': 0,
+                })])
+
+            def on_applied(block_number, applied):
+                # backlog blocks are applied by the catch-up read, not the stream
+                if applied and block_number in mined and block_number not in backlog:
+                    latencies.append(time.perf_counter() - mined[block_number])
+
+            for _ in range(options['backlog']):
+                mine()
+            backlog.update(mined)
+
+            subscriber = LogSubscriber(server.url, http_w3=Web3(FakeChainProvider(chain)), backoff=0.05,
+                                       on_applied=on_applied, confirmations=options['confirmations'])
+
+            async def scenario():
+                nonlocal pledged
+                stop = asyncio.Event()
+                task = asyncio.create_task(subscriber.run(start_block=1, stop=stop))
+                while not subscriber.connects:
+                    await asyncio.sleep(0.01)
+                for n in range(options['blocks']):
+                    if options['drop_every'] and n and n % options['drop_every'] == 0:
+                        server.drop()
+                    if options['reorg_every'] and n and n % options['reorg_every'] == 0:
+                        # the newest block (and its pledge) is replaced before it is confirmed
+                        mined.pop(chain.head, None)
+                        chain.reorg(1)
+                        pledged -= 2
+                    mine()
+                    await asyncio.sleep(options['block_time'])
+                # confirm the last pledges
+                for _ in range(options['confirmations']):
+                    chain.mine()
+                    await asyncio.sleep(options['block_time'])
+                await asyncio.sleep(0.5)
+                stop.set()
+                await task
+
+            start = time.perf_counter()
+            asyncio.run(scenario())
+            elapsed = time.perf_counter() - start
+            server.stop()
+
+            total = sum(Project.objects.values_list('total_funds', flat=True))
+
+        self.stdout.write(f"{options['blocks']} live blocks in {elapsed:.2f}s over {subscriber.connects} connection(s), "
+                          f"{subscriber.pushed} logs pushed")
+        self.stdout.write(f"mined -> applied latency at {options['confirmations']} confirmation(s), "
+                          f"{options['block_time']}s blocks: {summarize(latencies)}")
+        self.stdout.write(f"total_funds {total} / pledged {pledged}: {'OK' if total == pledged else 'MISMATCH'}")
@@ -0,0 +1,58 @@
+import time
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.benchmarks import bench_database, make_campaign, summarize
+from contract.blockchain import CONTRACT_ABI, CONTRACT_ADDRESS, PROVIDER_CACHING, campaign_onchain
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.models import CampaignSnapshot
+from contract.multicall import BatchReader
+from contract.snapshots import refresh_snapshots
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Bulk CampaignSnapshot sweep, and admin on-chain panel from the snapshot vs a live read'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=200)
+        parser.add_argument('--milestones', type=int, default=3)
+        parser.add_argument('--latency', type=float, default=0.02, help='simulated RPC round trip (seconds)')
+        parser.add_argument('--renders', type=int, default=50)
+
+    def handle(self, *args, **options):
+        chain = FakeChain(latency=options['latency'])
+        client = Web3(FakeChainProvider(chain, **PROVIDER_CACHING))
+        campaign_contract = client.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+        reader = BatchReader(client)
+
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id, milestones=options['milestones'])
+                chain.add_campaign(contract_id, milestones=options['milestones'], raised=contract_id * 10 ** 6)
+
+            start = time.perf_counter()
+            refreshed, failed = refresh_snapshots(campaign_contract=campaign_contract, batch_reader=reader)
+            sweep = time.perf_counter() - start
+            sweep_trips = chain.round_trips
+            assert CampaignSnapshot.objects.count() == refreshed == options['campaigns']
+
+            project_admin = admin.site._registry[Project]
+            projects = list(Project.objects.order_by('pk')[:options['renders']])
+
+            snapshot_latencies = []
+            for project in projects:
+                t = time.perf_counter()
+                html = project_admin.onchain_info(project)
+                snapshot_latencies.append(time.perf_counter() - t)
+                assert 'Could not' not in html
+
+            live_latencies = []
+            for project in projects:
+                t = time.perf_counter()
+                campaign_onchain(project.contract_id, options['milestones'], campaign_contract, reader)
+                live_latencies.append(time.perf_counter() - t)
+
+        self.stdout.write(f"sweep: {refreshed} campaigns ({len(failed)} failed) in {sweep:.2f}s, {sweep_trips} round trips")
+        self.stdout.write(f"admin panel from snapshot  {summarize(snapshot_latencies)}")
+        self.stdout.write(f"live batched chain read    {summarize(live_latencies)}")
@@ -0,0 +1,56 @@
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract import blockchain
+from contract.benchmarks import bench_database
+from contract.fakechain import FakeChain, FakeChainProvider
+from contract.txcache import TransactionCache
+
+
+class Command(BaseCommand):
+    help = 'Historic transaction lookups: one get_transaction per hash vs the two-tier transaction cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--txs', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=3, help='times every hash is looked up')
+        parser.add_argument('--latency', type=float, default=0.01, help='simulated RPC round trip (seconds)')
+
+    def handle(self, *args, **options):
+        chain = FakeChain(latency=options['latency'])
+        client = Web3(FakeChainProvider(chain, **blockchain.PROVIDER_CACHING))
+        contract = client.eth.contract(address=blockchain.CONTRACT_ADDRESS, abi=blockchain.CONTRACT_ABI)
+
+        results = []
+        with bench_database():
+            blockchain.owner_nonces().resync(client)
+            hashes = [blockchain.send_owner_tx(contract.functions.finalize(i + 1)) for i in range(options['txs'])]
+            chain.mine_transactions()
+
+            trips = chain.round_trips
+            start = time.perf_counter()
+            for _ in range(options['rounds']):
+                for tx_hash in hashes:
+                    client.eth.get_transaction(tx_hash)
+            results.append(('uncached', time.perf_counter() - start, chain.round_trips - trips))
+
+            cache = TransactionCache(client, blockchain.CHAIN)
+            trips = chain.round_trips
+            start = time.perf_counter()
+            for _ in range(options['rounds']):
+                for tx_hash in hashes:
+                    assert cache.lookup(tx_hash).receipt is not None
+            results.append(('cached', time.perf_counter() - start, chain.round_trips - trips))
+
+            # a fresh process: the LRU is empty, the table is not
+            cold = TransactionCache(client, blockchain.CHAIN)
+            trips = chain.round_trips
+            start = time.perf_counter()
+            records = cold.lookup_many(hashes)
+            assert all(record.receipt for record in records.values())
+            results.append(('new process', time.perf_counter() - start, chain.round_trips - trips))
+
+        lookups = options['txs'] * options['rounds']
+        for mode, elapsed, round_trips in results:
+            count = options['txs'] if mode == 'new process' else lookups
+            self.stdout.write(f"{mode:<11} {count} lookups in {elapsed * 1000:.1f}ms, {round_trips} round trips")
+        self.stdout.write(f"cache tiers {cache.hits}, new process {cold.hits}")
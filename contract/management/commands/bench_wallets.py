@@ -0,0 +1,64 @@
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from accounts.models import Wallet, normalize_address
+from contract.benchmarks import bench_database, summarize
+
+
+def _address(n):
+    # mixed case like checksummed addresses, so only a case-insensitive match finds them
+    digits = f'{n * 2654435761 % 16 ** 40:040x}'
+    return '0x' + (digits.upper() if n % 2 else digits[:20] + digits[20:].upper())
+
+
+class Command(BaseCommand):
+    help = 'Wallet lookup cost: address__iexact (scan) vs the normalized address_lower index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=1000, help='indexed lookups to time')
+        parser.add_argument('--scans', type=int, default=20, help='iexact lookups to time (each one scans)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def _time(self, lookup, addresses):
+        latencies = []
+        for address in addresses:
+            start = time.perf_counter()
+            found = lookup(address)
+            latencies.append(time.perf_counter() - start)
+            assert found is not None, address
+        return latencies
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with bench_database():
+            start = time.perf_counter()
+            batch = []
+            for n in range(options['wallets']):
+                address = _address(n)
+                # bulk_create skips save(): fill the normalized column here
+                batch.append(Wallet(id=uuid.UUID(int=n + 1), address=address, address_lower=normalize_address(address)))
+                if len(batch) == 20_000:
+                    Wallet.objects.bulk_create(batch)
+                    batch = []
+            Wallet.objects.bulk_create(batch)
+            self.stdout.write(f"{options['wallets']} wallets inserted in {time.perf_counter() - start:.1f}s")
+
+            # callers pass whatever case they got (events carry checksum case, clients often lower case)
+            def sample(count):
+                return [_address(rng.randrange(options['wallets'])).lower() for _ in range(count)]
+
+            iexact = self._time(lambda a: Wallet.objects.filter(address__iexact=a).first(), sample(options['scans']))
+            indexed = self._time(
+                lambda a: Wallet.objects.filter(address_lower=normalize_address(a)).first(), sample(options['lookups'])
+            )
+            plans = {
+                'iexact': Wallet.objects.filter(address__iexact='0xab').explain(),
+                'address_lower': Wallet.objects.filter(address_lower='0xab').explain(),
+            }
+
+        self.stdout.write(f"address__iexact  {summarize(iexact)}")
+        self.stdout.write(f"address_lower    {summarize(indexed)}")
+        for name, plan in plans.items():
+            self.stdout.write(f"plan {name}: {' | '.join(plan.splitlines())}")
@@ -0,0 +1,79 @@
+import json
+import time
+from decimal import Decimal
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from contract.benchmarks import bench_database, make_campaign, make_donor, pledged_log, alchemy_payload, summarize
+from contract.webhook import alchemy_webhook, alchemy_webhook_inline, process_payload
+
+
+class Command(BaseCommand):
+    help = 'Compare webhook latency and throughput: inline processing vs the inbox + worker pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payloads', type=int, default=50, help='webhook deliveries per run')
+        parser.add_argument('--logs', type=int, default=10, help='Pledged logs per delivery')
+        parser.add_argument('--campaigns', type=int, default=5)
+        parser.add_argument('--donors', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def _payloads(self, options, donors, first_block):
+        payloads = []
+        for n in range(options['payloads']):
+            logs = [
+                pledged_log(
+                    campaign_id=(n + i) % options['campaigns'] + 1,
+                    donor=donors[(n * options['logs'] + i) % len(donors)],
+                    net_amount=Decimal('10'),
+                    log_index=i,
+                )
+                for i in range(options['logs'])
+            ]
+            payloads.append(json.dumps(alchemy_payload(logs, block_number=first_block + n)))
+        return payloads
+
+    def _post(self, view, bodies):
+        factory = RequestFactory()
+        latencies = []
+        for body in bodies:
+            request = factory.post('/contract/webhook/', data=body, content_type='application/json')
+            start = time.perf_counter()
+            response = view(request)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.content
+        return latencies
+
+    def handle(self, *args, **options):
+        events = options['payloads'] * options['logs']
+        with bench_database():
+            for contract_id in range(1, options['campaigns'] + 1):
+                make_campaign(contract_id)
+            donors = [make_donor(i) for i in range(options['donors'])]
+
+            # inline: every log is applied before the response
+            bodies = self._payloads(options, donors, first_block=1)
+            start = time.perf_counter()
+            inline = self._post(alchemy_webhook_inline, bodies)
+            inline_total = time.perf_counter() - start
+
+            # queued: store + acknowledge, then drain with the worker pool
+            bodies = self._payloads(options, donors, first_block=options['payloads'] + 1)
+            start = time.perf_counter()
+            queued = self._post(alchemy_webhook, bodies)
+            call_command('process_webhooks', once=True, workers=options['workers'], stdout=open('/dev/null', 'w'))
+            queued_total = time.perf_counter() - start
+
+            # redelivery: every log is already in the ProcessedEvent ledger
+            start = time.perf_counter()
+            for body in bodies:
+                process_payload(json.loads(body))
+            replay_total = time.perf_counter() - start
+
+        self.stdout.write(f"{options['payloads']} deliveries x {options['logs']} Pledged logs ({events} events)")
+        self.stdout.write(f"inline  request latency: {summarize(inline)}")
+        self.stdout.write(f"inline  throughput:      {events / inline_total:.1f} events/s")
+        self.stdout.write(f"queued  request latency: {summarize(queued)}")
+        self.stdout.write(f"queued  throughput:      {events / queued_total:.1f} events/s "
+                          f"(end-to-end, {options['workers']} workers)")
+        self.stdout.write(f"replay  throughput:      {events / replay_total:.1f} events/s (duplicates skipped)")
@@ -0,0 +1,54 @@
+import random
+import threading
+import time
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.fakechain import FakeChain, FakeWsServer, serve_http
+
+
+class Command(BaseCommand):
+    help = 'Serve an in-memory chain of MilestoneCrowdfund Pledged logs over JSON-RPC (for poller/subscriber testing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8545)
+        parser.add_argument('--ws-port', type=int, default=None, help='also serve eth_subscribe over a websocket')
+        parser.add_argument('--blocks', type=int, default=1000)
+        parser.add_argument('--block-time', type=float, default=0, help='keep mining a block every N seconds')
+        parser.add_argument('--pledges-per-block', type=int, default=2)
+        parser.add_argument('--campaigns', type=int, default=5, help='contract ids 1..N')
+        parser.add_argument('--donors', type=int, default=20)
+        parser.add_argument('--max-block-range', type=int, default=None, help='reject larger eth_getLogs ranges')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        chain = FakeChain(max_block_range=options['max_block_range'])
+
+        def mine():
+            chain.mine([
+                ('Pledged', {
+                    'id': rng.randint(1, options['campaigns']),
+                    'donor': Web3.to_checksum_address(f"0x{rng.randint(1, options['donors']):040x}"),
+                    'netAmount': rng.randint(1, 100) * 10 ** 6,
+                    'feeAmount': 0,
+                    'tipAmount': 0,
+                })
+                for _ in range(options['pledges_per_block'])
+            ])
+
+        for _ in range(options['blocks']):
+            mine()
+
+        if options['ws_port']:
+            server = FakeWsServer(chain, port=options['ws_port']).start()
+            self.stdout.write(f"websocket on {server.url}")
+
+        if options['block_time']:
+            def keep_mining():
+                while True:
+                    time.sleep(options['block_time'])
+                    mine()
+            threading.Thread(target=keep_mining, daemon=True).start()
+
+        self.stdout.write(f"serving {chain.head} blocks on http://127.0.0.1:{options['port']}")
+        serve_http(chain, port=options['port'])
@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from web3 import Web3
+from contract.blockchain import w3
+from contract.poller import LogPoller
+
+
+class Command(BaseCommand):
+    help = 'Poll contract logs with eth_getLogs, keep a block checkpoint and backfill anything missed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rpc-url', help='JSON-RPC endpoint (default: ALCHEMY_HTTP)')
+        parser.add_argument('--from-block', type=int, help='first block when no checkpoint exists yet')
+        parser.add_argument('--backfill', nargs=2, type=int, metavar=('FROM', 'TO'),
+                            help='re-read an explicit block range and exit (checkpoint untouched)')
+        parser.add_argument('--confirmations', type=int, default=5)
+        parser.add_argument('--max-range', type=int, default=2000, help='largest eth_getLogs block range')
+        parser.add_argument('--interval', type=float, default=2.0, help='seconds to sleep once caught up')
+        parser.add_argument('--max-backoff', type=float, default=60.0, help='longest wait after a failed poll')
+        parser.add_argument('--once', action='store_true', help='exit once caught up with the chain head')
+
+    def handle(self, *args, **options):
+        client = Web3(Web3.HTTPProvider(options['rpc_url'])) if options['rpc_url'] else w3
+        poller = LogPoller(client, confirmations=options['confirmations'], max_range=options['max_range'])
+
+        if options['backfill']:
+            start, end = options['backfill']
+            blocks, logs, applied = poller.backfill(start, end)
+            self.stdout.write(self.style.SUCCESS(f"backfilled {blocks} blocks: {logs} logs, {applied} applied"))
+            return
+
+        checkpoint = poller.checkpoint(options['from_block'])
+        self.stdout.write(f"polling from block {checkpoint.block_number + 1}")
+        delay = options['interval']
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    blocks, logs, applied = poller.poll_once(checkpoint)
+                except Exception as e:
+                    # provider or database trouble: keep the checkpoint and try again, backing off
+                    if options['once']:
+                        raise
+                    self.stderr.write(f"poll failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    delay = min(options['max_backoff'], delay * 2)
+                    close_old_connections()
+                    continue
+                delay = options['interval']
+                if blocks:
+                    rate = blocks / max(time.perf_counter() - started, 1e-9) * 60
+                    self.stdout.write(
+                        f"blocks ..{checkpoint.block_number}: {logs} logs, {applied} applied "
+                        f"({rate:,.0f} blocks/min, range {poller.span})"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"checkpoint at block {checkpoint.block_number}"))
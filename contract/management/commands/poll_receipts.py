@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from contract.blockchain import CHAIN, w3
+from contract.tracker import ReceiptPoller, speed_up
+
+
+class Command(BaseCommand):
+    help = 'Record receipts of pending owner transactions (one JSON-RPC batch per cycle) and flag stuck ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5.0, help='seconds between cycles')
+        parser.add_argument('--once', action='store_true', help='run one cycle and exit')
+        parser.add_argument('--bump', action='store_true', help='re-send stuck transactions with higher fees')
+        parser.add_argument('--stuck-after', type=int, default=None, help='seconds (default: OWNER_TX_STUCK_AFTER)')
+
+    def handle(self, *args, **options):
+        poller = ReceiptPoller(w3, CHAIN, stuck_after=options['stuck_after'])
+        while True:
+            try:
+                mined, stuck, pending = poller.poll_once()
+                if mined or stuck:
+                    self.stdout.write(f"{mined} mined, {stuck} newly stuck, {pending} pending")
+                for owner_tx in poller.stuck():
+                    if not options['bump']:
+                        self.stderr.write(f"stuck: {owner_tx.tx_hash} nonce {owner_tx.nonce} ({owner_tx.function})")
+                        continue
+                    replacement = speed_up(owner_tx)
+                    self.stdout.write(f"re-sent {owner_tx.tx_hash} as {replacement.tx_hash}")
+            except Exception as e:
+                # RPC outage: the transactions stay open and are checked next cycle
+                self.stderr.write(f"receipt poll failed: {e}")
+                if options['once']:
+                    raise
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
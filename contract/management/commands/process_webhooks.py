@@ -0,0 +1,209 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from contract.blockchain import warm_up
+from contract.leases import acquire_lease, release_lease
+from contract.models import WebhookEvent
+from contract.webhook import event_campaigns, flush_funding, process_webhook_event
+
+LEASE = 'process_webhooks'
+
+
+def claim_events(limit, campaigns, scan=None):
+    """
+    Move up to `limit` inbox rows to PROCESSING and return them, oldest first.
+
+    Only the oldest unfinished delivery of each campaign is claimed: a row
+    behind one that is still PROCESSING, or PENDING until its retry_at, stays
+    in the inbox. Each campaign's deliveries are so applied one at a time and
+    in inbox order, retries included (a Pledged or a milestone update never
+    overtakes an earlier one), while other campaigns run side by side. The
+    exception is a delivery creating a campaign: nothing can precede it, so
+    it does not wait behind an earlier delivery of that campaign (e.g. a
+    pledge retried until its CampaignCreated is applied).
+    `campaigns` caches event_campaigns() by row id across calls; the oldest
+    `scan` unfinished rows are looked at.
+    """
+    scan = scan or max(limit * 10, 500)
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[WebhookEvent.PENDING, WebhookEvent.PROCESSING])
+            .order_by('id')
+            .values_list('id', 'status', 'retry_at')[:scan]
+        )
+        # stored bodies never change: decode each one once
+        window = {pk for pk, _, _ in rows}
+        for pk in [pk for pk in campaigns if pk not in window]:
+            del campaigns[pk]
+        missing = [pk for pk in window if pk not in campaigns]
+        if missing:
+            for pk, payload in WebhookEvent.objects.filter(id__in=missing).values_list('id', 'payload'):
+                campaigns[pk] = event_campaigns(payload)
+
+        ids, busy = [], set()
+        for pk, status, retry_at in rows:
+            if len(ids) >= limit:
+                break
+            named, created = campaigns[pk]
+            due = status == WebhookEvent.PENDING and (retry_at is None or retry_at <= now)
+            if due and not (named - created) & busy:
+                ids.append(pk)
+            # later deliveries of these campaigns wait behind this one
+            busy |= named
+        if not ids:
+            return []
+        WebhookEvent.objects.filter(id__in=ids, status=WebhookEvent.PENDING).update(
+            status=WebhookEvent.PROCESSING,
+            attempts=F('attempts') + 1,
+            locked_at=timezone.now(),
+        )
+    return list(WebhookEvent.objects.filter(id__in=ids, status=WebhookEvent.PROCESSING).order_by('id'))
+
+
+def requeue_stale(stale_after):
+    """Give rows left in PROCESSING by a crashed worker back to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return WebhookEvent.objects.filter(
+        status=WebhookEvent.PROCESSING, locked_at__lt=cutoff
+    ).update(status=WebhookEvent.PENDING, locked_at=None)
+
+
+def _retry(event, retry_delay):
+    # back in the inbox after a delay that grows with each attempt; the campaign's
+    # later deliveries are not claimed before it
+    WebhookEvent.objects.filter(pk=event.pk).update(
+        status=WebhookEvent.PENDING, locked_at=None,
+        retry_at=timezone.now() + timedelta(seconds=retry_delay * event.attempts),
+    )
+
+
+def _run(event, max_attempts, retry_delay):
+    close_old_connections()
+    try:
+        ok = process_webhook_event(event)
+        if not ok and event.attempts < max_attempts:
+            # e.g. pledges whose CampaignCreated has not been applied yet
+            _retry(event, retry_delay)
+        return ok
+    except Exception:
+        try:
+            _retry(event, retry_delay)
+        except Exception:
+            # row stays PROCESSING, holding its campaigns, until requeue_stale
+            pass
+        return False
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Drain the Alchemy webhook inbox with a bounded pool of workers. Deliveries of one campaign '
+            'are applied in inbox order. Only one process may run per database (a WorkerLease enforces it); '
+            'scale it with --workers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='number of worker threads')
+        parser.add_argument('--max-in-flight', type=int, default=None,
+                            help='events claimed but not finished before the claimer waits (default: 2 x workers)')
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--retry-delay', type=float, default=5.0,
+                            help='seconds before a failed delivery is retried, times its attempts so far')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to sleep when the inbox is empty')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='seconds after which a PROCESSING row is considered abandoned')
+        parser.add_argument('--lease-ttl', type=int, default=60,
+                            help='seconds another process waits for this one to renew its lease before taking over')
+        parser.add_argument('--once', action='store_true', help='exit once the inbox is empty')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        max_in_flight = options['max_in_flight'] or workers * 2
+        max_attempts = options['max_attempts']
+        lease_ttl = options['lease_ttl']
+
+        acquired, lease = acquire_lease(LEASE, lease_ttl)
+        if not acquired:
+            raise CommandError(f"process_webhooks is already running ({lease.owner}, lease until {lease.expires_at})")
+        try:
+            done, failed = self.drain(workers, max_in_flight, max_attempts, lease_ttl, options)
+        finally:
+            release_lease(LEASE)
+        self.stdout.write(self.style.SUCCESS(f"processed {done} webhook events, {failed} failed"))
+
+    def drain(self, workers, max_in_flight, max_attempts, lease_ttl, options):
+        # decoding needs the event decoders; build them before the workers race for them
+        warm_up()
+
+        requeued = requeue_stale(options['stale_after'])
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"requeued {requeued} abandoned webhook events"))
+
+        done = failed = 0
+        running = {}  # future -> event
+        campaigns = {}
+        last_rollup = last_renewal = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    if time.monotonic() - last_renewal >= lease_ttl / 3:
+                        try:
+                            acquired, lease = acquire_lease(LEASE, lease_ttl)
+                        except OperationalError:
+                            # database busy; renewed on the next pass, well before the lease runs out
+                            acquired = True
+                        else:
+                            last_renewal = time.monotonic()
+                        if not acquired:
+                            self.stderr.write(f"lease taken over by {lease.owner}, stopping")
+                            break
+
+                    # sharded funding counters: fold pledges into the projects every few hundred ms
+                    if settings.FUNDING_SHARDS and time.monotonic() - last_rollup >= settings.FUNDING_ROLLUP_INTERVAL:
+                        try:
+                            flush_funding()
+                        except OperationalError:
+                            # database busy; the next pass picks the shards up
+                            pass
+                        last_rollup = time.monotonic()
+
+                    # backpressure: only claim what the pool can start soon
+                    free = max_in_flight - len(running)
+                    try:
+                        claimed = claim_events(free, campaigns) if free > 0 else []
+                    except OperationalError:
+                        # database busy (e.g. sqlite write lock); let running events finish first
+                        claimed = []
+                        if not running:
+                            time.sleep(options['poll_interval'])
+                            continue
+                    for event in claimed:
+                        running[pool.submit(_run, event, max_attempts, options['retry_delay'])] = event
+
+                    if not running:
+                        if options['once'] and not WebhookEvent.objects.filter(status=WebhookEvent.PENDING).exists():
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    finished, _ = wait(running, timeout=settings.FUNDING_ROLLUP_INTERVAL,
+                                       return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        del running[future]
+                        if future.result():
+                            done += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                self.stdout.write("stopping, waiting for in-flight events")
+            wait(running)
+
+        if settings.FUNDING_SHARDS:
+            flush_funding()
+        return done, failed
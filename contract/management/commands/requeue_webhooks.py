@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+from contract.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = ('Put stored webhook deliveries back in the inbox for reprocessing. '
+            'Logs already in the ProcessedEvent ledger are skipped, so this is safe to run on DONE rows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', nargs='+', default=[WebhookEvent.FAILED],
+                            choices=[WebhookEvent.DONE, WebhookEvent.FAILED])
+        parser.add_argument('--since', help='only deliveries received at or after this ISO datetime')
+        parser.add_argument('--ids', nargs='+', type=int, help='only these inbox ids')
+
+    def handle(self, *args, **options):
+        events = WebhookEvent.objects.filter(status__in=options['status'])
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                self.stderr.write(self.style.ERROR(f"invalid --since value: {options['since']}"))
+                return
+            events = events.filter(received_at__gte=since)
+        if options['ids']:
+            events = events.filter(id__in=options['ids'])
+
+        updated = events.update(status=WebhookEvent.PENDING, attempts=0, locked_at=None, retry_at=None)
+        self.stdout.write(self.style.SUCCESS(f"{updated} webhook events queued for reprocessing"))
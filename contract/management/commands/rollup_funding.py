@@ -0,0 +1,30 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from contract.webhook import flush_funding
+
+
+class Command(BaseCommand):
+    help = 'Fold the sharded funding counters into project totals, progress and milestones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help='seconds between rollups (default: FUNDING_ROLLUP_INTERVAL)')
+        parser.add_argument('--once', action='store_true', help='run one rollup and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or settings.FUNDING_ROLLUP_INTERVAL
+        while True:
+            try:
+                rolled = flush_funding()
+                if rolled:
+                    self.stdout.write(f"rolled up {rolled} campaign(s)")
+            except Exception as e:
+                # the amounts stay in their shards until the next rollup
+                self.stderr.write(f"funding rollup failed: {e}")
+                if options['once']:
+                    raise
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from contract.blockchain import ALCHEMY_WS, w3
+from contract.subscriber import LogSubscriber
+
+
+class Command(BaseCommand):
+    help = 'Apply contract events as they are pushed over an eth_subscribe("logs") websocket'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ws-url', default=ALCHEMY_WS, help='websocket endpoint (default: ALCHEMY_WS)')
+        parser.add_argument('--rpc-url', help='HTTP endpoint for the catch-up reads (default: ALCHEMY_HTTP)')
+        parser.add_argument('--from-block', type=int, help='first block when no checkpoint exists yet')
+        parser.add_argument('--max-backoff', type=float, default=30.0, help='longest wait between reconnects')
+        parser.add_argument('--confirmations', type=int, default=None,
+                            help='blocks on top of a log before it is applied, each adding a block time of latency; '
+                                 'reorged-out logs are dropped until then (default: SUBSCRIBE_CONFIRMATIONS)')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+        http_w3 = Web3(Web3.HTTPProvider(options['rpc_url'])) if options['rpc_url'] else w3
+        subscriber = LogSubscriber(options['ws_url'], http_w3=http_w3, max_backoff=options['max_backoff'],
+                                   confirmations=options['confirmations'])
+        self.stdout.write(f"subscribing to {subscriber.address} on {options['ws_url']}")
+        try:
+            asyncio.run(subscriber.run(start_block=options['from_block']))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"{subscriber.pushed} logs pushed over {subscriber.connects} connection(s), {subscriber.removed} removed"
+        ))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from contract.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Refresh CampaignSnapshot rows for every deployed project from the chain (batched reads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60.0, help='seconds between sweeps')
+        parser.add_argument('--once', action='store_true', help='run one sweep and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            try:
+                refreshed, failed = refresh_snapshots()
+                self.stdout.write(f"{refreshed} snapshot(s) refreshed, {len(failed)} failed "
+                                  f"in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                # RPC outage: keep the old snapshots and try again next round
+                self.stderr.write(f"sweep failed: {e}")
+                if options['once']:
+                    raise
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(max(0.0, options['interval'] - (time.perf_counter() - started)))
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from accounts.intents import expire_intents
+
+
+class Command(BaseCommand):
+    help = 'Fail pending pledges whose intent expired (batched, through the open-intent index)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60.0, help='seconds between sweeps')
+        parser.add_argument('--batch-size', type=int, default=None, help='intents expired per statement (default: PLEDGE_SWEEP_BATCH)')
+        parser.add_argument('--once', action='store_true', help='run one sweep and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            expired = expire_intents(options['batch_size'])
+            self.stdout.write(f"{expired} pledge intent(s) expired in {time.perf_counter() - started:.2f}s")
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(max(0.0, options['interval'] - (time.perf_counter() - started)))
@@ -0,0 +1,230 @@
+from django.db import models
+
+# Create your models here.
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox row for a raw Alchemy webhook delivery.
+    The view only stores the body; the process_webhooks command applies it.
+    """
+    PENDING = 'PENDING'
+    PROCESSING = 'PROCESSING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    status = [
+    (PENDING,'PENDING'),
+    (PROCESSING,'PROCESSING'),
+    (DONE,'DONE'),
+    (FAILED,'FAILED'),
+    ]
+
+    payload = models.TextField()
+    status = models.CharField(max_length=20, choices=status, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    # a failed delivery goes back to PENDING but is not claimed again before this
+    retry_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"webhook #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+
+class ProcessedEvent(models.Model):
+    """
+    Ledger of contract logs that have already been applied to the database.
+    A log is identified on-chain by (chain, tx_hash, log_index); redeliveries hit the unique index.
+    """
+    chain = models.CharField(max_length=40)
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.PositiveIntegerField()
+    event = models.CharField(max_length=50)
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    processed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event} {self.tx_hash}:{self.log_index}"
+
+    class Meta:
+        ordering = ['-id']
+        constraints = [
+            models.UniqueConstraint(fields=['chain', 'tx_hash', 'log_index'], name='unique_processed_event'),
+        ]
+
+
+class ChainCheckpoint(models.Model):
+    """Last block fully ingested by a log consumer (poller, websocket subscriber)."""
+    name = models.CharField(max_length=100, unique=True)
+    block_number = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.block_number}"
+
+
+class WorkerLease(models.Model):
+    """
+    Named lease for a worker that must run in one process only (see
+    contract.leases); the holder renews expires_at while it runs.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.owner or 'free'})"
+
+
+class OwnerNonce(models.Model):
+    """
+    Next nonce to hand out for an account that signs from several processes.
+    Allocation is a single atomic increment of this row (see contract.nonces).
+    """
+    chain = models.CharField(max_length=40)
+    address = models.CharField(max_length=42)
+    next_nonce = models.PositiveBigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} next nonce {self.next_nonce}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chain', 'address'], name='unique_owner_nonce'),
+        ]
+
+
+class OwnerTransaction(models.Model):
+    """
+    Transaction sent from the owner account, tracked until it is mined.
+    send_owner_tx records it; the poll_receipts command fills in the receipt
+    (see contract.tracker). A fee bump is a new row with the same nonce.
+    """
+    PENDING = 'PENDING'
+    STUCK = 'STUCK'
+    SUCCESS = 'SUCCESS'
+    REVERTED = 'REVERTED'
+    DROPPED = 'DROPPED'
+
+    status = [
+    (PENDING,'PENDING'),
+    (STUCK,'STUCK'),
+    (SUCCESS,'SUCCESS'),
+    (REVERTED,'REVERTED'),
+    (DROPPED,'DROPPED'),
+    ]
+
+    chain = models.CharField(max_length=40)
+    tx_hash = models.CharField(max_length=66, unique=True)
+    sender = models.CharField(max_length=42)
+    nonce = models.PositiveBigIntegerField()
+    to = models.CharField(max_length=42, null=True, blank=True)
+    function = models.CharField(max_length=64, blank=True)
+    data = models.TextField(blank=True)
+    value = models.DecimalField(max_digits=78, decimal_places=0, default=0)
+    gas_limit = models.PositiveBigIntegerField()
+    gas_price = models.PositiveBigIntegerField(null=True, blank=True)
+    max_fee_per_gas = models.PositiveBigIntegerField(null=True, blank=True)
+    max_priority_fee_per_gas = models.PositiveBigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=status, default=PENDING)
+    replaced_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='replaces')
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    gas_used = models.PositiveBigIntegerField(null=True, blank=True)
+    effective_gas_price = models.PositiveBigIntegerField(null=True, blank=True)
+    sent_at = models.DateTimeField(auto_now_add=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+    mined_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.function or 'tx'} {self.tx_hash} ({self.status})"
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'sent_at']),
+            models.Index(fields=['chain', 'sender', 'nonce']),
+        ]
+
+
+class ChainTransaction(models.Model):
+    """
+    Mined transaction and its receipt, as returned by the node (hex JSON).
+    Mined transactions never change, so rows are written once and kept; see
+    contract.txcache for the in-process tier in front of this table.
+    """
+    chain = models.CharField(max_length=40)
+    tx_hash = models.CharField(max_length=66)
+    block_number = models.PositiveBigIntegerField()
+    transaction = models.JSONField()
+    receipt = models.JSONField(null=True, blank=True)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.tx_hash} @ {self.block_number}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chain', 'tx_hash'], name='unique_chain_transaction'),
+        ]
+
+
+class CampaignSnapshot(models.Model):
+    """
+    Last known on-chain state (getCampaign + getMilestone) of a deployed Project.
+    Written in bulk by the sweep_campaigns command so pages read chain state
+    from the database instead of waiting on the RPC. Amounts are raw token units.
+    """
+    FUNDRAISING = 0
+    SUCCEEDED = 1
+    FAILED = 2
+    CANCELLED = 3
+
+    state = [
+    (FUNDRAISING,'Fundraising'),
+    (SUCCEEDED,'Succeeded'),
+    (FAILED,'Failed'),
+    (CANCELLED,'Cancelled'),
+    ]
+
+    ETH = 0
+    ERC20 = 1
+
+    currency_type = [
+    (ETH,'ETH'),
+    (ERC20,'ERC20'),
+    ]
+
+    project = models.OneToOneField('projects.Project', on_delete=models.CASCADE, related_name='onchain_snapshot')
+    contract_id = models.IntegerField()
+    creator = models.CharField(max_length=42)
+    currency_type = models.PositiveSmallIntegerField(choices=currency_type)
+    token = models.CharField(max_length=42)
+    goal = models.DecimalField(max_digits=78, decimal_places=0)
+    total_raised = models.DecimalField(max_digits=78, decimal_places=0)
+    total_withdrawn = models.DecimalField(max_digits=78, decimal_places=0)
+    deadline = models.DateTimeField(null=True, blank=True)
+    state = models.PositiveSmallIntegerField(choices=state)
+    context_data = models.TextField(blank=True)
+    offchain_id = models.CharField(max_length=255, blank=True)
+    milestone_count = models.PositiveIntegerField(default=0)
+    milestones_released = models.PositiveIntegerField(default=0)
+    total_bps_released = models.PositiveIntegerField(default=0)
+    # [{'name', 'amount', 'approved', 'released'} or None when unreadable, ...]
+    milestones = models.JSONField(default=list)
+    block_number = models.PositiveBigIntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField()
+    # last refresh failure; the previous values are kept
+    error = models.TextField(null=True, blank=True)
+
+    def __str__(self):
+        return f"campaign {self.contract_id} @ {self.block_number}"
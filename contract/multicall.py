@@ -0,0 +1,203 @@
+"""
+Batched contract reads.
+
+BatchReader.call() takes bound ContractFunctions (`contract.functions.x(...)`)
+and runs them in one round trip: packed into a single Multicall3.aggregate3
+eth_call, or as a JSON-RPC batch when the multicall contract is not there.
+Results come back in order and decoded exactly like ContractFunction.call().
+AsyncBatchReader does the same for AsyncWeb3 clients, sending the chunks of
+a large read concurrently.
+"""
+import asyncio
+
+from eth_utils.abi import get_abi_output_types
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.exceptions import ContractLogicError
+
+# same address on every chain it is deployed to (Polygon, Amoy, ...)
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+]
+
+
+class BatchReader:
+
+    def __init__(self, client, multicall_address=MULTICALL3_ADDRESS, max_calls=200):
+        self.client = client
+        self.multicall = client.eth.contract(address=multicall_address, abi=MULTICALL3_ABI)
+        self.max_calls = max_calls
+        # switched off once aggregate3 fails and the multicall address turns out to
+        # have no code; other failures (timeouts, rate limits) only cost that chunk
+        self.use_multicall = True
+        self.round_trips = 0
+
+    def call(self, functions, allow_failure=False, block_identifier='latest'):
+        """
+        Results of `functions`, in order. With allow_failure a failed call
+        yields its exception instead of raising it.
+        """
+        functions = list(functions)
+        results = []
+        for start in range(0, len(functions), self.max_calls):
+            results += self._call_chunk(functions[start:start + self.max_calls], block_identifier)
+        if not allow_failure:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def _call_chunk(self, functions, block_identifier):
+        if not functions:
+            return []
+        if self.use_multicall:
+            try:
+                return self._aggregate(functions, block_identifier)
+            except Exception:
+                if self._multicall_missing():
+                    self.use_multicall = False
+        try:
+            return self._rpc_batch(functions, block_identifier)
+        except Exception:
+            # provider without batch support: one request per call
+            results = []
+            for fn in functions:
+                self.round_trips += 1
+                try:
+                    results.append(fn.call(block_identifier=block_identifier))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    def _multicall_missing(self):
+        """True only when the chain answers that the multicall address has no code."""
+        self.round_trips += 1
+        try:
+            return not self.client.eth.get_code(self.multicall.address)
+        except Exception:
+            # no answer is not a definitive one: keep trying multicall on later chunks
+            return False
+
+    def _aggregate(self, functions, block_identifier):
+        calls = [(fn.address, True, fn._encode_transaction_data()) for fn in functions]
+        self.round_trips += 1
+        returned = self.multicall.functions.aggregate3(calls).call(block_identifier=block_identifier)
+        return [
+            self._decode(fn, data) if success else ContractLogicError(f"{fn.abi['name']} reverted", data=data)
+            for fn, (success, data) in zip(functions, returned)
+        ]
+
+    def _decode(self, fn, data):
+        output_types = get_abi_output_types(fn.abi)
+        try:
+            decoded = self.client.codec.decode(output_types, data)
+        except Exception as e:
+            return e
+        normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+        return normalized[0] if len(normalized) == 1 else normalized
+
+    def _rpc_batch(self, functions, block_identifier):
+        self.round_trips += 1
+        with self.client.batch_requests() as batch:
+            for fn in functions:
+                batch.add(fn.call(block_identifier=block_identifier))
+            return batch.execute()
+
+
+class AsyncBatchReader(BatchReader):
+    """BatchReader for an AsyncWeb3 client; chunks are sent concurrently, at most `concurrency` at a time."""
+
+    def __init__(self, client, multicall_address=MULTICALL3_ADDRESS, max_calls=200, concurrency=8):
+        super().__init__(client, multicall_address, max_calls)
+        self.concurrency = concurrency
+
+    async def call(self, functions, allow_failure=False, block_identifier='latest'):
+        functions = list(functions)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = await asyncio.gather(*(
+            self._call_chunk(functions[start:start + self.max_calls], block_identifier, semaphore)
+            for start in range(0, len(functions), self.max_calls)
+        ))
+        results = [result for chunk in chunks for result in chunk]
+        if not allow_failure:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    async def _call_chunk(self, functions, block_identifier, semaphore):
+        if not functions:
+            return []
+        async with semaphore:
+            if self.use_multicall:
+                try:
+                    return await self._aggregate(functions, block_identifier)
+                except Exception:
+                    if await self._multicall_missing():
+                        self.use_multicall = False
+            try:
+                return await self._rpc_batch(functions, block_identifier)
+            except Exception:
+                pass
+        # provider without batch support: one request per call, still concurrent
+        return await asyncio.gather(*(self._call_one(fn, block_identifier, semaphore) for fn in functions))
+
+    async def _multicall_missing(self):
+        self.round_trips += 1
+        try:
+            return not await self.client.eth.get_code(self.multicall.address)
+        except Exception:
+            return False
+
+    async def _aggregate(self, functions, block_identifier):
+        calls = [(fn.address, True, fn._encode_transaction_data()) for fn in functions]
+        self.round_trips += 1
+        returned = await self.multicall.functions.aggregate3(calls).call(block_identifier=block_identifier)
+        return [
+            self._decode(fn, data) if success else ContractLogicError(f"{fn.abi['name']} reverted", data=data)
+            for fn, (success, data) in zip(functions, returned)
+        ]
+
+    async def _rpc_batch(self, functions, block_identifier):
+        self.round_trips += 1
+        async with self.client.batch_requests() as batch:
+            for fn in functions:
+                batch.add(fn.call(block_identifier=block_identifier))
+            return await batch.async_execute()
+
+    async def _call_one(self, fn, block_identifier, semaphore):
+        async with semaphore:
+            self.round_trips += 1
+            try:
+                return await fn.call(block_identifier=block_identifier)
+            except Exception as e:
+                return e
@@ -0,0 +1,54 @@
+"""
+Database-coordinated nonce allocation for the owner account.
+
+Web workers, admin actions and management commands all sign with the same
+key, so the next nonce lives in one OwnerNonce row and is handed out with an
+atomic increment instead of asking the node for the pending count on every
+send. The row is seeded from the chain on first use and resynced from it
+whenever a send fails, which also closes gaps left by failed sends.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import OwnerNonce
+
+# node error messages that mean our nonce view is out of date
+NONCE_ERRORS = (
+    'nonce too low',
+    'nonce too high',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+)
+
+
+def is_nonce_error(exc):
+    message = str(exc).lower()
+    return any(text in message for text in NONCE_ERRORS)
+
+
+class NonceManager:
+
+    def __init__(self, address, chain):
+        self.address = address.lower()
+        self.chain = chain
+
+    def _rows(self):
+        return OwnerNonce.objects.filter(chain=self.chain, address=self.address)
+
+    def allocate(self, w3):
+        """Reserve and return the next nonce (one UPDATE + one SELECT)."""
+        with transaction.atomic():
+            if not self._rows().update(next_nonce=F('next_nonce') + 1):
+                pending = w3.eth.get_transaction_count(w3.to_checksum_address(self.address), 'pending')
+                OwnerNonce.objects.get_or_create(chain=self.chain, address=self.address,
+                                                 defaults={'next_nonce': pending})
+                self._rows().update(next_nonce=F('next_nonce') + 1)
+            return self._rows().values_list('next_nonce', flat=True).get() - 1
+
+    def resync(self, w3):
+        """Reset the counter to the node's pending transaction count."""
+        pending = w3.eth.get_transaction_count(w3.to_checksum_address(self.address), 'pending')
+        OwnerNonce.objects.update_or_create(chain=self.chain, address=self.address,
+                                            defaults={'next_nonce': pending})
+        return pending
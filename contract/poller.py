@@ -0,0 +1,143 @@
+"""
+eth_getLogs ingestion: reads contract logs block range by block range and
+feeds them to the same handlers as the Alchemy webhook.
+
+The range grows while the provider answers and halves when it refuses
+(too many results, range too large, timeouts), so catching up on a long
+gap costs few round trips. Progress is kept in a ChainCheckpoint row; the
+ProcessedEvent ledger makes overlaps with webhook deliveries harmless. The
+checkpoint stops before a block whose logs failed to apply, so the next
+poll reads it again; after max_retries polls in a row it moves on (the
+failures stay in ErrorLog).
+"""
+from .blockchain import CHAIN, CONTRACT_ADDRESS
+from .models import ChainCheckpoint
+from .webhook import event_topics, normalize_rpc_log, process_logs, settle_funding
+
+
+def checkpoint_name(address=CONTRACT_ADDRESS, source='logs'):
+    return f"{source}:{CHAIN}:{address.lower()}"
+
+
+class LogPoller:
+
+    def __init__(self, w3, address=CONTRACT_ADDRESS, confirmations=5,
+                 min_range=10, max_range=2000, target_logs=2000, source='logs', max_retries=5):
+        self.w3 = w3
+        self.address = address
+        self.source = source
+        self.confirmations = confirmations
+        self.min_range = min_range
+        self.max_range = max_range
+        self.target_logs = target_logs
+        self.span = max_range
+        self.rpc_calls = 0
+        self.max_retries = max_retries
+        # block the checkpoint is held before, and how many polls in a row stopped there
+        self.retry_block = None
+        self.retries = 0
+
+    # -------------------------
+    # checkpoint
+    # -------------------------
+    def checkpoint(self, start_block=None):
+        """Checkpoint row; a new one starts at `start_block` (default: the current safe head)."""
+        name = checkpoint_name(self.address, self.source)
+        checkpoint = ChainCheckpoint.objects.filter(name=name).first()
+        if checkpoint is None:
+            start = self.safe_head() if start_block is None else start_block - 1
+            checkpoint, _ = ChainCheckpoint.objects.get_or_create(name=name, defaults={'block_number': max(start, 0)})
+        return checkpoint
+
+    def safe_head(self):
+        self.rpc_calls += 1
+        return max(self.w3.eth.block_number - self.confirmations, 0)
+
+    # -------------------------
+    # fetching
+    # -------------------------
+    def fetch(self, from_block, to_block):
+        """eth_getLogs for [from_block, to_block], shrinking the range on provider errors."""
+        self.rpc_calls += 1
+        try:
+            return self.w3.eth.get_logs({
+                'address': self.address,
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'topics': [event_topics()],
+            })
+        except Exception:
+            if to_block - from_block + 1 <= self.min_range:
+                raise
+            self.span = max(self.min_range, (to_block - from_block + 1) // 2)
+            middle = from_block + self.span - 1
+            return self.fetch(from_block, middle) + self.fetch(middle + 1, to_block)
+
+    def apply(self, logs, failed=None):
+        """
+        Apply fetched logs; returns the number applied. The whole range goes to
+        process_logs at once, so campaigns are applied in parallel across blocks
+        while each campaign's events keep (blockNumber, logIndex) order.
+        Logs that failed are added to `failed` as (web3_log, error). Sharded
+        funding is rolled up before returning.
+        """
+        if not logs:
+            return 0
+        entries = [(log, log) for log in map(normalize_rpc_log, logs)]
+        blocks = (min(log['blockNumber'] for _, log in entries), max(log['blockNumber'] for _, log in entries))
+        applied = process_logs(entries, {'source': 'eth_getLogs', 'blocks': blocks}, failed)
+        settle_funding()
+        return applied
+
+    def _complete_through(self, to_block, failed):
+        """Last block the checkpoint may move to: before the first failed block, until it has had its retries."""
+        if not failed:
+            self.retry_block, self.retries = None, 0
+            return to_block
+        first = min(web3_log.get('blockNumber') or to_block for web3_log, _ in failed)
+        self.retries = self.retries + 1 if first == self.retry_block else 1
+        self.retry_block = first
+        if self.retries > self.max_retries:
+            # given up on: its errors are in ErrorLog, requeue by hand with --backfill
+            self.retry_block, self.retries = None, 0
+            return to_block
+        return first - 1
+
+    # -------------------------
+    # loops
+    # -------------------------
+    def poll_once(self, checkpoint):
+        """Ingest the next range after the checkpoint. Returns (blocks, logs, applied)."""
+        head = self.safe_head()
+        from_block = checkpoint.block_number + 1
+        if from_block > head:
+            return 0, 0, 0
+
+        to_block = min(head, from_block + self.span - 1)
+        logs = self.fetch(from_block, to_block)
+        failed = []
+        applied = self.apply(logs, failed)
+
+        # failed logs: read their blocks again next time (the ledger skips what did apply)
+        done = self._complete_through(to_block, failed)
+        if done >= from_block:
+            checkpoint.block_number = done
+            checkpoint.save(update_fields=['block_number', 'updated_at'])
+
+        # grow the window again while results stay small
+        if len(logs) < self.target_logs:
+            self.span = min(self.max_range, self.span * 2)
+        return done - from_block + 1, len(logs), applied
+
+    def backfill(self, from_block, to_block, failed=None):
+        """Re-read an explicit range without touching the checkpoint; failed logs are added to `failed`."""
+        blocks = logs_seen = applied = 0
+        start = from_block
+        while start <= to_block:
+            end = min(to_block, start + self.span - 1)
+            logs = self.fetch(start, end)
+            applied += self.apply(logs, failed)
+            blocks += end - start + 1
+            logs_seen += len(logs)
+            start = end + 1
+        return blocks, logs_seen, applied
@@ -0,0 +1,184 @@
+"""
+Deterministic contract load scenarios for the benchmarks.
+
+A Scenario is a seeded plan of blocks of contract events (CampaignCreated,
+Pledged, MilestoneApproved, MilestoneWithdrawn, CampaignFinalized,
+CampaignHalted, RefundClaimed) plus the database rows they need. The same
+seed always gives the same blocks, tx hashes and amounts, so runs can be
+compared. Blocks can be delivered as Alchemy webhook payloads or mined
+into a FakeChain for the poller / subscriber paths, and expected() gives
+the funds the database should end up with.
+"""
+import random
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from web3 import Web3
+
+from .benchmarks import alchemy_log, alchemy_payload, make_campaign, make_donor
+
+UNITS = 10 ** 6
+# name, ABI args, transaction sender
+ScenarioEvent = namedtuple('ScenarioEvent', ['name', 'args', 'sender'])
+
+SCENARIOS = {
+    # every campaign is created, then a long run of pledges
+    'pledge_storm': {'outcomes': False},
+    # created, funded, then each campaign succeeds (milestones paid out), fails or is halted (refunds)
+    'lifecycle': {'outcomes': True},
+}
+
+
+class Scenario:
+
+    def __init__(self, name='lifecycle', seed=1, campaigns=10, donors=50, pledges=500,
+                 max_block_logs=20, milestones=3):
+        self.name = name
+        self.seed = seed
+        self.campaigns = campaigns
+        self.donors = donors
+        self.pledges = pledges
+        self.max_block_logs = max_block_logs
+        self.milestones = milestones
+        self.outcomes = SCENARIOS[name]['outcomes']
+        self.rng = random.Random(seed)
+        self.blocks = []
+        self.projects = {}   # contract_id -> Project
+        self.creators = {}   # contract_id -> address
+        self.donor_addresses = []
+        self.raised = defaultdict(int)  # contract_id -> net units pledged
+
+    # -------------------------
+    # setup
+    # -------------------------
+    def setup(self):
+        """Undeployed projects, their creators' wallets and the donors (needs a bench database)."""
+        for contract_id in range(1, self.campaigns + 1):
+            creator = Web3.to_checksum_address(f'0x{0xc0de << 120 | contract_id:040x}')
+            self.creators[contract_id] = creator
+            self.projects[contract_id] = make_campaign(
+                contract_id, goal=Decimal(1000 * self.milestones), milestones=self.milestones,
+                deployed=False, creator=creator,
+            )
+        self.donor_addresses = [make_donor(i) for i in range(self.donors)]
+        self.blocks = self.plan()
+        return self
+
+    # -------------------------
+    # plan
+    # -------------------------
+    def _chunks(self, events):
+        """Split a phase into blocks of 1..max_block_logs events."""
+        blocks, position = [], 0
+        while position < len(events):
+            size = self.rng.randint(1, self.max_block_logs)
+            blocks.append(events[position:position + size])
+            position += size
+        return blocks
+
+    def plan(self):
+        rng = self.rng
+        created = [
+            ScenarioEvent('CampaignCreated', {
+                'id': contract_id, 'creator': creator, 'currencyType': 1,
+                'token': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+                'goal': 1000 * self.milestones * UNITS, 'deadline': 1_900_000_000,
+                'offchainId': str(self.projects[contract_id].pk),
+            }, creator)
+            for contract_id, creator in self.creators.items()
+        ]
+
+        pledged, backers = [], defaultdict(list)
+        for _ in range(self.pledges):
+            contract_id = rng.randint(1, self.campaigns)
+            donor = rng.choice(self.donor_addresses)
+            net = rng.randint(1, 200) * UNITS
+            self.raised[contract_id] += net
+            if donor not in backers[contract_id]:
+                backers[contract_id].append(donor)
+            pledged.append(ScenarioEvent('Pledged', {
+                'id': contract_id, 'donor': donor, 'netAmount': net,
+                'feeAmount': net // 100, 'tipAmount': rng.choice([0, 0, UNITS]),
+            }, donor))
+
+        outcomes = []
+        if self.outcomes:
+            for contract_id, creator in self.creators.items():
+                raised = self.raised[contract_id]
+                fate = rng.choice(['succeeded', 'failed', 'halted'])
+                if fate == 'succeeded':
+                    withdrawn = 0
+                    for index in range(self.milestones):
+                        amount = raised // self.milestones
+                        withdrawn += amount
+                        outcomes.append(ScenarioEvent('MilestoneApproved', {'id': contract_id, 'milestoneIndex': index}, creator))
+                        outcomes.append(ScenarioEvent('MilestoneWithdrawn', {
+                            'id': contract_id, 'milestoneIndex': index, 'amount': amount, 'totalWithdrawn': withdrawn,
+                        }, creator))
+                    outcomes.append(ScenarioEvent('CampaignFinalized', {'id': contract_id, 'newState': 1, 'totalRaised': raised}, creator))
+                    continue
+                if fate == 'failed':
+                    outcomes.append(ScenarioEvent('CampaignFinalized', {'id': contract_id, 'newState': 2, 'totalRaised': raised}, creator))
+                else:
+                    outcomes.append(ScenarioEvent('CampaignHalted', {'id': contract_id, 'totalWithdrawn': 0, 'refundableBps': 10_000}, creator))
+                for donor in backers[contract_id]:
+                    outcomes.append(ScenarioEvent('RefundClaimed', {'id': contract_id, 'donor': donor, 'amount': UNITS}, donor))
+
+        return self._chunks(created) + self._chunks(pledged) + self._chunks(outcomes)
+
+    # -------------------------
+    # delivery
+    # -------------------------
+    def tx_hash(self, block_number, log_index):
+        return Web3.keccak(text=f'{self.name}:{self.seed}:{block_number}:{log_index}').to_0x_hex()
+
+    def payloads(self, first_block=1):
+        """One Alchemy webhook payload per block."""
+        for offset, events in enumerate(self.blocks):
+            block_number = first_block + offset
+            logs = [
+                alchemy_log(event.name, event.args, self.tx_hash(block_number, index), index, event.sender)
+                for index, event in enumerate(events)
+            ]
+            yield alchemy_payload(logs, block_number=block_number)
+
+    def mine(self, chain):
+        """Mine every block into a FakeChain; returns the block numbers."""
+        return [chain.mine([(event.name, event.args) for event in events]) for events in self.blocks]
+
+    def load_views(self, chain, fee_bps=100):
+        """Contract views matching the end of the scenario: campaigns, milestones and globals."""
+        for contract_id, creator in self.creators.items():
+            chain.add_campaign(contract_id, goal=1000 * self.milestones * UNITS, raised=self.raised[contract_id],
+                               milestones=self.milestones, creator=creator)
+        owner = Web3.to_checksum_address('0x' + 'ab' * 20)
+        chain.set_view('campaignCount', [], self.campaigns)
+        chain.set_view('owner', [], owner)
+        chain.set_view('paused', [], False)
+        chain.set_view('defaultFeeBps', [], fee_bps)
+        chain.set_view('platformWallet', [], owner)
+        chain.set_view('treasuryWallet', [], owner)
+
+    # -------------------------
+    # checks
+    # -------------------------
+    @property
+    def events(self):
+        return sum(len(events) for events in self.blocks)
+
+    def counts(self):
+        counts = defaultdict(int)
+        for events in self.blocks:
+            for event in events:
+                counts[event.name] += 1
+        return dict(counts)
+
+    def expected(self):
+        """{contract_id: total_funds} the projects should end with."""
+        return {contract_id: Decimal(self.raised[contract_id]) / UNITS for contract_id in self.creators}
+
+    def check(self):
+        """contract_ids whose total_funds differ from expected()."""
+        from projects.models import Project
+        funds = dict(Project.objects.filter(contract_id__isnull=False).values_list('contract_id', 'total_funds'))
+        return [contract_id for contract_id, total in self.expected().items() if funds.get(contract_id) != total]
@@ -0,0 +1,114 @@
+"""
+CampaignSnapshot refresh: reads every given deployed Project from the chain
+in batched calls (see campaigns_onchain) pinned to one block, and upserts all
+snapshots with a single statement. With CHAIN_ASYNC the reads go through the
+AsyncWeb3 client (contract.aio) and the batch chunks are sent concurrently.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from projects.models import Project
+from .blockchain import contract, campaigns_onchain
+from .models import CampaignSnapshot
+
+SNAPSHOT_FIELDS = [
+    'contract_id', 'creator', 'currency_type', 'token', 'goal', 'total_raised', 'total_withdrawn',
+    'deadline', 'state', 'context_data', 'offchain_id', 'milestone_count', 'milestones_released',
+    'total_bps_released', 'milestones', 'block_number', 'fetched_at', 'error',
+]
+
+
+def _deadline(ts):
+    try:
+        return datetime.fromtimestamp(int(ts), tz=dt_timezone.utc) if ts else None
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _milestone(milestone):
+    if isinstance(milestone, Exception):
+        return None
+    name, amount, approved, released = milestone
+    return {'name': name, 'amount': str(amount), 'approved': approved, 'released': released}
+
+
+def _snapshot(project, core, milestones, block_number, now):
+    (creator, currency_type, token, goal, total_raised, total_withdrawn, deadline, state,
+     context_data, offchain_id, milestone_count, milestones_released, total_bps_released) = core
+    return CampaignSnapshot(
+        project=project,
+        contract_id=project.contract_id,
+        creator=creator,
+        currency_type=int(currency_type),
+        token=token,
+        goal=goal,
+        total_raised=total_raised,
+        total_withdrawn=total_withdrawn,
+        deadline=_deadline(deadline),
+        state=int(state),
+        context_data=context_data,
+        offchain_id=offchain_id,
+        milestone_count=int(milestone_count),
+        milestones_released=int(milestones_released),
+        total_bps_released=int(total_bps_released),
+        milestones=[_milestone(m) for m in milestones],
+        block_number=block_number,
+        fetched_at=now,
+        error=None,
+    )
+
+
+def deployed_projects():
+    return (Project.objects.filter(deployed=True, contract_id__isnull=False)
+            .annotate(milestone_total=Count('milestones')).order_by('pk'))
+
+
+def _read_campaigns(hints, campaign_contract, batch_reader, use_async):
+    if use_async:
+        from . import aio
+        return aio.run(aio.acampaigns_at_head(hints, campaign_contract, batch_reader))
+
+    # pin every read to one block so the snapshots are mutually consistent
+    block_number = (campaign_contract or contract).w3.eth.block_number
+    return block_number, campaigns_onchain(hints, campaign_contract, batch_reader, block_identifier=block_number)
+
+
+def refresh_snapshots(projects=None, campaign_contract=None, batch_reader=None, use_async=None):
+    """
+    Refresh the snapshots of `projects` (default: every deployed project).
+    `use_async` (default: settings.CHAIN_ASYNC) reads through contract.aio;
+    campaign_contract / batch_reader must then be async ones too.
+    Returns (refreshed, {project pk: error}) for the projects whose read failed;
+    a project without a snapshot yet has its error only there.
+    """
+    if projects is None:
+        projects = deployed_projects()
+    projects = [p for p in projects if p.contract_id is not None]
+    if not projects:
+        return 0, {}
+
+    hints = {}
+    for project in projects:
+        hint = getattr(project, 'milestone_total', None)
+        hints[project.contract_id] = project.milestones.count() if hint is None else hint
+    use_async = settings.CHAIN_ASYNC if use_async is None else use_async
+    block_number, campaigns = _read_campaigns(hints, campaign_contract, batch_reader, use_async)
+
+    now = timezone.now()
+    snapshots, failed = [], {}
+    for project in projects:
+        core, milestones = campaigns[project.contract_id]
+        if isinstance(core, Exception):
+            failed[project.pk] = str(core) or core.__class__.__name__
+            continue
+        snapshots.append(_snapshot(project, core, milestones, block_number, now))
+
+    CampaignSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=['project'], update_fields=SNAPSHOT_FIELDS,
+    )
+    for pk, error in failed.items():
+        CampaignSnapshot.objects.filter(project_id=pk).update(error=error)
+    return len(snapshots), failed
@@ -0,0 +1,189 @@
+"""
+Websocket ingestion: eth_subscribe("logs") and ("newHeads") on ALCHEMY_WS,
+applying contract logs through the webhook handlers once `confirmations`
+blocks (SUBSCRIBE_CONFIRMATIONS) sit on top of theirs; each one delays a
+pledge showing up in the campaign's progress by a block time.
+
+Pushed logs wait in memory, keyed by block hash, until a new head confirms
+their block; a log pushed again with removed=True (reorged out) is dropped
+from there before it is ever applied, so the re-included copy is the only
+one counted. A removal arriving after its block was confirmed means a reorg
+deeper than `confirmations`: it is logged and recorded in ErrorLog.
+
+On every (re)connect the subscriptions are opened first and the head is read
+over HTTP; blocks up to that head that are not confirmed yet are read with
+eth_getLogs once they are, so nothing falls between the two. Logs seen by
+both paths are skipped by the ProcessedEvent ledger. The checkpoint is the
+last confirmed block applied. Like LogPoller's, it stays before a block
+whose logs failed to apply, which is read again with eth_getLogs on the
+next heads until it applies or has had its retries.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from web3 import AsyncWeb3, WebSocketProvider
+
+from website.models import ErrorLog
+from .blockchain import CONTRACT_ADDRESS, ALCHEMY_WS, w3
+from .models import ChainCheckpoint
+from .poller import LogPoller
+from .webhook import _to_int_maybe_hex, event_topics, normalize_rpc_log, process_logs, settle_funding
+
+logger = logging.getLogger(__name__)
+
+
+class LogSubscriber:
+
+    def __init__(self, url=ALCHEMY_WS, address=CONTRACT_ADDRESS, http_w3=w3,
+                 backoff=1.0, max_backoff=30.0, on_applied=None, confirmations=None):
+        self.url = url
+        self.address = address
+        self.confirmations = settings.SUBSCRIBE_CONFIRMATIONS if confirmations is None else confirmations
+        # eth_getLogs client for the catch-up after each connect
+        self.poller = LogPoller(http_w3, address=address, confirmations=self.confirmations, source='ws')
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # called with (block_number, applied) for each confirmed block of pushed logs
+        self.on_applied = on_applied
+        # pushed logs not confirmed yet: block number -> {(block hash, tx hash, log index): log}
+        self.unconfirmed = {}
+        # first block whose logs are all pushed on the current connection
+        self.live_from = None
+        # last block whose pushed logs were taken out of `unconfirmed`; below it, read them again
+        self.applied_through = 0
+        self.connects = 0
+        self.pushed = 0
+        self.removed = 0
+
+    # -------------------------
+    # sync side (ORM)
+    # -------------------------
+    def _catch_up(self, start_block):
+        checkpoint = self.poller.checkpoint(start_block)
+        head = self.poller.safe_head()
+        if head > checkpoint.block_number:
+            failed = []
+            blocks, logs, applied = self.poller.backfill(checkpoint.block_number + 1, head, failed)
+            logger.info("ws catch-up: %s blocks, %s logs, %s applied", blocks, logs, applied)
+            self._advance(checkpoint, self.poller._complete_through(head, failed))
+        return checkpoint
+
+    def _connected(self):
+        """Blocks above the head read now are pushed on this connection; earlier ones are read with eth_getLogs."""
+        self.poller.rpc_calls += 1
+        self.live_from = self.poller.w3.eth.block_number + 1
+        self.unconfirmed.clear()
+
+    def _confirm(self, checkpoint, confirmed):
+        """
+        Apply every block up to `confirmed`; returns {block_number: applied}
+        for the pushed ones. The checkpoint stops before the first block with
+        a failed log (see LogPoller._complete_through).
+        """
+        start = checkpoint.block_number + 1
+        if confirmed < start:
+            return {}
+        failed = []
+        # blocks from before this connection, or held back by a failure: read them
+        read_to = min(confirmed, max(self.live_from - 1, self.applied_through))
+        if start <= read_to:
+            self.poller.backfill(start, read_to, failed)
+
+        results = {}
+        for block_number in sorted(n for n in self.unconfirmed if n <= confirmed):
+            logs = list(self.unconfirmed.pop(block_number).values())
+            logs.sort(key=lambda web3_log: web3_log['logIndex'] or 0)
+            results[block_number] = process_logs(
+                [(web3_log, web3_log) for web3_log in logs], {'source': 'eth_subscribe', 'block': block_number}, failed
+            )
+        self.applied_through = max(self.applied_through, confirmed)
+        if results:
+            settle_funding()
+        self._advance(checkpoint, self.poller._complete_through(confirmed, failed))
+        return results
+
+    def _deep_reorg(self, web3_log):
+        ErrorLog.objects.create(
+            data={'source': 'eth_subscribe', 'block': web3_log['blockNumber'],
+                  'tx_hash': web3_log['transactionHash'], 'log_index': web3_log['logIndex']},
+            error=f"log removed after {self.confirmations} confirmation(s); its effects were not reversed",
+        )
+
+    def _advance(self, checkpoint, block_number):
+        ChainCheckpoint.objects.filter(pk=checkpoint.pk, block_number__lt=block_number).update(block_number=block_number)
+        checkpoint.block_number = max(checkpoint.block_number, block_number)
+
+    # -------------------------
+    # async side
+    # -------------------------
+    async def run(self, start_block=None, stop=None):
+        """Subscribe until `stop` (an asyncio.Event) is set, reconnecting with backoff."""
+        delay = self.backoff
+        while not (stop and stop.is_set()):
+            connects = self.connects
+            try:
+                await self._session(start_block, stop)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connects > connects:
+                    # the session was up, so this is a fresh failure
+                    delay = self.backoff
+                logger.warning("ws subscription dropped (%r), reconnecting in %.1fs", e, delay)
+                if stop:
+                    try:
+                        await asyncio.wait_for(stop.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(delay)
+                delay = min(self.max_backoff, delay * 2)
+
+    async def _session(self, start_block, stop):
+        async with AsyncWeb3(WebSocketProvider(self.url)) as client:
+            await client.eth.subscribe('logs', {
+                'address': self.address,
+                'topics': [event_topics()],
+            })
+            heads = await client.eth.subscribe('newHeads')
+            self.connects += 1
+            await sync_to_async(self._connected)()
+            checkpoint = await sync_to_async(self._catch_up)(start_block)
+
+            stream = client.socket.process_subscriptions()
+            while not (stop and stop.is_set()):
+                next_message = asyncio.ensure_future(stream.__anext__())
+                waiters = {next_message} | ({asyncio.ensure_future(stop.wait())} if stop else set())
+                done, pending = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                for task in pending:
+                    task.cancel()
+                if next_message not in done:
+                    return
+                message = next_message.result()
+                if message['subscription'] == heads:
+                    await self._on_head(checkpoint, message['result'])
+                else:
+                    await self._on_log(checkpoint, message['result'])
+
+    async def _on_log(self, checkpoint, log):
+        self.pushed += 1
+        web3_log = normalize_rpc_log(log)
+        block_number = web3_log['blockNumber']
+        key = (web3_log['blockHash'], web3_log['transactionHash'], web3_log['logIndex'])
+        if not web3_log['removed']:
+            self.unconfirmed.setdefault(block_number, {})[key] = web3_log
+            return
+        # reorged out: forget it while it is unconfirmed, so only the re-included copy is applied
+        self.removed += 1
+        if self.unconfirmed.get(block_number, {}).pop(key, None) is None and block_number <= checkpoint.block_number:
+            logger.error("log %s:%s removed after it was confirmed and applied", key[1], key[2])
+            await sync_to_async(self._deep_reorg)(web3_log)
+
+    async def _on_head(self, checkpoint, head):
+        confirmed = _to_int_maybe_hex(head['number']) - self.confirmations
+        results = await sync_to_async(self._confirm)(checkpoint, confirmed)
+        if self.on_applied:
+            for block_number, applied in results.items():
+                self.on_applied(block_number, applied)
@@ -1,3 +1,221 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import transaction
+from django.test import TestCase, override_settings
+from web3 import Web3
+
+from accounts.intents import expire_intents, open_intent
+from accounts.models import Donor, PledgeIntent, Transaction, Wallet
+from contract.benchmarks import alchemy_payload, make_campaign, make_donor, pledged_log
+from contract.campaigns import campaign_pks
+from contract.jsonstream import stream_logs
+from contract.models import ProcessedEvent
+from contract.webhook import _apply_pledge_batch, process_payload
+from projects.models import Donation, Milestone, Project
+
+
+class WebhookTestCase(TestCase):
+
+    def setUp(self):
+        # contract_id -> pk mapping is kept per process; every test has its own rows
+        campaign_pks.invalidate()
+        patcher = mock.patch('accounts.utils.send_email_in_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def deliver(self, logs, block_number=1):
+        """Apply an Alchemy delivery the way the inbox stores it (a JSON round trip)."""
+        return process_payload(json.loads(json.dumps(alchemy_payload(logs, block_number))))
+
+
+class ProcessedEventLedgerTests(WebhookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = make_campaign(1, goal=Decimal('100'))
+        self.donor = make_donor(0)
+
+    def test_redelivered_block_is_applied_once(self):
+        logs = [pledged_log(1, self.donor, Decimal('10'), log_index=i) for i in range(3)]
+
+        self.assertEqual(self.deliver(logs), 3)
+        self.assertEqual(self.deliver(logs), 0)
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.total_funds, Decimal('30'))
+        self.assertEqual(ProcessedEvent.objects.count(), 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(Donation.objects.get().amount, Decimal('30'))
+
+    def test_redelivered_single_log_is_applied_once(self):
+        log = pledged_log(1, self.donor, Decimal('10'))
+
+        self.assertEqual(self.deliver([log]), 1)
+        self.assertEqual(self.deliver([log], block_number=2), 0)
+
+        self.assertEqual(Project.objects.get(pk=self.project.pk).total_funds, Decimal('10'))
+        self.assertEqual(ProcessedEvent.objects.count(), 1)
+
+    def test_ledger_key_is_tx_hash_and_log_index(self):
+        first = pledged_log(1, self.donor, Decimal('10'), log_index=0)
+        # same transaction, another log: a different event
+        second = pledged_log(1, self.donor, Decimal('5'), tx_hash=first['transaction']['hash'], log_index=1)
+
+        self.assertEqual(self.deliver([first]), 1)
+        self.assertEqual(self.deliver([first, second], block_number=2), 1)
+
+        self.assertEqual(Project.objects.get(pk=self.project.pk).total_funds, Decimal('15'))
+        self.assertEqual(
+            sorted(ProcessedEvent.objects.values_list('log_index', flat=True)), [0, 1],
+        )
+
+    def test_duplicate_log_within_one_delivery_is_applied_once(self):
+        log = pledged_log(1, self.donor, Decimal('10'))
+
+        self.assertEqual(self.deliver([log, log]), 1)
+
+        self.assertEqual(Project.objects.get(pk=self.project.pk).total_funds, Decimal('10'))
+
+
+class PledgeBatchTests(WebhookTestCase):
+    """The set-based path (WEBHOOK_BATCH_PLEDGES) must leave the same rows as applying each log."""
+
+    def apply_block(self, batch):
+        campaign_pks.invalidate()
+        with transaction.atomic(), override_settings(WEBHOOK_BATCH_PLEDGES=batch), \
+                mock.patch('contract.webhook._apply_pledge_batch', wraps=_apply_pledge_batch) as batched:
+            projects = [make_campaign(contract_id, goal=Decimal('100')) for contract_id in (1, 2)]
+            donors = [make_donor(i) for i in range(3)]
+            # never registered: credited to the campaign's anonymous donation
+            stranger = Web3.to_checksum_address('0x' + 'ab' * 20)
+            pledges = [
+                (1, donors[0], '30'), (1, donors[1], '10'), (2, donors[0], '5'), (1, stranger, '25'),
+                (1, donors[0], '40'), (2, stranger, '1'), (2, donors[2], '20'),
+            ]
+            applied = self.deliver([
+                pledged_log(campaign_id, donor, Decimal(amount), tip=Decimal('1'), log_index=i)
+                for i, (campaign_id, donor, amount) in enumerate(pledges)
+            ])
+            for project in projects:
+                project.refresh_from_db()
+            rows = {
+                'applied': applied,
+                'projects': [(p.contract_id, p.total_funds, p.progress) for p in projects],
+                'milestones': sorted(Milestone.objects.values_list('project__contract_id', 'milestone_no', 'status')),
+                'donations': sorted(
+                    Donation.objects.values_list('project__contract_id', 'wallet__address', 'amount'),
+                    key=str,
+                ),
+                'transactions': sorted(
+                    Transaction.objects.values_list('project__contract_id', 'wallet__address', 'amount', 'tip', 'status'),
+                    key=str,
+                ),
+                'tx_counts': sorted(Donor.objects.values_list('username', 'tx_count')),
+            }
+            transaction.set_rollback(True)
+        self.assertEqual(batched.called, batch)
+        return rows
+
+    def test_batch_and_per_log_leave_the_same_rows(self):
+        per_log = self.apply_block(batch=False)
+        batch = self.apply_block(batch=True)
+
+        self.assertEqual(batch, per_log)
+        self.assertEqual(batch['projects'], [(1, Decimal('105'), Decimal('105')), (2, Decimal('26'), Decimal('26'))])
+        self.assertEqual(
+            [status for contract_id, _, status in batch['milestones'] if contract_id == 1],
+            [Milestone.COMPLETED] * 3,
+        )
+
+
+class StreamLogsTests(TestCase):
+
+    body = json.dumps({
+        'webhookId': 'wh_1',
+        'event': {'data': {'block': {'number': 5, 'logs': [{'index': 0}, {'index': 1}], 'hash': '0x01'}}},
+    })
+
+    def read(self, body):
+        header = {}
+        return list(stream_logs(body, header)), header
+
+    def test_yields_logs_and_block_fields(self):
+        logs, header = self.read(self.body)
+
+        self.assertEqual(logs, [{'index': 0}, {'index': 1}])
+        # fields after `logs` are read once the logs are exhausted
+        self.assertEqual(header, {'number': 5, 'hash': '0x01'})
+
+    def test_body_without_logs_yields_nothing(self):
+        self.assertEqual(self.read('{"event": {"data": {"block": {"logs": null}}}}'), ([], {}))
+        self.assertEqual(self.read('{"event": {"data": {}}}'), ([], {}))
+
+    def test_rejects_bodies_of_the_wrong_shape(self):
+        for name, body in {
+            'not an object': '[1, 2]',
+            'logs not an array': '{"event": {"data": {"block": {"logs": 5}}}}',
+        }.items():
+            with self.subTest(name), self.assertRaises(json.JSONDecodeError):
+                self.read(body)
+
+    def test_rejects_malformed_bodies(self):
+        malformed = {
+            'empty': '',
+            'not json': 'hello',
+            'truncated': self.body[:-3],
+            'missing comma': '{"event": {"data": {"block": {"logs": [{} {}]}}}}',
+            'unquoted key': '{event: {}}',
+            'non-string key': '{1: 2}',
+            'trailing data': self.body + ' x',
+            'two documents': self.body + self.body,
+        }
+        for name, body in malformed.items():
+            with self.subTest(name):
+                # json.loads agrees
+                with self.assertRaises(json.JSONDecodeError):
+                    json.loads(body)
+                with self.assertRaises(json.JSONDecodeError):
+                    self.read(body)
+
+
+class PledgeIntentWebhookTests(WebhookTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = make_campaign(1, goal=Decimal('100'))
+        self.donors = [make_donor(i) for i in range(2)]
+
+    def donate(self, donor):
+        pending = Transaction.objects.create(
+            project=self.project, wallet=Wallet.objects.get(address=donor), amount=Decimal('10'), tip=0,
+            status=Transaction.PENDING, event=Transaction.PLEDGE,
+        )
+        return pending, open_intent(pending)
+
+    def assert_fulfilled(self, pending, intent):
+        pending.refresh_from_db()
+        intent.refresh_from_db()
+        self.assertEqual(pending.status, Transaction.SUCCESSFUL)
+        self.assertEqual(intent.status, PledgeIntent.FULFILLED)
+        # nothing left for the sweeper to fail
+        self.assertEqual(expire_intents(now=intent.expires_at), 0)
+        self.assertEqual(Transaction.objects.get(pk=pending.pk).status, Transaction.SUCCESSFUL)
+
+    def test_single_pledge_fulfils_the_donors_intent(self):
+        pending, intent = self.donate(self.donors[0])
+
+        self.deliver([pledged_log(1, self.donors[0], Decimal('10'))])
+
+        self.assert_fulfilled(pending, intent)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_pledge_batch_fulfils_the_donors_intents(self):
+        intents = [self.donate(donor) for donor in self.donors]
+
+        self.deliver([pledged_log(1, donor, Decimal('10'), log_index=i) for i, donor in enumerate(self.donors)])
+
+        for pending, intent in intents:
+            self.assert_fulfilled(pending, intent)
+        self.assertEqual(Transaction.objects.count(), 2)
@@ -0,0 +1,156 @@
+"""
+Outbound owner transactions: recorded by send_owner_tx, then followed up by
+the receipt poller instead of per-hash lookups.
+
+ReceiptPoller.poll_once() asks for the receipts of every PENDING / STUCK
+transaction in one JSON-RPC batch (chunks of `batch_size`) and stores status,
+gas used and block of the mined ones. Transactions still unmined after
+OWNER_TX_STUCK_AFTER seconds become STUCK; speed_up() re-sends them with the
+same nonce and higher fees. Once one transaction of a nonce is mined, the
+others sharing it are DROPPED.
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OwnerTransaction
+
+OPEN = [OwnerTransaction.PENDING, OwnerTransaction.STUCK]
+# nodes refuse a replacement unless its fees are at least 10% higher
+MIN_BUMP = 1.1
+
+
+def _hex(value):
+    return value.hex() if isinstance(value, (bytes, bytearray)) else value
+
+
+def record_owner_tx(chain, built, tx_hash, function='', replaces=None):
+    """
+    Store a just-sent transaction (`built` is the dict that was signed). The
+    same signed transaction sent again has the same hash and keeps its row.
+    """
+    owner_tx, _ = OwnerTransaction.objects.get_or_create(
+        chain=chain,
+        tx_hash=tx_hash.lower() if tx_hash.startswith('0x') else '0x' + tx_hash.lower(),
+        defaults=dict(
+            sender=built['from'],
+            nonce=built['nonce'],
+            to=built.get('to'),
+            function=function,
+            data=_hex(built.get('data', '')) or '',
+            value=built.get('value', 0),
+            gas_limit=built['gas'],
+            gas_price=built.get('gasPrice'),
+            max_fee_per_gas=built.get('maxFeePerGas'),
+            max_priority_fee_per_gas=built.get('maxPriorityFeePerGas'),
+        ),
+    )
+    if replaces is not None:
+        replaces.replaced_by = owner_tx
+        replaces.save(update_fields=['replaced_by'])
+    return owner_tx
+
+
+def speed_up(owner_tx, client=None, bump=1.25):
+    """Re-send `owner_tx` with the same nonce and fees raised by `bump`; returns the new row."""
+    from .blockchain import _raw_transaction, gas_oracle, owner_account, w3
+
+    client = client or w3
+    bump = max(bump, MIN_BUMP)
+    current = gas_oracle().fees(client)
+    tx = {
+        'from': owner_tx.sender,
+        'to': client.to_checksum_address(owner_tx.to) if owner_tx.to else None,
+        'data': owner_tx.data,
+        'value': int(owner_tx.value),
+        'gas': owner_tx.gas_limit,
+        'nonce': owner_tx.nonce,
+        'chainId': client.eth.chain_id,
+    }
+    if owner_tx.max_fee_per_gas is not None:
+        # at least the bumped old fees, more if the market moved past them
+        tx['maxPriorityFeePerGas'] = max(math.ceil(owner_tx.max_priority_fee_per_gas * bump),
+                                         current.get('maxPriorityFeePerGas', 0))
+        tx['maxFeePerGas'] = max(math.ceil(owner_tx.max_fee_per_gas * bump),
+                                 current.get('maxFeePerGas', 0), tx['maxPriorityFeePerGas'])
+    else:
+        tx['gasPrice'] = max(math.ceil(owner_tx.gas_price * bump), current.get('gasPrice', 0))
+
+    raw_tx = _raw_transaction(owner_account().sign_transaction(tx))
+    tx_hash = client.eth.send_raw_transaction(raw_tx).hex()
+    return record_owner_tx(owner_tx.chain, tx, tx_hash, owner_tx.function, replaces=owner_tx)
+
+
+class ReceiptPoller:
+
+    def __init__(self, w3, chain, stuck_after=None, batch_size=100):
+        self.w3 = w3
+        self.chain = chain
+        self.stuck_after = settings.OWNER_TX_STUCK_AFTER if stuck_after is None else stuck_after
+        self.batch_size = batch_size
+        self.rpc_calls = 0
+
+    def fetch_receipts(self, hashes):
+        """{tx_hash: raw receipt} for the mined ones among `hashes`, one batch per chunk."""
+        receipts = {}
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            self.rpc_calls += 1
+            responses = self.w3.provider.make_batch_request(
+                [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in chunk]
+            )
+            # matched by hash: batch responses may come back in any order
+            for response in responses:
+                receipt = response.get('result')
+                if receipt:
+                    receipts[receipt['transactionHash'].lower()] = receipt
+        return receipts
+
+    def poll_once(self):
+        """Check every open transaction. Returns (mined, newly stuck, still open)."""
+        open_txs = list(OwnerTransaction.objects.filter(chain=self.chain, status__in=OPEN).order_by('id'))
+        if not open_txs:
+            return 0, 0, 0
+
+        receipts = self.fetch_receipts([tx.tx_hash for tx in open_txs])
+        now = timezone.now()
+        mined, waiting = [], []
+        for tx in open_txs:
+            receipt = receipts.get(tx.tx_hash)
+            if receipt is None:
+                waiting.append(tx.pk)
+                continue
+            tx.status = OwnerTransaction.SUCCESS if int(receipt['status'], 16) == 1 else OwnerTransaction.REVERTED
+            tx.block_number = int(receipt['blockNumber'], 16)
+            tx.gas_used = int(receipt['gasUsed'], 16)
+            if receipt.get('effectiveGasPrice'):
+                tx.effective_gas_price = int(receipt['effectiveGasPrice'], 16)
+            tx.mined_at = tx.checked_at = now
+            mined.append(tx)
+
+        if mined:
+            OwnerTransaction.objects.bulk_update(
+                mined, ['status', 'block_number', 'gas_used', 'effective_gas_price', 'mined_at', 'checked_at'],
+            )
+            # the other transactions of a mined nonce can never be included now
+            same_nonce = Q()
+            for tx in mined:
+                same_nonce |= Q(sender=tx.sender, nonce=tx.nonce)
+            OwnerTransaction.objects.filter(same_nonce, chain=self.chain, status__in=OPEN).update(
+                status=OwnerTransaction.DROPPED, checked_at=now,
+            )
+
+        waiting = OwnerTransaction.objects.filter(pk__in=waiting, status__in=OPEN)
+        stuck = waiting.filter(status=OwnerTransaction.PENDING, sent_at__lt=now - timedelta(seconds=self.stuck_after),
+                               ).update(status=OwnerTransaction.STUCK, checked_at=now)
+        still_open = waiting.update(checked_at=now)
+        return len(mined), stuck, still_open
+
+    def stuck(self):
+        """STUCK transactions not replaced yet, oldest first."""
+        return OwnerTransaction.objects.filter(
+            chain=self.chain, status=OwnerTransaction.STUCK, replaced_by__isnull=True,
+        ).order_by('nonce', 'id')
@@ -0,0 +1,146 @@
+"""
+Two-tier cache for transaction + receipt lookups.
+
+A mined transaction never changes, so once the node returns it with a
+block number and a receipt it is kept for good: in an in-process LRU and in
+the ChainTransaction table, which every process shares. Anything less
+(pending, unknown, or mined but without its receipt yet, which a lagging
+node can return) is kept in the LRU for TX_PENDING_TTL seconds only.
+Whatever both tiers miss is fetched with one JSON-RPC batch
+(eth_getTransactionByHash + eth_getTransactionReceipt) per `batch_size`
+hashes.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import ChainTransaction
+
+# transaction / receipt: the node's JSON (hex strings), None if not known / not mined
+TxRecord = namedtuple('TxRecord', ['transaction', 'receipt'])
+
+
+def is_final(record):
+    """Mined and with its receipt: the node's answer will not change any more."""
+    return bool(record.transaction and record.transaction.get('blockNumber') and record.receipt)
+
+
+def normalize_hash(tx_hash):
+    tx_hash = tx_hash.lower()
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+class TransactionCache:
+
+    def __init__(self, client, chain, size=None, pending_ttl=None, batch_size=50):
+        self.client = client
+        self.chain = chain
+        self.size = settings.TX_CACHE_SIZE if size is None else size
+        self.pending_ttl = settings.TX_PENDING_TTL if pending_ttl is None else pending_ttl
+        self.batch_size = batch_size
+        self._entries = OrderedDict()  # tx_hash -> (TxRecord, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = {'memory': 0, 'db': 0, 'rpc': 0}
+        self.rpc_calls = 0
+
+    # -------------------------
+    # in-process tier
+    # -------------------------
+    def _get(self, tx_hash, now):
+        with self._lock:
+            entry = self._entries.get(tx_hash)
+            if entry is None:
+                return None
+            record, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._entries[tx_hash]
+                return None
+            self._entries.move_to_end(tx_hash)
+            return record
+
+    def _put(self, tx_hash, record, now):
+        final = is_final(record)
+        if not final and not self.pending_ttl:
+            return
+        with self._lock:
+            self._entries[tx_hash] = (record, None if final else now + self.pending_ttl)
+            self._entries.move_to_end(tx_hash)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # -------------------------
+    # lookups
+    # -------------------------
+    def lookup_many(self, hashes):
+        """{tx_hash (lowercase): TxRecord} for `hashes`."""
+        now = time.monotonic()
+        hashes = list(dict.fromkeys(normalize_hash(h) for h in hashes))
+        found, missing = {}, []
+        for tx_hash in hashes:
+            record = self._get(tx_hash, now)
+            if record is None:
+                missing.append(tx_hash)
+            else:
+                found[tx_hash] = record
+        self.hits['memory'] += len(found)
+
+        if missing:
+            rows = ChainTransaction.objects.filter(chain=self.chain, tx_hash__in=missing)
+            for tx_hash, transaction, receipt in rows.values_list('tx_hash', 'transaction', 'receipt'):
+                found[tx_hash] = record = TxRecord(transaction, receipt)
+                self._put(tx_hash, record, now)
+                self.hits['db'] += 1
+            missing = [tx_hash for tx_hash in missing if tx_hash not in found]
+
+        if missing:
+            fetched = self.fetch(missing)
+            self.hits['rpc'] += len(fetched)
+            ChainTransaction.objects.bulk_create([
+                ChainTransaction(chain=self.chain, tx_hash=tx_hash, block_number=int(record.transaction['blockNumber'], 16),
+                                 transaction=record.transaction, receipt=record.receipt)
+                for tx_hash, record in fetched.items() if is_final(record)
+            ], ignore_conflicts=True)
+            for tx_hash, record in fetched.items():
+                self._put(tx_hash, record, now)
+            found.update(fetched)
+        return found
+
+    def lookup(self, tx_hash):
+        return self.lookup_many([tx_hash])[normalize_hash(tx_hash)]
+
+    def fetch(self, hashes):
+        """Transaction and receipt of every hash from the node, one batch per chunk."""
+        records = {}
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            self.rpc_calls += 1
+            requests = []
+            for tx_hash in chunk:
+                requests += [('eth_getTransactionByHash', [tx_hash]), ('eth_getTransactionReceipt', [tx_hash])]
+            responses = self.client.provider.make_batch_request(requests)
+            transactions, receipts = {}, {}
+            # matched by hash: batch responses may come back in any order
+            for response in responses:
+                result = response.get('result')
+                if not result:
+                    continue
+                if 'transactionHash' in result:
+                    receipts[result['transactionHash'].lower()] = result
+                else:
+                    transactions[result['hash'].lower()] = result
+            for tx_hash in chunk:
+                records[tx_hash] = TxRecord(transactions.get(tx_hash), receipts.get(tx_hash))
+        return records
+
+
+@lru_cache
+def transaction_cache():
+    from .blockchain import CHAIN, w3
+    return TransactionCache(w3, CHAIN)
@@ -11,4 +11,5 @@ urlpatterns = [
     path('pause/', views.pause, name='pause'),
     path('unpause/', views.unpause, name='unpause'),
     path('set-fee-bps/', views.set_fee_bps, name='set_fee_bps'),
+    path('rpc-stats/', views.rpc_stats, name='rpc_stats'),
 ]
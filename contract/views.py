@@ -2,8 +2,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.admin.views.decorators import staff_member_required
 import json
-from .blockchain import contract, send_owner_tx
-from web3 import Web3 
+from .blockchain import contract, rpc_gateway, send_owner_tx, w3
 
 
 # def approve_milestone(campaign_id: int, index: int):
@@ -47,7 +46,7 @@ def set_allowed_token(request):
         allowed = data.get('allowed')
         if token is None or allowed is None:
             return JsonResponse({'ok': False, 'error': 'token_address and allowed required'}, status=400)
-        token = Web3.to_checksum_address(token)
+        token = w3.to_checksum_address(token)
         # convert allowed string to boolean
         if isinstance(allowed, str):
             allowed_bool = allowed.lower() in ('true','1','yes')
@@ -116,3 +115,8 @@ def set_fee_bps(request):
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
 
+
+@staff_member_required
+def rpc_stats(request):
+    # per-process: the numbers of the worker that answers this request
+    return JsonResponse(rpc_gateway.stats())
@@ -1,32 +1,36 @@
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_POST
 import json
-from .blockchain import contract, send_owner_tx
+from .blockchain import event_decoders, send_owner_tx, CHAIN
 from django.views.decorators.csrf import csrf_exempt
 from projects.models import Project,Milestone,Donation
+from projects.milestones import advance_milestones
+from projects.funding import add_funds, apply_funding, rollup_funding, sharded
+from projects.donations import add_anonymous_donations, add_donations
 from decimal import Decimal
 from website.models import ErrorLog
-from accounts.models import Transaction,Wallet, Donor
+from accounts.models import Transaction,Wallet, Donor, normalize_address
+from accounts.intents import fulfil_intents
 import datetime
+import logging
+import os
+import threading
 import traceback
 from django.utils import timezone
-from django.db.models import F
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Case, When, Value
+from django.conf import settings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from accounts.utils import send_html_mail
+from .campaigns import campaign_pks
+from .jsonstream import stream_logs
+from .models import WebhookEvent, ProcessedEvent
 
-#Webhook
-
-
-EVENT_TOPIC_MAP = {
-'0xf6927b61d53c52832973f54bb03898d046415a87f616d486523e1b663315364d' : 'CampaignCreated',
-'0x242b7d43c73f615dfdfa4919702ad9db4880a3b095d19100eb73c3d05e92be15' : 'CampaignFinalized',
-'0x66db9066eef427bc79cc914343b2a5810df710dd78414eeb82edfd7780941cd6' : 'Pledged',
-'0x1b29c0842d854a7d068404ef8054846a234308cb5f9f72281ffe0c5d9901e9df' : 'CampaignHalted',
-'0x939da3b627c123c81fe5aacebf925163337a0d4f8a03724640618078cad24894' : 'MilestoneApproved',
-'0xacd04361f4b63fc14956006d9cdccbcea11dde8e3f5e13dafb34bb10996d7cbf' : 'MilestoneWithdrawn',
-'0xf3f402280ef0a7905e124aa621b65eaeb2725c343e8b36d398ed78c29daf285c' : 'RefundClaimed',
-
-}
+logger = logging.getLogger(__name__)
 
+#Webhook
 
 
 def _to_int_maybe_hex(v):
@@ -47,7 +51,7 @@ def _to_int_maybe_hex(v):
 def _normalize_alchemy_log(raw_log, block_obj=None):
     """
     Convert Alchemy webhook log shape into the geth/web3-style log dict that
-    contract.events.X().process_log expects.
+    the event decoders (contract.events) expect.
     """
     tx = raw_log.get("transaction") or {}
     block = block_obj or {}
@@ -66,347 +70,699 @@ def _normalize_alchemy_log(raw_log, block_obj=None):
         "removed": raw_log.get("removed", False),
     }
 
+def normalize_rpc_log(log):
+    """
+    Convert an eth_getLogs / eth_subscribe log (HexBytes fields) into the same
+    plain dict _normalize_alchemy_log produces.
+    """
+    def _hex(value):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray)):
+            return '0x' + bytes(value).hex()
+        return str(value).lower()
+
+    return {
+        "address": log["address"],
+        "topics": [_hex(topic) for topic in log.get("topics", [])],
+        "data": _hex(log.get("data")) or "0x",
+        "blockNumber": _to_int_maybe_hex(log.get("blockNumber")),
+        "blockHash": _hex(log.get("blockHash")),
+        "transactionHash": _hex(log.get("transactionHash")),
+        "transactionIndex": _to_int_maybe_hex(log.get("transactionIndex")),
+        "logIndex": _to_int_maybe_hex(log.get("logIndex")),
+        "removed": log.get("removed", False),
+    }
+
+def _mail_on_commit(*args):
+    """Only notify once the event (and its ledger row) is committed."""
+    transaction.on_commit(lambda: send_html_mail(*args))
+
+
+def _record_error(data, error, notes=None, web3_log=None):
+    """
+    ErrorLog row for a failed log. `data` is the small context dict (source,
+    block, webhook_event id), never the payload: the body is stored once, on
+    the WebhookEvent the row points to.
+    """
+    if web3_log is not None:
+        tx_hash, log_index = _event_key(web3_log)
+        data = dict(data, block=web3_log.get('blockNumber'), tx_hash=tx_hash, log_index=log_index)
+    ErrorLog.objects.create(
+        data=data,
+        error=error,
+        notes=notes,
+        webhook_event_id=data.get('webhook_event'),
+    )
+
+
+def _campaign_project(campaign_id):
+    """Project of an on-chain campaign: one primary-key read through campaign_pks."""
+    project = Project.objects.get(pk=campaign_pks.get(campaign_id))
+    if project.contract_id != campaign_id:
+        # re-pointed by a CampaignCreated applied in another process
+        campaign_pks.invalidate(campaign_id)
+        project = Project.objects.get(pk=campaign_pks.get(campaign_id))
+    return project
+
+
+def _on_campaign_created(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    offchain_id = event_args.offchainId
+    creator = event_args.creator
+    # goal = Decimal(event_args.goal) / (Decimal(10) ** 6)
+    raw_deadline = event_args.deadline
+    dt_utc = datetime.datetime.fromtimestamp(int(raw_deadline), tz=datetime.timezone.utc)
+    project = Project.objects.filter(
+        id = offchain_id 
+    ).first()
+    # the id may have pointed elsewhere, and this project may have had another id
+    stale = (campaign_id, project.contract_id)
+    campaign_pks.invalidate(*stale)
+    transaction.on_commit(lambda: campaign_pks.invalidate(*stale))
+    project.contract_id = campaign_id
+    project.deployed = True
+    project.deadline = dt_utc
+    project.deployed_at = timezone.now()
+    project.wallet_address = creator
+    project.save(update_fields=['contract_id', 'deployed', 'deadline','deployed_at', 'wallet_address'])
+    advance_milestones(project)
+    wallet = Wallet.objects.get(address_lower=normalize_address(creator))
+    Transaction.objects.create(
+        tx_hash = web3_log['transactionHash'],
+        event = Transaction.C_DEPLOYMENT,
+        status = Transaction.SUCCESSFUL,
+        wallet = wallet,
+    )
+
+
+def _pledge_amounts(event_args):
+    """(net_amount, tip) of a Pledged event in USDC."""
+    net_amount = Decimal(event_args.netAmount) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
+    # fee_amount = Decimal(event_args.feeAmount) / (Decimal(10) ** 6).quantize(Decimal('0.01'))                        
+    tipAmount = Decimal(event_args.tipAmount)/ (Decimal(10) ** 6)
+    tip = Decimal(str(tipAmount)) if tipAmount != 0 else Decimal(0)
+    return net_amount, tip
+
+
+def _goal_reached_mail(pledged_project):
+    email = pledged_project.organization.user.email
+    subject=f"Your Goal Has Been Reached"
+    title = "Goal achieved, Progress in Motion"
+    message=f"""The goal for your campaign “{pledged_project.title}” , has been successfully reached. 
+    To complete the next steps, kindly visit your dashboard and finalize your campaign. 
+    Once confirmed, the withdrawal processes will begin, 
+    """
+    _mail_on_commit(email,subject,message, title)
+
+
+def _donation_mail(wallet, net_amount, project):
+    email = wallet.users.first().email
+    subject=f"Your Donation Was Successful"
+    message=f"""
+    Your donation of {net_amount} USDC to the campaign “{project.title}” has been successfully processed. 
+    Thank you for your contribution"""
+    _mail_on_commit(email,subject,message)
+
+
+def _on_pledged(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    backer = event_args.donor
+    net_amount, tip = _pledge_amounts(event_args)
+    pledged_project = _campaign_project(campaign_id)
+
+    if sharded():
+        # hot campaigns: a counter shard takes the increment, flush_funding applies it
+        add_funds({pledged_project.pk: net_amount})
+    else:
+        # 1. Update project funds atomically
+        pledged_project.total_funds = F('total_funds') + net_amount
+        pledged_project.save(update_fields=['total_funds'])
+        pledged_project.refresh_from_db()
+
+        # 2. Update progress
+        pledged_project.progress = round((pledged_project.total_funds / pledged_project.goal) * 100, 2)
+        pledged_project.save(update_fields=['progress'])
+
+        # 3. Milestones: one read, one bulk write
+        if advance_milestones(pledged_project).goal_reached:
+            _goal_reached_mail(pledged_project)
+
+    wallet = Wallet.objects.filter(address_lower=normalize_address(backer)).first()
+    if wallet:
+        # the donor's pending transaction for this pledge, if any, becomes this one
+        Transaction.objects.bulk_create(fulfil_intents([Transaction(
+            project = pledged_project,
+            wallet = wallet,
+            amount=net_amount,
+            tip=tip,
+            status=Transaction.SUCCESSFUL,
+            tx_hash = web3_log['transactionHash'],
+            event = Transaction.PLEDGE,
+            )]))
+        
+        donor_id = wallet.users.filter(is_organization=False).first().donor.id
+        Donor.objects.filter(id=donor_id).update(tx_count=F('tx_count') + 1)
+
+        # one atomic upsert: the amount is incremented in SQL, no read first
+        add_donations({(pledged_project.pk, wallet.pk): net_amount})
+        _donation_mail(wallet, net_amount, pledged_project)
+    else:
+        # pledged from a wallet nobody registered: credit the campaign's anonymous total, nobody to mail
+        add_anonymous_donations({pledged_project.pk: net_amount})
+
+
+def _on_campaign_finalized(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    state = event_args.newState
+    project = _campaign_project(campaign_id)
+    if state == 1:
+        project.status = Project.Completed
+    elif state == 2:
+        project.status = Project.Failed
+        project.donations.update(refundable=True)
+    project.save(update_fields=['status'])
+
+
+def _on_campaign_halted(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    project = _campaign_project(campaign_id)
+    project.status = Project.Cancelled
+    project.donations.update(refundable=True)
+    project.save(update_fields=['status'])
+
+
+def _on_milestone_approved(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    milestone_index = event_args.milestoneIndex + 1
+    project = _campaign_project(campaign_id)
+    milestone = project.milestones.get(milestone_no=milestone_index)
+    milestone.approved= True
+    milestone.save(update_fields=['approved'])
+
+    email = project.organization.user.email
+    subject=f"Milestone Approved"
+    title = "Progress Verified"
+    message=f"""Milestone {milestone_index} for your campaign '{project.title}'  has been successfully reviewed and approved.
+                Funds tied to this stage have now been released.You can continue tracking updates and upcoming milestones on your dashboard.
+            """
+    _mail_on_commit(email,subject,message,title)
+
+
+def _on_milestone_withdrawn(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    index = event_args.milestoneIndex + 1
+    # amount = Decimal(event_args.amount) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
+    project = _campaign_project(campaign_id)
+    milestone = project.milestones.get(milestone_no=index)
+    milestone.withdrawn= True
+    milestone.save(update_fields=['withdrawn'])
+    # the webhook carries the sender; polled logs do not, and only the creator can withdraw
+    sender = (raw_log.get('transaction') or {}).get('from', {}).get('address') or project.wallet_address
+    wallet = Wallet.objects.get(address_lower=normalize_address(sender))
+    Transaction.objects.create(
+        wallet=wallet,
+        tx_hash = web3_log['transactionHash'],
+        event = Transaction.M_WITHDRAWAL,
+        status = Transaction.SUCCESSFUL,
+    )
+
+
+def _on_refunded(event_args, web3_log, raw_log):
+    campaign_id = event_args.id
+    backer = event_args.donor
+    # amount = Decimal(event_args.amount) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
+    project = _campaign_project(campaign_id)
+    donation = project.donations.filter(wallet__address_lower=normalize_address(backer))
+    donation.update(refundable=False,refunded=True)
+    donation_obj = donation.first()
+    Transaction.objects.create(
+        wallet = donation_obj.wallet,
+        tx_hash = web3_log['transactionHash'],
+        event = Transaction.REFUND,
+        status = Transaction.SUCCESSFUL,
+    )
+
+
+EVENT_HANDLERS = {
+    'CampaignCreated': _on_campaign_created,
+    'Pledged': _on_pledged,
+    'CampaignFinalized': _on_campaign_finalized,
+    'CampaignHalted': _on_campaign_halted,
+    'MilestoneApproved': _on_milestone_approved,
+    'MilestoneWithdrawn': _on_milestone_withdrawn,
+    'RefundClaimed': _on_refunded,
+}
+
+
+def event_topics():
+    """topic0 of every event with a handler, for eth_getLogs / eth_subscribe filters."""
+    return event_decoders.topics(EVENT_HANDLERS)
+
+
+def flush_funding():
+    """Roll pending funding shards into the projects; mails the creators of campaigns that reached their goal."""
+    projects, results = rollup_funding()
+    for project in projects:
+        if results[project.pk].goal_reached:
+            _goal_reached_mail(project)
+    return len(projects)
+
+
+def settle_funding():
+    """End of an ingestion path without a rollup loop: with sharded funding, roll up now so totals do not lag."""
+    if sharded():
+        flush_funding()
+
+
+def _event_key(web3_log):
+    return ((web3_log.get("transactionHash") or "").lower(), web3_log.get("logIndex"))
+
+
+def _ledger_row(event_name, web3_log):
+    tx_hash, log_index = _event_key(web3_log)
+    return ProcessedEvent(
+        chain=CHAIN,
+        tx_hash=tx_hash,
+        log_index=log_index,
+        event=event_name,
+        block_number=web3_log.get("blockNumber"),
+    )
+
+
+def _claim_event(event_name, web3_log):
+    """
+    Insert the ledger row for a log inside the caller's transaction.
+    Returns False when the log was already applied (unique index hit).
+    """
+    try:
+        with transaction.atomic():
+            _ledger_row(event_name, web3_log).save()
+    except IntegrityError:
+        return False
+    return True
+
+
+def _apply_pledge_batch(pledges):
+    """
+    Apply a run of decoded Pledged events with set-based statements:
+    one UPDATE for all campaign totals and one for progress (or one counter
+    shard upsert, see projects.funding), one INSERT for transactions, one
+    UPDATE for donor tx_count and one donation upsert.
+    Must run inside a transaction; raises on any unknown campaign so the
+    caller can fall back to the per-log path.
+    """
+    rows = []
+    for event_args, web3_log, raw_log in pledges:
+        net_amount, tip = _pledge_amounts(event_args)
+        rows.append((event_args.id, normalize_address(event_args.donor), net_amount, tip, web3_log))
+
+    # campaigns (with sharded funding the Project rows are only read, not locked)
+    campaign_ids = {row[0] for row in rows}
+    pks = campaign_pks.get_many(campaign_ids)
+    queryset = Project.objects.filter(pk__in=pks.values())
+    if not sharded():
+        queryset = queryset.select_for_update()
+    projects = {p.contract_id: p for p in queryset}
+    missing = campaign_ids - projects.keys()
+    if missing:
+        # unknown, or re-pointed in another process: drop them so the per-log path reads them again
+        campaign_pks.invalidate(*missing)
+        raise Project.DoesNotExist(f"no project for campaign(s) {sorted(missing)}")
+
+    totals = defaultdict(Decimal)
+    for campaign_id, _, net_amount, _, _ in rows:
+        totals[projects[campaign_id].pk] += net_amount
+    if sharded():
+        add_funds(totals)
+    else:
+        by_pk = {p.pk: p for p in projects.values()}
+        for project_pk, progress in apply_funding(projects.values(), totals).items():
+            if progress.goal_reached:
+                _goal_reached_mail(by_pk[project_pk])
+
+    # wallets, by their normalized address (rows carry normalized backers)
+    backers = {row[1] for row in rows}
+    wallets = {
+        w.address_lower: w
+        for w in Wallet.objects.filter(address_lower__in=backers).prefetch_related('users__donor')
+    }
+
+    # transactions: pending ones with an open intent are fulfilled in place, one INSERT for the rest
+    Transaction.objects.bulk_create(fulfil_intents([
+        Transaction(
+            project=projects[campaign_id],
+            wallet=wallets[backer],
+            amount=net_amount,
+            tip=tip,
+            status=Transaction.SUCCESSFUL,
+            tx_hash=web3_log['transactionHash'],
+            event=Transaction.PLEDGE,
+        )
+        for campaign_id, backer, net_amount, tip, web3_log in rows
+        if backer in wallets
+    ]))
+
+    # donor tx_count
+    tx_counts = defaultdict(int)
+    for _, backer, _, _, _ in rows:
+        wallet = wallets.get(backer)
+        if not wallet:
+            continue
+        donor_user = next(u for u in wallet.users.all() if not u.is_organization)
+        tx_counts[donor_user.donor.id] += 1
+    if tx_counts:
+        # donors are shared between campaign partitions running in parallel:
+        # lock them in id order so two batches cannot deadlock
+        list(Donor.objects.select_for_update().filter(id__in=tx_counts.keys()).order_by('id').values_list('id'))
+        Donor.objects.filter(id__in=tx_counts.keys()).update(
+            tx_count=F('tx_count') + Case(
+                *[When(id=donor_id, then=Value(count)) for donor_id, count in tx_counts.items()],
+                output_field=Donor._meta.get_field('tx_count'),
+            )
+        )
+
+    # donations: one upsert for known wallets, one for the campaigns' anonymous totals
+    amounts, anonymous = defaultdict(Decimal), defaultdict(Decimal)
+    for campaign_id, backer, net_amount, _, _ in rows:
+        wallet = wallets.get(backer)
+        if wallet:
+            amounts[(projects[campaign_id].pk, wallet.pk)] += net_amount
+        else:
+            anonymous[projects[campaign_id].pk] += net_amount
+    add_donations(amounts)
+    add_anonymous_donations(anonymous)
+
+    for campaign_id, backer, net_amount, _, _ in rows:
+        wallet = wallets.get(backer)
+        if wallet:
+            _donation_mail(wallet, net_amount, projects[campaign_id])
+
+
+def _apply_event(event_name, event_args, web3_log, raw_log, data, failed):
+    """Claim and apply one decoded log; returns 1 if it was applied."""
+    try:
+        with transaction.atomic():
+            if not _claim_event(event_name, web3_log):
+                # applied concurrently by another worker
+                return 0
+            EVENT_HANDLERS[event_name](event_args, web3_log, raw_log)
+        return 1
+    except Exception as e:
+        _record_error(data, str(e), traceback.format_exc(), web3_log)
+        failed.append((web3_log, e))
+        return 0
+
+
+def _flush_pledges(pledges, data, failed):
+    """Apply buffered Pledged events as one batch, or one by one if the batch fails."""
+    if len(pledges) > 1:
+        try:
+            with transaction.atomic():
+                ProcessedEvent.objects.bulk_create(
+                    [_ledger_row('Pledged', web3_log) for _, web3_log, _ in pledges]
+                )
+                _apply_pledge_batch(pledges)
+            return len(pledges)
+        except (IntegrityError, Project.DoesNotExist) as e:
+            # duplicate delivered concurrently or a campaign not created yet:
+            # the per-log path isolates it and records the error
+            logger.info("pledge batch of %s falls back to per-log apply: %s", len(pledges), e)
+        except Exception:
+            # not a bad log the per-log path expects: a broken batch path must not hide behind it
+            logger.exception("pledge batch of %s failed, applying it per log", len(pledges))
+    return sum(_apply_event('Pledged', *pledge, data, failed) for pledge in pledges)
+
+
+def _apply_partition(events, data, failed):
+    """
+    Apply one partition's decoded events, (event_name, event_args, web3_log,
+    raw_log) in (blockNumber, logIndex) order. Consecutive pledges go through
+    _flush_pledges; any other event flushes them first so order is kept.
+    """
+    applied = 0
+    pledges = []
+    for event_name, event_args, web3_log, raw_log in events:
+        if event_name == 'Pledged' and settings.WEBHOOK_BATCH_PLEDGES:
+            pledges.append((event_args, web3_log, raw_log))
+            continue
+
+        # keep block order: pledges buffered so far land before this event
+        applied += _flush_pledges(pledges, data, failed)
+        pledges = []
+        applied += _apply_event(event_name, event_args, web3_log, raw_log, data, failed)
+
+    applied += _flush_pledges(pledges, data, failed)
+    return applied
+
+
+# the inline view applies one delivery at a time per process, so request threads
+# cannot interleave a campaign's events from two deliveries
+_inline_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def partition_pool():
+    """Threads applying campaign partitions, one pool per process."""
+    return ThreadPoolExecutor(max_workers=settings.WEBHOOK_PARTITION_WORKERS, thread_name_prefix='campaign-partition')
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=partition_pool.cache_clear)
+
+
+def _run_partition(events, data, failed):
+    try:
+        return _apply_partition(events, data, failed)
+    finally:
+        connection.close()
+
+
+def _apply_partitions(partitions, data, failed):
+    """
+    Apply partitions in parallel on partition_pool(). Partitions hold
+    different campaigns, whose events touch different Project / Milestone /
+    Donation rows, so they do not wait on each other's row locks.
+    Two calls running at once can still hold the same campaign: whoever
+    applies several deliveries concurrently keeps them apart per campaign
+    (process_webhooks claims one delivery per campaign, _inline_lock for the inline view).
+    """
+    if len(partitions) < 2 or settings.WEBHOOK_PARTITION_WORKERS < 2 or connection.in_atomic_block:
+        # nothing to overlap, or the caller's transaction has to see every write
+        return sum(_apply_partition(events, data, failed) for events in partitions)
+    # biggest first, so a partition with a hot campaign does not start last
+    partitions = sorted(partitions, key=len, reverse=True)
+    futures = [partition_pool().submit(_run_partition, events, data, failed) for events in partitions]
+    return sum(future.result() for future in futures)
+
+
+def process_payload(data, webhook_event=None):
+    """Apply an Alchemy webhook payload already parsed into a dict (see process_block)."""
+    block = data['event']['data']['block']
+    return process_block(block.get('logs') or [], block, webhook_event)
+
+
+def process_block(logs, header, webhook_event=None):
+    """
+    Decode and apply the logs of an Alchemy webhook block (see process_logs).
+    `logs` can be any iterable, e.g. stream_logs over the stored body, and is
+    consumed WEBHOOK_STREAM_CHUNK logs at a time, so a full block never has
+    to be in memory at once. `header` holds the block fields (number, hash)
+    used to fill in what the logs leave out.
+    Logs already in the ProcessedEvent ledger are skipped before decoding, so
+    redeliveries and replays are no-ops. With WEBHOOK_BATCH_PLEDGES, consecutive
+    Pledged logs are applied together by _apply_pledge_batch; other events keep
+    their position in the block. Failures are recorded per log in ErrorLog,
+    pointing at `webhook_event` (an id) rather than copying the payload, so one
+    bad log does not stop the block.
+    Returns the number of logs that were applied. Raises CampaignNotReady,
+    once the other logs are applied, when some named a campaign that is not
+    in the database yet, so the delivery is retried rather than finished.
+    """
+    context = {'source': 'webhook', 'webhook_event': webhook_event}
+    applied = received = 0
+    failed = []
+    chunk = []
+    for raw_log in logs:
+        received += 1
+        chunk.append((raw_log, _normalize_alchemy_log(raw_log, block_obj=header)))
+        if len(chunk) >= settings.WEBHOOK_STREAM_CHUNK:
+            applied += process_logs(chunk, dict(context, block=header.get('number')), failed)
+            chunk = []
+    if chunk:
+        applied += process_logs(chunk, dict(context, block=header.get('number')), failed)
+
+    if not received:
+        _record_error(dict(context, block=header.get('number')), "no log recieved")
+    unknown = [web3_log for web3_log, error in failed if isinstance(error, Project.DoesNotExist)]
+    if unknown:
+        raise CampaignNotReady(f"{len(unknown)} log(s) name a campaign that is not known yet ({applied} applied)")
+    return applied
+
+
+class CampaignNotReady(Exception):
+    """Logs of a delivery were left unapplied because their campaign does not exist yet."""
+
+
+def event_campaigns(payload):
+    """
+    On-chain campaign ids of the handled events in a stored webhook body, and
+    those among them the body creates (CampaignCreated), as two frozensets.
+    Both are empty if the body does not parse.
+    """
+    header = {}
+    try:
+        web3_logs = [_normalize_alchemy_log(raw_log, block_obj=header) for raw_log in stream_logs(payload, header)]
+    except json.JSONDecodeError:
+        return frozenset(), frozenset()
+    decoded = [
+        (event_name, event_args.id)
+        for event_name, event_args, error in event_decoders.decode_logs(web3_logs, EVENT_HANDLERS)
+        if event_name is not None and error is None
+    ]
+    return (
+        frozenset(campaign_id for _, campaign_id in decoded),
+        frozenset(campaign_id for event_name, campaign_id in decoded if event_name == 'CampaignCreated'),
+    )
+
+
+def process_logs(web3_logs, data, failed=None):
+    """
+    Apply (raw_log, web3_log) pairs from one block or a range of blocks.
+    Decoded events are partitioned by campaign (contract_id modulo
+    WEBHOOK_PARTITION_WORKERS): partitions are applied in parallel, and
+    events within one stay in (blockNumber, logIndex) order. That order
+    only holds within one call: callers applying several calls at once keep
+    a campaign's calls apart (see process_webhooks).
+    Shared by the webhook and the eth_getLogs poller; `data` is the context
+    (source, block, webhook_event id) stored in ErrorLog for failures, and
+    `failed`, if given, receives (web3_log, error) for every log that was
+    not applied because it failed (already applied ones are not failures).
+    """
+    if failed is None:
+        failed = []
+    # the ledger key is (tx_hash, logIndex): a log without one could never be
+    # claimed (the ledger insert fails like a duplicate would), so reject it here
+    keyed = []
+    for raw_log, web3_log in web3_logs:
+        tx_hash, log_index = _event_key(web3_log)
+        if not tx_hash or log_index is None:
+            error = "log without transactionHash or logIndex"
+            _record_error(data, error, None, web3_log)
+            failed.append((web3_log, ValueError(error)))
+            continue
+        keyed.append((raw_log, web3_log))
+    web3_logs = keyed
+
+    # one indexed query for the whole block; each log is then a set lookup
+    tx_hashes = {_event_key(web3_log)[0] for _, web3_log in web3_logs}
+    seen = set(
+        ProcessedEvent.objects.filter(chain=CHAIN, tx_hash__in=tx_hashes).values_list('tx_hash', 'log_index')
+    )
+
+    fresh = [(raw_log, web3_log) for raw_log, web3_log in web3_logs if _event_key(web3_log) not in seen]
+    # the whole block in one pass: topic0 -> compiled decoder -> event record
+    decoded = event_decoders.decode_logs([web3_log for _, web3_log in fresh], EVENT_HANDLERS)
+
+    # shard by campaign, one partition per worker: a campaign's events all land in
+    # the same partition, in (blockNumber, logIndex) order, and pledges to several
+    # campaigns of one partition are still batched together
+    workers = max(1, settings.WEBHOOK_PARTITION_WORKERS)
+    partitions = defaultdict(list)
+    for (raw_log, web3_log), (event_name, event_args, error) in zip(fresh, decoded):
+        if event_name is None:
+            continue
+
+        if error is not None:
+            _record_error(data, str(error), ''.join(traceback.format_exception(error)), web3_log)
+            failed.append((web3_log, error))
+            continue
+
+        partitions[event_args.id % workers].append((event_name, event_args, web3_log, raw_log))
+
+    for events in partitions.values():
+        events.sort(key=lambda event: (event[2].get('blockNumber') or 0, event[2].get('logIndex') or 0))
+    return _apply_partitions(list(partitions.values()), data, failed)
+
+
+def apply_webhook_event(event):
+    """Stream the stored body of a WebhookEvent through process_block; raises on bad bodies."""
+    header = {}
+    return process_block(stream_logs(event.payload, header), header, webhook_event=event.pk)
+
+
+def _finish_webhook_event(event, error=None):
+    event.status = WebhookEvent.FAILED if error else WebhookEvent.DONE
+    event.error = error
+    event.processed_at = timezone.now()
+    event.save(update_fields=['status', 'error', 'processed_at'])
+
+
+def process_webhook_event(event):
+    """
+    Apply a stored WebhookEvent and record the outcome on the row.
+    """
+    try:
+        apply_webhook_event(event)
+    except Exception as e:
+        _finish_webhook_event(event, f"{e}\n{traceback.format_exc()}")
+    else:
+        _finish_webhook_event(event)
+    return event.status == WebhookEvent.DONE
+
+
 @csrf_exempt
 def alchemy_webhook(request):
     """
-    Receives and processes Alchemy webhook events for the MilestoneCrowdfund contract.
+    Receives Alchemy webhook events for the MilestoneCrowdfund contract.
+    The body is checked, stored in the WebhookEvent inbox and acknowledged straight
+    away; `manage.py process_webhooks` applies it. Bodies that are not JSON get a
+    400 instead of a row the workers would only fail on.
     """
     if request.method != 'POST':
         return JsonResponse({'status': 'invalid method'}, status=405)
 
+    # Note: Implement HMAC signature verification for production.
     try:
-        # Note: Implement HMAC signature verification for production.
-        data = json.loads(request.body)
-        # logs = data.get('event', {}).get('data', {}).get('block', {}).get('logs', [])
-        logs = data['event']['data']['block'].get('logs',[])
-
-        if not logs:
-            ErrorLog.objects.create(data=data, error="no log recieved")
-            return JsonResponse({'status': 'no logs received'})
-
-        # capture block object for normalization (if present)
-        block_obj = data.get('event', {}).get('data', {}).get('block', {})
-
-        for raw_log in logs:
-            # normalize Alchemy log into web3/geth style
-            web3_log = _normalize_alchemy_log(raw_log, block_obj=block_obj)
-
-            # get topic safely (may be missing)
-            topics = web3_log.get("topics") or []
-            if not topics:
-                #ContractLog.objects.create(data=data, error="no topics in log",notes=raw_log)
-                continue
-
-            event_topic = topics[0]
-
-            try:
-                # Use the event topic to get the event object from the contract ABI.
-                event_name = EVENT_TOPIC_MAP.get(event_topic, None)
-                if not event_name:
-                    # ContractLog.objects.create(data=data, error="⚠️ Unknown event topic received",notes=raw_log)
-                    continue
-
-                # Access the event object directly via the contract instance
-                event_object = getattr(contract.events, event_name)
-
-                # PASS THE NORMALIZED web3_log TO process_log
-                event_data = event_object().process_log(web3_log)
-                event_args = event_data['args']
-                print(event_args)
-                # --- Events ---
-                if event_name == 'CampaignCreated':
-                    try:
-                        campaign_id = event_args['id']
-                        offchain_id = event_args['offchainId']
-                        creator = event_args['creator']
-                        # goal = Decimal(event_args['goal']) / (Decimal(10) ** 6)
-                        # aware_datetime = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-                        raw_deadline = event_args.get('deadline')
-                        # dt_utc = datetime.datetime.fromtimestamp(int(raw_deadline), tz=timezone.utc)
-                        dt_utc = datetime.datetime.fromtimestamp(int(raw_deadline), tz=datetime.timezone.utc)
-                        # project = Project.objects.filter(
-                        #     approval_status=Project.APPROVED,
-                        #     deployed=False,
-                        #     wallet_address__iexact=creator,
-                        #     goal=goal.quantize(Decimal('0.01'))
-                        # ).first()
-                        project = Project.objects.filter(
-                            id = offchain_id 
-                        ).first()
-                        project.contract_id = campaign_id
-                        project.deployed = True
-                        project.deadline = dt_utc
-                        project.deployed_at = timezone.now()
-                        project.wallet_address = creator
-                        project.milestones.filter(milestone_no=1).update(status=Milestone.ACTIVE)
-                        project.save(update_fields=['contract_id', 'deployed', 'deadline','deployed_at', 'wallet_address'])
-                        wallet = Wallet.objects.get(address__iexact=creator)
-                        Transaction.objects.create(
-                            tx_hash = logs[0]['transaction'].get('hash'),
-                            event = Transaction.C_DEPLOYMENT,
-                            status = Transaction.SUCCESSFUL,
-                            wallet = wallet,
-                        )
-                    except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            ) 
-                elif event_name == 'Pledged':
-                    try:
-                        campaign_id = event_args['id']
-                        backer = event_args['donor']
-                        net_amount = Decimal(event_args['netAmount']) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
-                        # fee_amount = Decimal(event_args['feeAmount']) / (Decimal(10) ** 6).quantize(Decimal('0.01'))                        
-                        tipAmount = Decimal(event_args['tipAmount'])/ (Decimal(10) ** 6)
-                        tip = Decimal(str(tipAmount)) if tipAmount != 0 else Decimal(0)
-                        pledged_project = Project.objects.get(contract_id=campaign_id)
-                        
-
-                        if pledged_project:
-                            # 1. Update project funds atomically
-                            pledged_project.total_funds = F('total_funds') + net_amount
-                            pledged_project.save(update_fields=['total_funds'])
-                            pledged_project.refresh_from_db()
-
-                            # 2. Update progress
-                            pledged_project.progress = round((pledged_project.total_funds / pledged_project.goal) * 100, 2)
-                            pledged_project.save(update_fields=['progress'])
-
-                            # 3. Recursive Milestone Ripple
-                            # We use a loop because one donation might clear multiple milestones
-                            while True:
-                                active_milestone = pledged_project.milestones.filter(status=Milestone.ACTIVE).first()
-                                
-                                # Fallback: If no milestone is active, find the first pending one to start the chain
-                                if not active_milestone:
-                                    active_milestone = pledged_project.milestones.filter(status=Milestone.NOT_STARTED).order_by('milestone_no').first()
-                                    if active_milestone:
-                                        active_milestone.status = Milestone.ACTIVE
-                                        active_milestone.save(update_fields=['status'])
-                                    else:
-                                        # No more milestones exist at all
-                                        break
-
-                                # Check if the CURRENT active milestone's cumulative goal is met
-                                if pledged_project.total_funds >= active_milestone.goal:
-                                    active_milestone.status = Milestone.COMPLETED
-                                    active_milestone.save(update_fields=['status'])
-
-                                    # Look for the next one
-                                    next_milestone = pledged_project.milestones.filter(
-                                        milestone_no=active_milestone.milestone_no + 1
-                                    ).first()
-
-                                    if next_milestone:
-                                        next_milestone.status = Milestone.ACTIVE
-                                        next_milestone.save(update_fields=['status'])
-                                        # Continue the loop to see if the NEW active milestone is also met
-                                        continue 
-                                    else:
-                                        # Goal met and no more milestones to activate
-                                        email = pledged_project.organization.user.email
-                                        subject=f"Your Goal Has Been Reached"
-                                        title = "Goal achieved, Progress in Motion"
-                                        message=f"""The goal for your campaign “{pledged_project.title}” , has been successfully reached. 
-                                        To complete the next steps, kindly visit your dashboard and finalize your campaign. 
-                                        Once confirmed, the withdrawal processes will begin, 
-                                        """
-                                        send_html_mail(email,subject,message, title)
-
-                                        break
-                                else:
-                                    # Current milestone goal not yet met, stop rippling
-                                    break
-
-                                
-                            wallet = Wallet.objects.filter(address=backer).first()
-                            if wallet:
-                                Transaction.objects.create(
-                                    project = pledged_project,
-                                    wallet = wallet,
-                                    amount=net_amount,
-                                    tip=tip,
-                                    status=Transaction.SUCCESSFUL,
-                                    tx_hash = logs[0]['transaction'].get('hash'),
-                                    event = Transaction.PLEDGE,
-                                    )
-                                
-                                donor_id = wallet.users.filter(is_organization=False).first().donor.id
-                                Donor.objects.filter(id=donor_id).update(tx_count=F('tx_count') + 1)
-
-
-                                # transaction.status = Transaction.SUCCESSFUL
-                                # transaction.tx_hash = logs[0]['transaction'].get('hash')
-                                # transaction.save(update_fields=['status', 'tx_hash'])
-
-                            user_donations = Donation.objects.filter(
-                                wallet__address__iexact=backer, 
-                                project = pledged_project
-                                ).first()
-                            
-                            if user_donations:
-                                user_donations.amount = user_donations.amount + net_amount
-                                user_donations.save(update_fields=['amount'])
-                            else:
-                                Donation.objects.create(
-                                    project=pledged_project,
-                                    amount=net_amount,
-                                    wallet=wallet,
-                                )
-                            
-                            email = wallet.users.first().email
-                            subject=f"Your Donation Was Successful"
-                            message=f"""
-                            Your donation of {net_amount} USDC to the campaign “{pledged_project.title}” has been successfully processed. 
-                            Thank you for your contribution"""
-                            send_html_mail(email,subject,message)
-
-
-                        else: 
-                            ErrorLog.objects.create(
-                                data=data,
-                                error="could not find project",
-                                notes=event_args
-                            )
-                    except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            ) 
-
-
-                elif event_name == 'CampaignFinalized':
-                        try:
-                            campaign_id = event_args['id']
-                            state = event_args['newState']
-                            #print(f'id:{campaign_id} type:{type(campaign_id)}')
-                            project = Project.objects.get(contract_id = campaign_id)
-                            if state == 1:
-                                project.status = Project.Completed
-                            elif state == 2:
-                                project.status = Project.Failed
-                                project.donations.update(refundable=True)
-                            project.save(update_fields=['status'])
-                
-                        except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            )  
-                
-
-                elif event_name == 'CampaignHalted':
-                        try:
-                            campaign_id = event_args['id']
-                            project = Project.objects.get(contract_id = campaign_id)
-                            project.status = Project.Cancelled
-                            project.donations.update(refundable=True)
-                            project.save(update_fields=['status'])
-                
-                        except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            )  
-
-
-                elif event_name == 'MilestoneApproved':
-                        try :
-                            campaign_id = event_args['id']
-                            #index = event_args['index']
-                            milestone_index = event_args['milestoneIndex'] + 1
-                            project = Project.objects.get(contract_id = campaign_id)
-                            milestone = project.milestones.get(milestone_no=milestone_index)
-                            milestone.approved= True
-                            milestone.save(update_fields=['approved'])
-
-                            email = project.organization.user.email
-                            subject=f"Milestone Approved"
-                            title = "Progress Verified"
-                            message=f"""Milestone {milestone_index} for your campaign '{project.title}'  has been successfully reviewed and approved.
-                                        Funds tied to this stage have now been released.You can continue tracking updates and upcoming milestones on your dashboard.
-                                    """
-                            send_html_mail(email,subject,message,title)
-
-                        except:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            )      
-
-                elif event_name == 'MilestoneWithdrawn':
-                        try :
-                            campaign_id = event_args['id']
-                            index = event_args['milestoneIndex'] + 1
-                            # amount = Decimal(event_args['amount']) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
-                            project = Project.objects.get(contract_id = campaign_id)
-                            milestone = project.milestones.get(milestone_no=index)
-                            milestone.withdrawn= True
-                            milestone.save(update_fields=['withdrawn'])
-                            wallet = Wallet.objects.get(address__iexact=logs[0]['transaction']['from'].get('address'))
-                            Transaction.objects.create(
-                                wallet=wallet,
-                                tx_hash = logs[0]['transaction'].get('hash'),
-                                event = Transaction.M_WITHDRAWAL,
-                                status = Transaction.SUCCESSFUL,
-                            )
-                        except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            )    
-
-
-
-                elif event_name == 'Refunded':
-                        try :
-                            campaign_id = event_args['id']
-                            backer = event_args['donor']
-                            # amount = Decimal(event_args['amount']) / (Decimal(10) ** 6).quantize(Decimal('0.01'))
-                            project = Project.objects.get(contract_id = campaign_id)
-                            donation = project.donations.filter(wallet__address=backer)
-                            donation.update(refundable=False,refunded=True)
-                            donation_obj = donation.first()
-                            Transaction.objects.create(
-                                wallet = donation_obj.wallet,
-                                tx_hash = logs[0]['transaction'].get('hash'),
-                                event = Transaction.REFUND,
-                                status = Transaction.SUCCESSFUL,
-                            )
-                        except Exception as e:
-                            #print(f"{e} traceback: {traceback.format_exc()}")
-                            ErrorLog.objects.create(
-                                data=data,
-                                error=str(e),
-                                notes=traceback.format_exc()
-                            )    
-
-
-
-            except Exception as e:
-                #print(f"{e} traceback: {traceback.format_exc()}")
-                ErrorLog.objects.create(
-                    data=data,
-                    error=str(e),
-                    notes=traceback.format_exc()
-                )
+        payload = request.body.decode('utf-8')
+        # walked one log at a time, like the worker will: the block is never built whole here
+        for _ in stream_logs(payload, {}):
+            pass
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return JsonResponse({'status': 'invalid JSON'}, status=400)
 
-        return JsonResponse({'status': 'success'})
+    event = WebhookEvent.objects.create(payload=payload)
+    return JsonResponse({'status': 'queued', 'id': event.pk})
 
-    except json.JSONDecodeError:
+
+@csrf_exempt
+def alchemy_webhook_inline(request):
+    """
+    Previous behaviour: decode and apply every log before answering.
+    Kept for the webhook benchmark and as a fallback while no worker is running.
+    Deliveries are applied one at a time per process (see _inline_lock); run a
+    single process on this endpoint, or process_webhooks, to keep each
+    campaign's events in block order.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'invalid method'}, status=405)
+
+    try:
+        payload = request.body.decode('utf-8')
+    except UnicodeDecodeError:
+        return JsonResponse({'status': 'invalid JSON'}, status=400)
+
+    # stored once, like the queued path: error rows point at it
+    event = WebhookEvent.objects.create(payload=payload, status=WebhookEvent.PROCESSING, attempts=1)
+    try:
+        with _inline_lock:
+            apply_webhook_event(event)
+            settle_funding()
+    except json.JSONDecodeError as e:
+        _finish_webhook_event(event, str(e))
         return JsonResponse({'status': 'invalid JSON'}, status=400)
     except Exception as e:
-        return JsonResponse({'status': f'an error occurred: {e} traceback: {traceback.format_exc()}'}, status=500)
\ No newline at end of file
+        _finish_webhook_event(event, f"{e}\n{traceback.format_exc()}")
+        return JsonResponse({'status': f'an error occurred: {e} traceback: {traceback.format_exc()}'}, status=500)
+    _finish_webhook_event(event)
+    return JsonResponse({'status': 'success'})
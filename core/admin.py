@@ -3,7 +3,9 @@ from django.contrib import admin
 from django.contrib.admin import AdminSite
 from django.contrib.auth import get_user_model
 import django.contrib.admin.sites
-from contract.blockchain import vault_bal, platform_wallet_bal
+from decouple import config
+from contract.balances import balance_service
+from contract import blockchain
 from contract.blockchain import contract, send_owner_tx
 from accounts.models import Donor
 from projects.models import Project
@@ -17,15 +19,14 @@ class MyAdminSite(AdminSite):
         extra_context = extra_context or {}
         extra_context["total_donors"] = Donor.objects.count()
         extra_context["total_campaigns"] = Project.objects.filter(deployed=True).count()
-        # Safe blockchain calls
+        # Safe blockchain calls; cached, see contract.balances
         try:
-            extra_context["treasury_balance"] = platform_wallet_bal()
+            vault, treasury = blockchain.CONTRACT_ADDRESS, config("TREASURY_WALLET_ADDRESS")
+            balances = balance_service().balances([vault, treasury])
+            extra_context["treasury_balance"] = balances[treasury]
+            extra_context["vault_balance"] = balances[vault]
         except Exception:
             extra_context["treasury_balance"] = "alchemy error"
-
-        try:
-            extra_context["vault_balance"] = vault_bal()
-        except Exception:
             extra_context["vault_balance"] = "alchemy error"
 
         # Contract function calls
@@ -287,4 +287,60 @@ SIMPLE_JWT = {
 }
 
 
-FREE_TX_LIMIT = 10
\ No newline at end of file
+FREE_TX_LIMIT = 10
+
+# apply consecutive Pledged logs of a webhook block with set-based statements
+WEBHOOK_BATCH_PLEDGES = config('WEBHOOK_BATCH_PLEDGES', default=True, cast=bool)
+# logs parsed from a webhook body and applied together (bounds memory on full blocks)
+WEBHOOK_STREAM_CHUNK = config('WEBHOOK_STREAM_CHUNK', default=100, cast=int)
+# threads applying the events of different campaigns in parallel (1 = one after another);
+# sqlite has a single writer, so only the postgres setup defaults to a pool. A campaign's
+# events keep block order within one delivery; process_webhooks orders the deliveries
+WEBHOOK_PARTITION_WORKERS = config('WEBHOOK_PARTITION_WORKERS', default=1 if DEBUG or TEST else 4, cast=int)
+# pledges go to this many counter shards per campaign instead of the Project row
+# (0 = update the row directly); process_webhooks rolls the shards up every FUNDING_ROLLUP_INTERVAL
+# seconds, the inline webhook, poll_logs and subscribe_logs after each batch they apply
+FUNDING_SHARDS = config('FUNDING_SHARDS', default=0, cast=int)
+FUNDING_ROLLUP_INTERVAL = config('FUNDING_ROLLUP_INTERVAL', default=0.5, cast=float)
+# owner transactions: seconds a fetched gas price is reused, and whether to send
+# EIP-1559 (maxFeePerGas / maxPriorityFeePerGas) instead of legacy gasPrice
+GAS_PRICE_TTL = config('GAS_PRICE_TTL', default=10, cast=int)
+GAS_EIP1559 = config('GAS_EIP1559', default=False, cast=bool)
+
+# build the web3 client and contract objects when the app loads instead of on first use
+CHAIN_WARM_UP = config('CHAIN_WARM_UP', default=False, cast=bool)
+
+# dashboard token balances: served from cache for BALANCE_TTL seconds, then
+# refreshed in the background; older than BALANCE_MAX_STALE they are re-read inline
+BALANCE_TTL = config('BALANCE_TTL', default=30, cast=int)
+BALANCE_MAX_STALE = config('BALANCE_MAX_STALE', default=600, cast=int)
+
+# snapshot sweeps read through the AsyncWeb3 client, sending batch chunks concurrently
+CHAIN_ASYNC = config('CHAIN_ASYNC', default=False, cast=bool)
+
+# owner transactions without a receipt after this many seconds are marked STUCK
+OWNER_TX_STUCK_AFTER = config('OWNER_TX_STUCK_AFTER', default=180, cast=int)
+
+# transaction / receipt lookups (contract.txcache): entries kept per process;
+# pending and unknown hashes are looked up again after TX_PENDING_TTL seconds
+TX_CACHE_SIZE = config('TX_CACHE_SIZE', default=10000, cast=int)
+TX_PENDING_TTL = config('TX_PENDING_TTL', default=5, cast=int)
+
+# RPC gateway (contract.gateway): seconds per request, per-method overrides,
+# retries of failed reads, and the circuit breaker (failures in a row to open,
+# seconds before probing again)
+RPC_TIMEOUT = config('RPC_TIMEOUT', default=10, cast=float)
+RPC_TIMEOUTS = {'eth_getLogs': 30, 'eth_sendRawTransaction': 20}
+RPC_RETRIES = config('RPC_RETRIES', default=2, cast=int)
+RPC_BREAKER_THRESHOLD = config('RPC_BREAKER_THRESHOLD', default=5, cast=int)
+RPC_BREAKER_RESET = config('RPC_BREAKER_RESET', default=30, cast=float)
+
+# pledge intents (accounts.intents): seconds a PENDING pledge waits to be signed
+# before sweep_pledge_intents fails it, and intents expired per statement
+PLEDGE_INTENT_TTL = config('PLEDGE_INTENT_TTL', default=900, cast=int)
+PLEDGE_SWEEP_BATCH = config('PLEDGE_SWEEP_BATCH', default=1000, cast=int)
+
+# blocks the websocket subscriber waits on top of a pushed log before applying it. Each one
+# adds a block time (~2s on Polygon) to pledge -> progress latency; reorgs up to this depth
+# are dropped before they are applied, deeper ones are only recorded in ErrorLog
+SUBSCRIBE_CONFIRMATIONS = config('SUBSCRIBE_CONFIRMATIONS', default=1, cast=int)
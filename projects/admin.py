@@ -8,11 +8,13 @@ from decimal import Decimal
 from django.forms import ValidationError as FormValidationError
 from accounts.utils import project_approval_mail, send_html_mail
 from .models import Project, Milestone, MilestoneImage, Donation, Expense, ExpenseDocument
+from .milestones import advance_projects
 from django import forms
 from django.forms.models import BaseInlineFormSet
 from django.utils.html import format_html
-from django.core.cache import cache
 from contract.blockchain import contract, send_owner_tx
+from contract.models import CampaignSnapshot
+from contract.snapshots import deployed_projects, refresh_snapshots
 from django.utils.safestring import mark_safe
 
 
@@ -137,9 +139,32 @@ class ProjectAdmin(admin.ModelAdmin):
     )
     list_filter = ('approval_status', 'status', 'categories',)
     search_fields = ('title',)
+    actions = ['recalculate_milestones', 'refresh_onchain_snapshots']
 
     change_form_template = None  # set in changeform_view
 
+    # -------------------------
+    # Actions
+    # -------------------------
+    def recalculate_milestones(self, request, queryset):
+        results = advance_projects(queryset.filter(deployed=True))
+        completed = sum(len(progress.completed) for progress in results.values())
+        activated = sum(len(progress.activated) for progress in results.values())
+        messages.success(
+            request,
+            f"{len(results)} campaign(s) checked: {completed} milestone(s) completed, {activated} activated."
+        )
+    recalculate_milestones.short_description = "Recalculate milestone progress from total funds"
+
+    def refresh_onchain_snapshots(self, request, queryset):
+        try:
+            refreshed, failed = refresh_snapshots(deployed_projects().filter(pk__in=queryset.values('pk')))
+        except Exception as e:
+            messages.error(request, f"Could not read the chain: {e}")
+            return
+        messages.success(request, f"{refreshed} on-chain snapshot(s) refreshed, {len(failed)} failed.")
+    refresh_onchain_snapshots.short_description = "Refresh on-chain snapshot"
+
     # -------------------------
     # Use fieldsets so Jazmin shows collapsible sections
     # -------------------------
@@ -220,58 +245,49 @@ class ProjectAdmin(admin.ModelAdmin):
         """
         Read-only HTML displaying getCampaignCore and milestones.
         Only shown when obj.deployed == True and obj.contract_id is not None.
-        Cached for 30 seconds.
+        Rendered from the CampaignSnapshot kept fresh by sweep_campaigns; the chain is
+        only read here (once, in one batch) when the project has no snapshot yet.
         """
         if obj is None or not getattr(obj, "deployed", False) or obj.contract_id is None:
             return mark_safe("<i>Not deployed on-chain</i>")
 
         contract_id = obj.contract_id
-        cache_key = f"onchain_campaign_{contract_id}"
-        core = cache.get(cache_key)
-
-        status_dict = {
-            0:'Fundraising',
-            1:'Succeeded',
-            2:'Failed',
-            3:'Cancelled',
-        }
-        curreny_dict = {
-            0:'ETH',
-            1:'ERC20',
-        }
-
-        if not core:
+        snapshot = CampaignSnapshot.objects.filter(project=obj).first()
+        if snapshot is None:
             try:
-                core = contract.functions.getCampaign(contract_id).call()
-                print(core)
-                cache.set(cache_key, core, 30)  # cache for 30s
+                _, failed = refresh_snapshots([obj])
+                # a failed first read leaves no snapshot row: its error is only in `failed`
+                error = failed.get(obj.pk)
+                if error is None:
+                    snapshot = CampaignSnapshot.objects.get(project=obj)
             except Exception as e:
-                # Use a simple f-string and mark_safe
-                return mark_safe(f"<div style='color:#b33;'>Could not fetch on-chain info (ID: {contract_id}). Error: {str(e)}</div>")
-
+                error = str(e)
+            if snapshot is None:
+                return format_html(
+                    "<div style='color:#b33;'>Could not fetch on-chain info (ID: {}). Error: {}</div>", contract_id, error
+                )
 
         try:
-            # Unpack core tuple
-            creator, currencyType, token, goal, totalRaised, totalWithdrawn, deadline, state, contextData, offchainId, milestoneCount, milestonesReleased, totalBpsReleased = core
-
             # Build a small HTML table
             rows = [
                 ("Contract ID", contract_id),
-                ("Creator", creator),
-                ("CurrencyType (ETH,ERC20)", curreny_dict[int(currencyType)]),
-                ("Token", token if token and token != "0x0000000000000000000000000000000000000000" else "ETH"),
-                ("Goal ($)",str(Decimal(goal) / (Decimal(10) ** 6))),   #Decimal(str(tipAmount)) if tipAmount != 0 else Decimal(0) #str(goal)),
-                ("Total Raised", str(Decimal(totalRaised) / (Decimal(10) ** 6))),
-                ("Total Withdrawn", str(Decimal(totalWithdrawn) / (Decimal(10) ** 6)) ),
-                # ("Pledged ($)", str(Decimal(pledged) / (Decimal(10) ** 6))), #str(pledged)),
-                ("Deadline", str(self._timestamp_to_dt(deadline))),
-                ("State", status_dict[int(state)]),
-                ("Context Data", contextData),
-                ("Off-Chain ID", offchainId),
-                ("Milestone count", int(milestoneCount)),
-                ("Milestone Released", milestonesReleased),
-                ("Percentage Released", totalBpsReleased/100),
+                ("Creator", snapshot.creator),
+                ("CurrencyType (ETH,ERC20)", snapshot.get_currency_type_display()),
+                ("Token", snapshot.token if snapshot.token and snapshot.token != "0x0000000000000000000000000000000000000000" else "ETH"),
+                ("Goal ($)", str(snapshot.goal / (Decimal(10) ** 6))),
+                ("Total Raised", str(snapshot.total_raised / (Decimal(10) ** 6))),
+                ("Total Withdrawn", str(snapshot.total_withdrawn / (Decimal(10) ** 6))),
+                ("Deadline", str(timezone.localtime(snapshot.deadline)) if snapshot.deadline else "-"),
+                ("State", snapshot.get_state_display()),
+                ("Context Data", snapshot.context_data),
+                ("Off-Chain ID", snapshot.offchain_id),
+                ("Milestone count", snapshot.milestone_count),
+                ("Milestone Released", snapshot.milestones_released),
+                ("Percentage Released", snapshot.total_bps_released/100),
+                ("Snapshot", f"block {snapshot.block_number}, {timezone.localtime(snapshot.fetched_at):%Y-%m-%d %H:%M:%S}"),
             ]
+            if snapshot.error:
+                rows.append(("Last refresh error", snapshot.error))
 
             html = "<table style='border-collapse:collapse;'>"
             for k, v in rows:
@@ -284,23 +300,22 @@ class ProjectAdmin(admin.ModelAdmin):
             html += "</table>"
 
             # Optionally show milestones (if any)
-            if int(milestoneCount) > 0:
+            if snapshot.milestone_count > 0:
                 html += "<h4 style='margin-top:8px;margin-bottom:6px'>Milestones</h4>"
                 html += "<table style='border-collapse:collapse;width:100%'>"
                 html += "<tr><th style='text-align:left;padding:4px 8px;'>#</th><th style='text-align:left;padding:4px 8px;'>Name</th><th style='text-align:left;padding:4px 8px;'>Amount</th><th style='text-align:left;padding:4px 8px;'>Approved</th><th style='text-align:left;padding:4px 8px;'>Released</th></tr>"
-                for i in range(int(milestoneCount)):
-                    try:
-                        name, amount, approved, released = contract.functions.getMilestone(contract_id, i).call()
+                for i, milestone in enumerate(snapshot.milestones):
+                    if milestone:
                         html += (
                             "<tr>"
                             f"<td style='padding:4px 8px; vertical-align:top'>{i}</td>"
-                            f"<td style='padding:4px 8px; vertical-align:top'>{name}</td>"
-                            f"<td style='padding:4px 8px; vertical-align:top'>{str(Decimal(amount) / (Decimal(10) ** 6))}</td>"
-                            f"<td style='padding:4px 8px; vertical-align:top'>{approved}</td>"
-                            f"<td style='padding:4px 8px; vertical-align:top'>{released}</td>"
+                            f"<td style='padding:4px 8px; vertical-align:top'>{milestone['name']}</td>"
+                            f"<td style='padding:4px 8px; vertical-align:top'>{str(Decimal(milestone['amount']) / (Decimal(10) ** 6))}</td>"
+                            f"<td style='padding:4px 8px; vertical-align:top'>{milestone['approved']}</td>"
+                            f"<td style='padding:4px 8px; vertical-align:top'>{milestone['released']}</td>"
                             "</tr>"
                         )
-                    except Exception:
+                    else:
                         html += (
                             "<tr>"
                             f"<td style='padding:4px 8px;'>{i}</td>"
@@ -317,12 +332,6 @@ class ProjectAdmin(admin.ModelAdmin):
 
     onchain_info.short_description = "On-chain Campaign (getCampaignCore + milestones preview)"
 
-    def _timestamp_to_dt(self, ts):
-        try:
-            return timezone.datetime.fromtimestamp(int(ts), tz=timezone.get_default_timezone())
-        except Exception:
-            return ts
-
     # -------------------------
     # changeform template override 
     # -------------------------
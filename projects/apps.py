@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from django.db.models.signals import pre_migrate
+        from .backfills import merge_duplicate_donations
+        # before the unique (project, wallet) constraint is added to existing donations
+        pre_migrate.connect(merge_duplicate_donations, sender=self)
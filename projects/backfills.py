@@ -0,0 +1,51 @@
+"""
+Data steps that have to run around schema changes (see accounts.backfills:
+there are no shipped migrations to put a RunPython step in).
+
+The unique (project, wallet) constraint on Donation cannot be created while
+a wallet has several donation rows for one campaign, which the old
+read-then-create pledge path could leave behind; nor can the one on the
+wallet-less rows, of which it wrote one per pledge from an unregistered
+wallet. merge_duplicate_donations runs on pre_migrate, before the
+constraints' migration, and folds each such group into one row.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+from .models import Donation
+
+
+def merge_duplicate_donations(sender=None, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """
+    Keep the oldest donation of each duplicated (project, wallet), no wallet
+    included, with the summed amount; refundable if any row was, refunded
+    only if all were. The others are deleted. Each group commits on its own.
+    Returns the number of rows deleted.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if Donation._meta.db_table not in connection.introspection.table_names(cursor):
+            return 0
+
+    donations = Donation.objects.using(using)
+    groups = list(
+        donations.values_list('project', 'wallet')
+        .annotate(rows=Count('id')).filter(rows__gt=1).order_by()
+    )
+    merged = 0
+    for project_id, wallet_id, _ in groups:
+        with transaction.atomic(using=using):
+            rows = list(
+                donations.select_for_update().filter(project=project_id, wallet=wallet_id)
+                .order_by('created_at', 'id').only('id', 'amount', 'refundable', 'refunded')
+            )
+            keep, extra = rows[0], rows[1:]
+            keep.amount = sum(row.amount for row in rows)
+            keep.refundable = any(row.refundable for row in rows)
+            keep.refunded = all(row.refunded for row in rows)
+            keep.save(update_fields=['amount', 'refundable', 'refunded'])
+            donations.filter(pk__in=[row.pk for row in extra]).delete()
+        merged += len(extra)
+
+    if verbosity >= 1 and merged:
+        print(f"  Donation: merged {merged} duplicate row(s) into {len(groups)} donation(s)")
+    return merged
@@ -0,0 +1,31 @@
+import uuid
+from django.db import connection
+from .models import Donation
+from .upserts import increment_upsert
+
+
+def add_donations(amounts):
+    """
+    Add pledged amounts to donations, {(project_pk, wallet_pk): amount}, with one
+    upsert on the unique (project, wallet) constraint: the amount is incremented
+    in SQL, so concurrent workers need no lock and cannot lose an update, and a
+    run of pledges costs one statement whether the rows exist or not.
+    Pledges from unregistered wallets go to add_anonymous_donations.
+    """
+    increment_upsert(
+        Donation, ('project', 'wallet'), 'amount', amounts,
+        defaults={'id': uuid.uuid4, 'refundable': False, 'refunded': False},
+    )
+
+
+def add_anonymous_donations(amounts):
+    """
+    Add pledges from wallets nobody registered, {project_pk: amount}, to the
+    campaign's one wallet-less donation (unique_anonymous_donation), with the
+    same upsert, so they do not pile up a row per pledge.
+    """
+    increment_upsert(
+        Donation, ('project',), 'amount', {(pk,): amount for pk, amount in amounts.items()},
+        defaults={'id': uuid.uuid4, 'wallet': None, 'refundable': False, 'refunded': False},
+        where=f"{connection.ops.quote_name(Donation._meta.get_field('wallet').column)} IS NULL",
+    )
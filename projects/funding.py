@@ -0,0 +1,90 @@
+"""
+Sharded funding counters for hot campaigns.
+
+With FUNDING_SHARDS > 0 a pledge does not touch its Project row: the
+amount is added to one of the campaign's FUNDING_SHARDS FundingShard rows,
+picked at random, with an increment upsert (see projects.upserts), so
+workers pledging to the same campaign rarely wait on the same row.
+rollup_funding() moves the pending amounts into Project.total_funds in one
+transaction and recomputes progress and milestones from the new totals;
+process_webhooks (or `manage.py rollup_funding`) runs it every
+FUNDING_ROLLUP_INTERVAL seconds; the inline webhook, the poller and the
+subscriber, which have no such loop, run it after each batch they apply
+(contract.webhook.settle_funding). An amount is either pending in a shard or
+in total_funds, never both, so total_funds plus the pending shards is
+always the exact total (funding_totals()).
+"""
+import random
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from .milestones import advance_projects
+from .models import FundingShard, Project
+from .upserts import increment_upsert
+
+
+def sharded():
+    return settings.FUNDING_SHARDS > 0
+
+
+def add_funds(amounts):
+    """Add {project_pk: amount} to a random counter shard of each project."""
+    shard = random.randrange(settings.FUNDING_SHARDS)
+    increment_upsert(FundingShard, ('project', 'shard'), 'amount', {(pk, shard): amount for pk, amount in amounts.items()})
+
+
+def apply_funding(projects, amounts):
+    """
+    Add {project_pk: amount} to the projects' total_funds with one UPDATE,
+    then recompute progress (one bulk_update) and milestones. `projects` are
+    the Project rows, locked by the caller; their total_funds and progress
+    are refreshed. Returns {project.pk: MilestoneProgress}.
+    """
+    funds_field = Project._meta.get_field('total_funds')
+    Project.objects.filter(pk__in=amounts).update(
+        total_funds=Case(
+            *[
+                When(pk=pk, then=F('total_funds') + Value(amount, output_field=funds_field))
+                for pk, amount in amounts.items()
+            ],
+            output_field=funds_field,
+        )
+    )
+    by_pk = {p.pk: p for p in projects}
+    for project_id, total_funds in Project.objects.filter(pk__in=by_pk).values_list('pk', 'total_funds'):
+        project = by_pk[project_id]
+        project.total_funds = total_funds
+        project.progress = round((project.total_funds / project.goal) * 100, 2)
+    Project.objects.bulk_update(by_pk.values(), ['progress'])
+    return advance_projects(by_pk.values())
+
+
+def rollup_funding():
+    """
+    Move every pending shard amount into Project.total_funds, in one
+    transaction. Shards are locked first (then projects), so a pledge that
+    lands meanwhile waits and is picked up by the next rollup.
+    Returns (projects, {project.pk: MilestoneProgress}).
+    """
+    with transaction.atomic():
+        shards = list(FundingShard.objects.select_for_update().exclude(amount=0).order_by('project_id', 'shard'))
+        if not shards:
+            return [], {}
+        amounts = defaultdict(Decimal)
+        for shard in shards:
+            amounts[shard.project_id] += shard.amount
+        FundingShard.objects.filter(pk__in=[shard.pk for shard in shards]).update(amount=0)
+        projects = list(Project.objects.select_for_update().filter(pk__in=amounts))
+        return projects, apply_funding(projects, amounts)
+
+
+def funding_totals(projects):
+    """{project.pk: total_funds including amounts not rolled up yet}."""
+    projects = list(projects)
+    pending = dict(
+        FundingShard.objects.filter(project__in=projects).values('project')
+        .annotate(pending=Sum('amount')).values_list('project', 'pending')
+    )
+    return {p.pk: p.total_funds + pending.get(p.pk, Decimal(0)) for p in projects}
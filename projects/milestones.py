@@ -0,0 +1,58 @@
+from collections import defaultdict, namedtuple
+from .models import Milestone
+
+
+# completed / activated: milestones whose status changed in this pass
+# goal_reached: the last milestone was completed in this pass
+MilestoneProgress = namedtuple('MilestoneProgress', ['completed', 'activated', 'goal_reached'])
+
+
+def _plan(total_funds, milestones):
+    """
+    Compute status changes for one project's milestones (ordered by milestone_no)
+    against its total_funds. Milestone.goal is cumulative, so every milestone whose
+    goal is covered is completed and the first uncovered one becomes active.
+    Completed milestones are never reopened.
+    """
+    completed, activated = [], []
+    for milestone in milestones:
+        if milestone.status == Milestone.COMPLETED:
+            continue
+        if total_funds >= milestone.goal:
+            milestone.status = Milestone.COMPLETED
+            completed.append(milestone)
+            continue
+        if milestone.status != Milestone.ACTIVE:
+            milestone.status = Milestone.ACTIVE
+            activated.append(milestone)
+        break
+
+    goal_reached = bool(completed) and completed[-1] is milestones[-1]
+    return MilestoneProgress(completed, activated, goal_reached)
+
+
+def advance_projects(projects):
+    """
+    Bring the milestones of several projects in line with their total_funds.
+    Loads all milestones in one query and writes every change with one bulk_update.
+    Returns {project.pk: MilestoneProgress}.
+    """
+    projects = list(projects)
+    by_project = defaultdict(list)
+    for milestone in Milestone.objects.filter(project__in=projects).order_by('project_id', 'milestone_no'):
+        by_project[milestone.project_id].append(milestone)
+
+    results, changed = {}, []
+    for project in projects:
+        progress = _plan(project.total_funds, by_project[project.pk])
+        results[project.pk] = progress
+        changed += progress.completed + progress.activated
+
+    if changed:
+        Milestone.objects.bulk_update(changed, ['status'])
+    return results
+
+
+def advance_milestones(project):
+    """Single-project form of advance_projects."""
+    return advance_projects([project])[project.pk]
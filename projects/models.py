@@ -87,7 +87,8 @@ class Project(TimeStamps, models.Model):
     total_funds = models.DecimalField(decimal_places=2,max_digits=14,default=0)
     duration_in_days = models.DecimalField(null=True, blank=True,decimal_places=2,max_digits=5)
     wallet_address = models.CharField(max_length=255,null=True, blank=True)
-    contract_id = models.IntegerField(null=True, blank=True)
+    # on-chain campaign id, set by CampaignCreated; unique, so event lookups hit an index
+    contract_id = models.IntegerField(null=True, blank=True, unique=True)
     progress = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
     deployed = models.BooleanField(default=False)
     deadline = models.DateTimeField(null=True, blank=True)
@@ -350,6 +351,24 @@ class Update(models.Model):
     
 
 
+class FundingShard(models.Model):
+    """
+    Pending pledge amounts of a campaign, spread over FUNDING_SHARDS rows so
+    concurrent pledges do not queue on the Project row (see projects.funding).
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='funding_shards')
+    shard = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'shard'], name='unique_funding_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id} #{self.shard}: {self.amount}"
+
+
 class Donation(TimeStamps, models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -363,6 +382,13 @@ class Donation(TimeStamps, models.Model):
     
     class Meta:
         ordering = ["-updated_at"]
+        constraints = [
+            # one running total per wallet and campaign (projects.donations.add_donations upserts into it)
+            models.UniqueConstraint(fields=['project', 'wallet'], name='unique_donation_per_wallet'),
+            # NULL wallets are exempt from the above: one running total of unregistered wallets per campaign
+            models.UniqueConstraint(fields=['project'], condition=models.Q(wallet__isnull=True),
+                                    name='unique_anonymous_donation'),
+        ]
 
     def __str__(self):
         return f"{self.wallet} | amount: {self.amount} | project{self.project.title}"
@@ -5,7 +5,8 @@ from .models import (
     Comment,Donation, ExpenseDocument,
     ProjectImage,
     )
-from accounts.models import Transaction, Wallet
+from accounts.models import Transaction, Wallet, normalize_address
+from accounts.intents import open_intent
 from accounts.utils import resize_image
 from django.core.exceptions import ValidationError
 from decimal import Decimal
@@ -453,13 +454,16 @@ class DonationTransactionSerializer(serializers.ModelSerializer):
         
     def create(self, validated_data):
         transaction_wallet= validated_data.pop('wallet',None)
-        wallet = Wallet.objects.filter(address__iexact=transaction_wallet).first()
+        wallet = Wallet.objects.filter(address_lower=normalize_address(transaction_wallet)).first()
         if not wallet:
             raise serializers.ValidationError(
                 {"wallet": "No user with the given wallet."}
             )
         validated_data['wallet']=wallet
 
-        return super().create(validated_data)
+        with transaction.atomic():
+            pending = super().create(validated_data)
+            open_intent(pending)
+        return pending
     
 
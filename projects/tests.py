@@ -1,3 +1,132 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from accounts.models import Wallet
+from contract.benchmarks import make_campaign, make_donor
+from projects.backfills import merge_duplicate_donations
+from projects.donations import add_anonymous_donations, add_donations
+from projects.models import Donation
+from projects.upserts import increment_upsert
+
+
+class IncrementUpsertTests(TestCase):
+
+    def setUp(self):
+        self.projects = [make_campaign(contract_id) for contract_id in (1, 2)]
+        self.wallets = [Wallet.objects.get(address=make_donor(i)) for i in range(2)]
+
+    def amounts(self):
+        return {
+            (donation.project_id, donation.wallet_id): donation.amount
+            for donation in Donation.objects.all()
+        }
+
+    def test_inserts_missing_rows(self):
+        add_donations({
+            (self.projects[0].pk, self.wallets[0].pk): Decimal('10'),
+            (self.projects[1].pk, self.wallets[0].pk): Decimal('5'),
+        })
+
+        self.assertEqual(self.amounts(), {
+            (self.projects[0].pk, self.wallets[0].pk): Decimal('10'),
+            (self.projects[1].pk, self.wallets[0].pk): Decimal('5'),
+        })
+        # callable defaults are called per row
+        self.assertEqual(len(set(Donation.objects.values_list('id', flat=True))), 2)
+
+    def test_adds_to_existing_rows_on_conflict(self):
+        existing = Donation.objects.create(
+            project=self.projects[0], wallet=self.wallets[0], amount=Decimal('10'), refundable=True,
+        )
+
+        add_donations({
+            (self.projects[0].pk, self.wallets[0].pk): Decimal('2.50'),
+            (self.projects[0].pk, self.wallets[1].pk): Decimal('1'),
+        })
+        add_donations({(self.projects[0].pk, self.wallets[0].pk): Decimal('0.50')})
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.amount, Decimal('13'))
+        # only the amount and updated_at are overwritten
+        self.assertTrue(existing.refundable)
+        self.assertGreater(existing.updated_at, existing.created_at)
+        self.assertEqual(Donation.objects.count(), 2)
+
+    def test_batches_larger_than_a_chunk(self):
+        increment_upsert(
+            Donation, ('project', 'wallet'), 'amount',
+            {(self.projects[0].pk, self.wallets[0].pk): Decimal('1'),
+             (self.projects[0].pk, self.wallets[1].pk): Decimal('2'),
+             (self.projects[1].pk, self.wallets[0].pk): Decimal('3')},
+            defaults={'id': Donation._meta.pk.default, 'refundable': False, 'refunded': False}, chunk=2,
+        )
+
+        self.assertEqual(sorted(self.amounts().values()), [Decimal('1'), Decimal('2'), Decimal('3')])
+
+    def test_conflicts_on_a_partial_unique_index(self):
+        add_anonymous_donations({self.projects[0].pk: Decimal('4')})
+        add_anonymous_donations({self.projects[0].pk: Decimal('6'), self.projects[1].pk: Decimal('1')})
+        add_donations({(self.projects[0].pk, self.wallets[0].pk): Decimal('7')})
+
+        self.assertEqual(self.amounts(), {
+            (self.projects[0].pk, None): Decimal('10'),
+            (self.projects[1].pk, None): Decimal('1'),
+            (self.projects[0].pk, self.wallets[0].pk): Decimal('7'),
+        })
+
+
+class MergeDuplicateDonationsTests(TransactionTestCase):
+    """Existing duplicates are folded together so the unique constraints can be added."""
+
+    def setUp(self):
+        self.constraints = Donation._meta.constraints
+        # as in a database from before the constraints (sqlite rebuilds the table from Meta)
+        with mock.patch.object(Donation._meta, 'constraints', []):
+            self.alter_constraints(present=True, action='remove_constraint')
+        self.addCleanup(self.add_constraints)
+
+    def add_constraints(self):
+        self.alter_constraints(present=False, action='add_constraint')
+
+    def alter_constraints(self, present, action):
+        # one at a time: a sqlite rebuild for one of them changes the others too
+        for constraint in self.constraints:
+            with connection.cursor() as cursor:
+                existing = connection.introspection.get_constraints(cursor, Donation._meta.db_table)
+            if (constraint.name in existing) == present:
+                with connection.schema_editor() as editor:
+                    getattr(editor, action)(Donation, constraint)
+
+    def test_merges_duplicates_and_keeps_the_sum(self):
+        project, other = make_campaign(1), make_campaign(2)
+        wallet, second = (Wallet.objects.get(address=make_donor(i)) for i in range(2))
+        oldest = Donation.objects.create(project=project, wallet=wallet, amount=Decimal('10'))
+        Donation.objects.create(project=project, wallet=wallet, amount=Decimal('2.50'), refundable=True)
+        Donation.objects.create(project=project, wallet=wallet, amount=Decimal('0.25'), refunded=True)
+        Donation.objects.create(project=project, wallet=second, amount=Decimal('7'))
+        Donation.objects.create(project=other, wallet=wallet, amount=Decimal('3'))
+        anonymous = Donation.objects.create(project=project, amount=Decimal('1'))
+        Donation.objects.create(project=project, amount=Decimal('4'))
+
+        self.assertEqual(merge_duplicate_donations(verbosity=0), 3)
+
+        self.assertEqual(Donation.objects.count(), 4)
+        merged = Donation.objects.get(project=project, wallet=wallet)
+        self.assertEqual(merged.pk, oldest.pk)
+        self.assertEqual(merged.amount, Decimal('12.75'))
+        self.assertTrue(merged.refundable)
+        self.assertFalse(merged.refunded)
+        self.assertEqual(Donation.objects.get(project=project, wallet=None).pk, anonymous.pk)
+        self.assertEqual(Donation.objects.get(project=project, wallet=None).amount, Decimal('5'))
+        self.assertEqual(
+            sorted(Donation.objects.values_list('amount', flat=True)),
+            [Decimal('3'), Decimal('5'), Decimal('7'), Decimal('12.75')],
+        )
+
+        # the constraints' migration can run now
+        self.add_constraints()
+
+        self.assertEqual(merge_duplicate_donations(verbosity=0), 0)
@@ -0,0 +1,56 @@
+from django.db import connection
+from django.utils import timezone
+
+
+def increment_upsert(model, key_fields, increment_field, rows, defaults=None, chunk=500, where=None):
+    """
+    INSERT `rows` ({key tuple: amount}) into `model`, and on a conflict with the
+    unique `key_fields` add the amount to the existing row in SQL:
+    ON CONFLICT (...) DO UPDATE SET field = field + EXCLUDED.field.
+    Concurrent writers need no lock and cannot lose an increment. `defaults`
+    fills the other columns of new rows (callables are called per row);
+    created_at / updated_at are set when the model has them. `where` is the
+    SQL predicate of a partial unique index on `key_fields`, if that is the
+    one to conflict on.
+    Django's bulk_create(update_conflicts=True) can only overwrite a column,
+    hence the hand-built statement. Works on postgres and sqlite >= 3.24.
+    """
+    # same row order in every writer, so two upserts cannot deadlock on postgres
+    items = sorted(rows.items(), key=lambda item: tuple(str(k) for k in item[0]))
+    if not items:
+        return
+    opts = model._meta
+    now = timezone.now()
+    defaults = dict(defaults or {})
+    for name in ('created_at', 'updated_at'):
+        if any(f.name == name for f in opts.concrete_fields):
+            defaults.setdefault(name, now)
+    names = [*key_fields, increment_field, *defaults]
+    fields = [opts.get_field(name) for name in names]
+
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    column = qn(opts.get_field(increment_field).column)
+    updates = [f"{column} = {table}.{column} + EXCLUDED.{column}"]
+    if 'updated_at' in defaults:
+        updated_at = qn(opts.get_field('updated_at').column)
+        updates.append(f"{updated_at} = EXCLUDED.{updated_at}")
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) VALUES {{}} "
+        f"ON CONFLICT ({', '.join(qn(opts.get_field(name).column) for name in key_fields)}) "
+        f"{f'WHERE {where} ' if where else ''}"
+        f"DO UPDATE SET {', '.join(updates)}"
+    )
+    row_placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), chunk):
+            batch = items[start:start + chunk]
+            params = []
+            for key, amount in batch:
+                extra = [value() if callable(value) else value for value in defaults.values()]
+                params += [
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, [*key, amount, *extra])
+                ]
+            cursor.execute(sql.format(', '.join([row_placeholder] * len(batch))), params)
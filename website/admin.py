@@ -6,7 +6,7 @@ from website.models import ErrorLog, Faq
 @admin.register(ErrorLog)
 class ContractLogAdmin(admin.ModelAdmin):
     
-    readonly_fields = ('id', 'time', 'error','data','notes')
+    readonly_fields = ('id', 'time', 'error','data','notes','webhook_event')
 
 
 admin.site.register(Faq)
\ No newline at end of file
@@ -15,6 +15,8 @@ class ErrorLog(models.Model):
     data = models.TextField()
     error = models.TextField(null=True, blank=True)
     notes = models.TextField(null=True, blank=True)
+    # webhook delivery the error came from; its body is stored there, once
+    webhook_event = models.ForeignKey('contract.WebhookEvent', on_delete=models.SET_NULL, null=True, blank=True, related_name='errors')
     time = models.DateTimeField(auto_now_add=True, blank=True, null=True)
 
     def __str__(self):